@@ -0,0 +1,96 @@
+import gc
+import json
+import sys
+import time
+import typing
+
+from platforms.linux_server.linux_node import LinuxNode
+from platforms.linux_server.lxc_service import SimpleLXCHost
+from topo.interface import Interface
+from topo.link import Link, LinkType
+from topo.node import NodeType
+from topo.switch import OVSSwitch
+from topo.topo import Topo, TopoUtil
+from topo.util import ClassUtil
+
+
+# Large topology: every node runs one switch with hosts attached, switches of all nodes form a vxlan chain.
+class BenchmarkTopo(Topo):
+
+    def __init__(self, nodes: int, hosts: int, *args, **params):
+        self.node_count = nodes
+        self.host_count = hosts
+        super().__init__(args=args, **params)
+
+    def create(self, *args, **params):
+        switches = []
+        for i in range(0, self.node_count):
+            ip = f"10.1.{i // 250}.{i % 250 + 1}"
+            node = LinuxNode(name=f"node{i}", node_type=NodeType.LINUX_DEBIAN, ssh_remote=f"root@{ip}")
+            node.add_interface(Interface("eth0").add_ip(ip, "10.1.0.0/16"))
+            self.add_node(node)
+            switch = OVSSwitch(name=f"s{i}", executor=node)
+            self.add_service(switch)
+            for j in range(0, self.host_count):
+                host = SimpleLXCHost(name=f"h{i}x{j}", executor=node)
+                self.add_service(host)
+                self.add_link(Link(self, service1=host, service2=switch, link_type=LinkType.DIRECT))
+            if len(switches) > 0:
+                link = Link(self, service1=switches[-1], service2=switch, link_type=LinkType.VXLAN)
+                self.add_link(link)
+                self.network_implementation.set_link_interface_mapping(link, "eth0", "eth0")
+            switches.append(switch)
+
+
+def measure(function: typing.Callable[[], object], repetitions: int) -> (float, object):
+    """Returns the best duration of all repetitions and the last result."""
+    best = None
+    ret = None
+    for i in range(0, repetitions):
+        # Do not let garbage of earlier repetitions be collected during this one
+        gc.collect()
+        start = time.time()
+        ret = function()
+        duration = time.time() - start
+        best = duration if best is None else min(best, duration)
+    return best, ret
+
+
+def import_cold(content: str) -> Topo:
+    """Imports with empty class and ip caches, like the first import of a process."""
+    ClassUtil.clear()
+    Interface.parse_ip.cache_clear()
+    Interface.parse_network.cache_clear()
+    return Topo.import_topo(content)
+
+
+def import_collecting(content: str) -> Topo:
+    """Imports like Topo.import_topo, but without pausing garbage collection."""
+    in_dict = json.loads(content)
+    if TopoUtil.is_compact_dict(in_dict):
+        in_dict = TopoUtil.from_compact_dict(in_dict)
+    return Topo.from_dict(in_dict)
+
+
+def main(argv: typing.List[str]):
+    nodes = int(argv[0]) if len(argv) > 0 else 50
+    hosts = int(argv[1]) if len(argv) > 1 else 99
+    repetitions = int(argv[2]) if len(argv) > 2 else 3
+
+    topo = BenchmarkTopo(nodes, hosts)
+    print(f"Topology with {len(topo.nodes)} nodes, {len(topo.services)} services and {len(topo.links)} links")
+
+    for name, compact in [("json", False), ("compact", True)]:
+        export_time, content = measure(lambda: topo.export_topo(compact=compact), repetitions)
+        cold_time, imported = measure(lambda: import_cold(content), repetitions)
+        warm_time, imported = measure(lambda: Topo.import_topo(content), repetitions)
+        collecting_time, _ = measure(lambda: import_collecting(content), repetitions)
+        if not imported.eq_without_gui(Topo.import_topo(topo.export_topo())):
+            raise Exception(f"Topology imported from {name} format differs")
+        print(f"{name:>8}: {len(content) / 1024 / 1024:6.1f} MiB, export {export_time * 1000:7.1f} ms, "
+              f"import {cold_time * 1000:7.1f} ms (cold caches), {warm_time * 1000:7.1f} ms (warm caches), "
+              f"{collecting_time * 1000:7.1f} ms (warm caches, gc not paused)")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -13,7 +13,10 @@ class Command(object):
         return self.cmd
 
     def __eq__(self, other):
-        return self.cmd == other.cmd
+        return isinstance(other, Command) and self.cmd == other.cmd
+
+    def __hash__(self):
+        return hash(self.cmd)
 
 
 class File(object):
@@ -2,13 +2,17 @@ from abc import abstractmethod
 
 from config.configuration import Configuration
 from topo.node import Node
-from topo.topo import Topo
 
 
 class ConfigurationBuilder(object):
-    def __init__(self, topo: Topo, node: Node):
+    def __init__(self, topo: 'Topo', node: Node):
         self.topo = topo
         self.node = node
+        # Claim new containers from a WarmContainerPool on the node (if there is one), see Engine
+        self.use_warm_pool = False
+        # Create containers with a single lxc launch (or lxc init if there is work to do before the first start)
+        # with all limits passed up front instead of lxc init, one lxc config set per limit and lxc start
+        self.use_launch = True
 
     @abstractmethod
     def build(self) -> Configuration:
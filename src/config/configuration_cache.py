@@ -0,0 +1,80 @@
+import typing
+from threading import Lock
+from typing import Dict
+
+from config.configuration import Configuration
+from config.configuration_builder import ConfigurationBuilder
+from topo.node import Node
+
+
+class CachedConfigurationBuilder(ConfigurationBuilder):
+    """Configuration builder of one node returning the configurations memoized by the cache of its topology.
+
+       The returned configurations are shared and must not be modified."""
+
+    def __init__(self, cache: 'ConfigurationCache', builder: ConfigurationBuilder):
+        super().__init__(builder.topo, builder.node)
+        self.cache = cache
+        self.builder = builder
+        self.use_warm_pool = builder.use_warm_pool
+        self.use_launch = builder.use_launch
+
+    def get(self, kind: str, service_name: str or None, build: typing.Callable[[], Configuration]) -> Configuration:
+        return self.cache.get(self.node, (kind, service_name, self.use_warm_pool, self.use_launch), build)
+
+    def build(self) -> Configuration:
+        return self.get('build', None, self.builder.build)
+
+    def build_base(self) -> Configuration:
+        return self.get('base', None, self.builder.build_base)
+
+    def build_service(self, service: 'Service') -> Configuration:
+        if service.topo is not self.topo:
+            return self.builder.build_service(service)
+        # Generating the base network assigns the bind names used by the services
+        self.build_base()
+        return self.get('service', service.name, lambda: self.builder.build_service(service))
+
+    def build_service_enable(self, service: 'Service') -> Configuration:
+        if service.topo is not self.topo:
+            return self.builder.build_service_enable(service)
+        self.build_base()
+        return self.get('enable', service.name, lambda: self.builder.build_service_enable(service))
+
+
+class ConfigurationCache(object):
+    """Memoizes the configurations of the nodes of a topology (full, base network and per service) as long as its
+       version does not change.
+
+       Every change to the structure of the topology bumps Topo.version, which discards all cached configurations
+       on the next lookup."""
+
+    def __init__(self, topo: 'Topo'):
+        self.topo = topo
+        self.version = -1
+        # Node name -> (kind, service name, warm pool used, launch used) -> configuration
+        self.configs: Dict[str, Dict[typing.Tuple[str, str or None, bool, bool], Configuration]] = {}
+        self.lock = Lock()
+
+    def get_builder(self, node: Node, use_warm_pool: bool = False,
+                    use_launch: bool = True) -> CachedConfigurationBuilder:
+        builder = node.get_configuration_builder(self.topo)
+        builder.use_warm_pool = use_warm_pool
+        builder.use_launch = use_launch
+        return CachedConfigurationBuilder(self, builder)
+
+    def get(self, node: Node, key: typing.Tuple[str, str or None, bool, bool],
+            build: typing.Callable[[], Configuration]) -> Configuration:
+        with self.lock:
+            if self.version != self.topo.version:
+                self.version = self.topo.version
+                self.configs = {}
+            configs = self.configs.setdefault(node.name, {})
+            if key in configs.keys():
+                return configs[key]
+        # Build outside of the lock, so nodes can be configured in parallel
+        config = build()
+        with self.lock:
+            if self.version == self.topo.version:
+                self.configs.setdefault(node.name, {})[key] = config
+        return config
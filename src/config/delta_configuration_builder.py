@@ -1,10 +1,16 @@
-from config.configuration import Configuration
+import typing
+from collections import Counter
+
+from config.configuration import Configuration, Command
 
 
 class DeltaConfigurationBuilder:
 
     @classmethod
     def get_delta(cls, destroy_config: Configuration, create_config: Configuration) -> Configuration:
+        """Returns the configuration transforming destroy_config into create_config. Commands are compared as
+           multisets (a command present n times in one and m times in the other configuration is kept n - m times)
+           while their order is preserved."""
         if len(destroy_config.start_instructions) > 0 or len(destroy_config.stop_instructions) > 0 or \
                 len(create_config.start_instructions) > 0 or len(create_config.stop_instructions) > 0:
             raise Exception("Cannot build deltas for instructions")
@@ -12,16 +18,33 @@ class DeltaConfigurationBuilder:
         ret = Configuration()
 
         # Include all remove commands that are not present in new service to remove old components
-        for x in destroy_config.stop_cmds:
-            if x not in create_config.stop_cmds:
-                ret.stop_cmds.append(x)
-
-        # Add all required files
-        ret.files = create_config.files
+        ret.stop_cmds = DeltaConfigurationBuilder.subtract(destroy_config.stop_cmds, create_config.stop_cmds)
 
         # Include all start commands that are not present in old component to start things back up
-        for x in create_config.start_cmds:
-            if x not in destroy_config.start_cmds:
-                ret.start_cmds.append(x)
+        ret.start_cmds = DeltaConfigurationBuilder.subtract(create_config.start_cmds, destroy_config.start_cmds)
+
+        # Add all required files: all files of services that are (re)launched, otherwise only new files
+        launched = set([x.to_str().split()[1] for x in ret.start_cmds
+                        if x.to_str().startswith("#filecopyafterlaunch")])
+        for service, files in create_config.files.items():
+            if service in launched:
+                ret.files[service] = files
+                continue
+            old_files = set(destroy_config.files.get(service, []))
+            new_files = [x for x in files if x not in old_files]
+            if len(new_files) > 0:
+                ret.files[service] = new_files
 
         return ret
+
+    @classmethod
+    def subtract(cls, commands: typing.List[Command], other: typing.List[Command]) -> typing.List[Command]:
+        """Returns commands without (one occurrence each of) the commands in other, keeping the order of commands."""
+        remaining = Counter(other)
+        ret = []
+        for x in commands:
+            if remaining[x] > 0:
+                remaining[x] -= 1
+            else:
+                ret.append(x)
+        return ret
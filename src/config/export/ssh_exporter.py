@@ -1,4 +1,5 @@
 import os
+import typing
 from os import PathLike
 from pathlib import Path
 
@@ -6,13 +7,17 @@ from config.configuration import Configuration
 from config.delta_configuration_builder import DeltaConfigurationBuilder
 from config.export.configuration_exporter import ConfigurationExporter
 from ssh.output_consumer import PrintOutputConsumer
+from ssh.script_ssh_command import ScriptSSHCommand
 from ssh.ssh_command import SSHCommand, FileSendCommand
 from topo.node import Node
 
 
 class SSHConfigurationExporter(ConfigurationExporter):
-    def __init__(self, configuration: Configuration, node: Node):
+    def __init__(self, configuration: Configuration, node: Node, batch_commands: bool = False):
+        """batch_commands: whether to run each contiguous run of commands as one script over a single ssh session
+                           instead of opening one ssh session per command"""
         super().__init__(configuration, node)
+        self.batch_commands = batch_commands
 
     def start_node(self, topo: 'Topo', builder: 'ConfigurationBuilder'):
         config = builder.build_base()
@@ -22,8 +27,11 @@ class SSHConfigurationExporter(ConfigurationExporter):
         if len(config.start_instructions) > 0 or len(config.stop_instructions) > 0:
             raise Exception("SSH exporter does not support instructions!")
 
+        commands = []
         for i in range(0, len(config.start_cmds)):
             if config.start_cmds[i].to_str().startswith("#filecopyafterlaunch"):
+                self._run_commands(commands, True)
+                commands = []
                 service = config.start_cmds[i].to_str().split()[1]
                 real_service = topo.services[service]
                 if service in config.files.keys():
@@ -36,12 +44,8 @@ class SSHConfigurationExporter(ConfigurationExporter):
                 continue
             else:
                 if not config.start_cmds[i].to_str() == "":
-                    cmd = SSHCommand(self.node, config.start_cmds[i].to_str())
-                    print(config.start_cmds[i].to_str())
-                    cmd.add_consumer(PrintOutputConsumer())
-                    cmd.run()
-                    if cmd.exit_code is None or cmd.exit_code > 0:
-                        raise Exception(f"Failed to run command: Exit code {cmd.exit_code}")
+                    commands.append(config.start_cmds[i].to_str())
+        self._run_commands(commands, True)
 
     def stop_node(self, topo: 'Topo', builder: 'ConfigurationBuilder'):
         config = builder.build_base()
@@ -51,12 +55,33 @@ class SSHConfigurationExporter(ConfigurationExporter):
         if len(config.start_instructions) > 0 or len(config.stop_instructions) > 0:
             raise Exception("SSH exporter does not support instructions!")
 
+        commands = []
         for i in range(0, len(config.stop_cmds)).__reversed__():
             if not config.stop_cmds[i].to_str() == "":
-                cmd = SSHCommand(self.node, config.stop_cmds[i].to_str())
-                print(config.stop_cmds[i].to_str())
+                commands.append(config.stop_cmds[i].to_str())
+        self._run_commands(commands, False)
+
+    def _run_commands(self, commands: typing.List[str], check: bool):
+        """Runs the commands in order. If check is set, the first failing command raises an exception (and aborts
+           the remaining commands), otherwise failures are ignored."""
+        if len(commands) == 0:
+            return
+        if not self.batch_commands:
+            for command in commands:
+                cmd = SSHCommand(self.node, command)
+                print(command)
                 cmd.add_consumer(PrintOutputConsumer())
                 cmd.run()
+                if check and (cmd.exit_code is None or cmd.exit_code > 0):
+                    raise Exception(f"Failed to run command: Exit code {cmd.exit_code}")
+            return
+        cmd = ScriptSSHCommand(self.node, commands, check, PrintOutputConsumer())
+        cmd.run()
+        if check and (cmd.exit_code is None or cmd.exit_code > 0):
+            failed = cmd.get_failed_command()
+            if failed is None:
+                raise Exception(f"Failed to run commands on {self.node.name}: Exit code {cmd.exit_code}")
+            raise Exception(f"Failed to run command {failed}: Exit code {cmd.exit_code}")
 
     def create(self, topo: 'Topo', builder: 'ConfigurationBuilder', service: 'Service'):
         config = builder.build_service(service)
@@ -74,17 +99,17 @@ class SSHConfigurationExporter(ConfigurationExporter):
         config = builder.build_service_enable(service)
         self._stop_with_config(config, topo)
 
-    def regress(self, old_topo: 'Topo', builder: 'ConfigurationBuilder', old_service: 'Service',
-                new_service: 'Service'):
-        config_old = builder.build_service(old_service)
-        config_new = builder.build_service(new_service)
+    def regress(self, old_topo: 'Topo', old_builder: 'ConfigurationBuilder', new_builder: 'ConfigurationBuilder',
+                old_service: 'Service', new_service: 'Service'):
+        config_old = old_builder.build_service(old_service)
+        config_new = new_builder.build_service(new_service)
         delta_config = DeltaConfigurationBuilder.get_delta(config_old, config_new)
         self._stop_with_config(delta_config, old_topo)
 
-    def advance(self, new_topo: 'Topo', builder: 'ConfigurationBuilder', old_service: 'Service',
-                new_service: 'Service'):
-        config_old = builder.build_service(old_service)
-        config_new = builder.build_service(new_service)
+    def advance(self, new_topo: 'Topo', old_builder: 'ConfigurationBuilder', new_builder: 'ConfigurationBuilder',
+                old_service: 'Service', new_service: 'Service'):
+        config_old = old_builder.build_service(old_service)
+        config_new = new_builder.build_service(new_service)
         delta_config = DeltaConfigurationBuilder.get_delta(config_old, config_new)
         self._start_with_config(delta_config, new_topo)
 
@@ -12,6 +12,7 @@ from gui.main_view import MainView
 from gui.service_box import ServiceBox
 from live.engine import Engine
 from live.engine_topology_change_listener import EngineTopologyChangeListener
+from ssh.ssh_connection_pool import SSHConnectionPool
 from topo.node import Node
 from topo.service import Service
 from topo.topo import TopoUtil, Topo
@@ -22,6 +23,10 @@ class Gui(EngineTopologyChangeListener):
         self.argv = argv
 
         fullscreen = "-f" in argv or "--fullscreen" in argv
+        metrics_port = None
+        for arg in argv:
+            if arg.startswith("--metrics-port="):
+                metrics_port = int(arg.split("=", 1)[1])
 
         self.max_width = 0
         self.max_height = 0
@@ -38,7 +43,7 @@ class Gui(EngineTopologyChangeListener):
         self.init_height = self.canvas_height - self.max_height
 
         self.topo_def = argv[0]
-        self.engine = Engine(self.topo_def)
+        self.engine = Engine(self.topo_def, metrics_port=metrics_port)
         self.engine.engine_topology_change_listeners.append(self)
         self.engine.update_all_status()
 
@@ -76,12 +81,9 @@ class Gui(EngineTopologyChangeListener):
     def run(self):
         update_thread = threading.Thread(target=self.engine.continuous_update)
         update_thread.start()
-        ifstat_threads = []
+        ifstat_tasks = []
         for node in self.engine.nodes.values():
-            for service in node.services.values():
-                ifstat_thread = threading.Thread(target=lambda: self.engine.continuous_ifstat(service))
-                ifstat_thread.start()
-                ifstat_threads.append(ifstat_thread)
+            ifstat_tasks.append(self.engine.event_loop.submit(self.engine.continuous_traffic_async(node)))
 
         self.view.run_ui_loop()
 
@@ -95,8 +97,12 @@ class Gui(EngineTopologyChangeListener):
 
         self.engine.stop_updating = True
         update_thread.join()
-        for x in ifstat_threads:
-            x.join()
+        for x in ifstat_tasks:
+            x.result()
+        self.engine.event_loop.stop()
+        if self.engine.metrics_exporter:
+            self.engine.metrics_exporter.stop()
+        SSHConnectionPool.get_instance().close_all()
 
     def flush_changes(self, box: Box):
         if isinstance(box, InterfaceBox):
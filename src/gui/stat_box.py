@@ -1,13 +1,15 @@
+import asyncio
 import math
-import threading
 import time
+import typing
+from collections import OrderedDict
 from threading import Lock
-from typing import Dict
 
 from gui.box import Box
 from gui.images import Images
 from live.engine import Engine
 from live.engine_component import EngineComponent, EngineInterface, EngineService, EngineComponentStatus
+from live.metrics_store import Metric
 
 
 class StatBox(Box):
@@ -27,7 +29,7 @@ class StatBox(Box):
         self.y_axis = "<Unknown>"
         self.x_unit = StatBox.DEFAULT_UNIT
         self.y_unit = StatBox.DEFAULT_UNIT
-        self.data: Dict[float, (float, str)] = {}  # X -> (Y, color)
+        self.data: OrderedDict[float, (float, str)] = OrderedDict()  # X (increasing) -> (Y, color)
         self.minimal_y = 0  # None would mean scaling lower y value dynamically
         self.data_lock = Lock()
         self.data_supplier = None
@@ -189,28 +191,20 @@ class StatBox(Box):
 
     def prune_history(self, min_x: float):
         self.data_lock.acquire()
-        for i in list(self.data.keys()):
-            if i < min_x:
-                del self.data[i]
+        # Values are added with increasing x, so only the oldest ones need to be looked at
+        while len(self.data) > 0 and next(iter(self.data)) < min_x:
+            self.data.popitem(last=False)
         self.data_lock.release()
 
     def min_x(self) -> float:
-        min_x = math.inf
-        for x in self.data.keys():
-            if min_x > x:
-                min_x = x
-        if min_x == math.inf:
+        if len(self.data) == 0:
             return 0
-        return min_x
+        return next(iter(self.data))
 
     def max_x(self) -> float:
-        max_x = -math.inf
-        for x in self.data.keys():
-            if max_x < x:
-                max_x = x
-        if max_x == -math.inf:
+        if len(self.data) == 0:
             return 1
-        return max_x
+        return next(reversed(self.data))
 
     def min_y(self) -> float:
         if self.minimal_y is not None:
@@ -341,43 +335,57 @@ class StatBoxDataSupplier(object):
             raise Exception("Invalid type")
 
     def run_chart(self):
+        self.engine.event_loop.run(self.run_chart_async())
+
+    async def run_chart_async(self):
         if self.type == 0:
-            for i in range(0, int(self.history)):
+            for i in reversed(range(0, int(self.history))):
                 self.box.add_value(-i, 0)
             icmp_offs = 0
-            while not self.engine.stop_updating and not self.stop_updating:
+
+            def on_result(icmp_seq: int, result: str or typing.Tuple[int, float]):
+                nonlocal icmp_offs
                 icmp_offs += 1
-                values = self.engine.cmd_ping(self.source.component, self.target.component, 1).ping_results.values()
-                if len(values) >= 1:
-                    for res in values:
-                        if isinstance(res, str):
-                            # Ping failed
-                            self.box.add_value(icmp_offs, math.inf, '#FFC0C0')
-                        else:
-                            ttl, ti = res
-                            self.box.add_value(icmp_offs, int(ti * 1000))
-                        break
-                else:
+                if isinstance(result, str):
                     # Ping failed
                     self.box.add_value(icmp_offs, math.inf, '#FFC0C0')
+                else:
+                    ttl, ti = result
+                    self.box.add_value(icmp_offs, int(ti * 1000))
                 self.box.prune_history(icmp_offs - self.history)
-                time.sleep(0.7)
+
+            # Results arrive from the continuous ping of the pair, which also records them in the engine metrics
+            prober = self.engine.get_ping_prober()
+            prober.add(self.source, self.target, on_result)
+            try:
+                while not self.engine.stop_updating and not self.stop_updating:
+                    await asyncio.sleep(0.5)
+            finally:
+                prober.remove(self.source, self.target, on_result)
         elif self.type == 1 or self.type == 2:
-            for i in range(0, int(self.history / 1000)):
-                self.box.add_value(-i * 1000, 0)
+            metric = Metric.RX if self.type == 1 else Metric.TX
+            # Show the recorded history of the interface right away (padded with zeros where there is none)
+            begin = time.time()
+            history = self.engine.metrics.range(self.source, metric, begin - self.history / 1000, begin)
+            first = (history[0][0] - begin) * 1000 if len(history) > 0 else 0
+            for i in reversed(range(0, int(self.history / 1000))):
+                if -i * 1000 < first:
+                    self.box.add_value(-i * 1000, 0)
+            for t, value in history:
+                self.box.add_value((t - begin) * 1000, value)
             start = 0
             while not self.engine.stop_updating and not self.stop_updating:
                 start += 1000
-                if self.source.ifstat and self.source.status == EngineComponentStatus.RUNNING:
-                    rx, tx = self.source.ifstat
+                latest = self.engine.metrics.latest(self.source, metric)
+                if latest and time.time() - latest[0] < 5 and self.source.status == EngineComponentStatus.RUNNING:
+                    value = latest[1]
                     color = '#C0C0FF'
                 else:
-                    rx = math.inf
-                    tx = math.inf
+                    value = math.inf
                     color = '#FFC0C0'
-                self.box.add_value(start, rx if self.type == 1 else tx, color)
+                self.box.add_value(start, value, color)
                 self.box.prune_history(start - self.history)
-                time.sleep(1)
+                await asyncio.sleep(1)
         else:
             raise Exception("Invalid type")
 
@@ -391,8 +399,7 @@ class StatBoxUtil(object):
         stat.current_box = (0, 0, view.box.width, view.box.height, 0)
         supp = StatBoxDataSupplier(intf.engine, stat, type, intf)
         stat.data_supplier = supp
-        update_thread = threading.Thread(target=supp.run_chart)
-        update_thread.start()
+        intf.engine.event_loop.submit(supp.run_chart_async())
         view.gui.main_box.add_box(stat)
         return stat
 
@@ -404,8 +411,7 @@ class StatBoxUtil(object):
         stat.current_box = (0, 0, view.box.width, view.box.height, 0)
         supp = StatBoxDataSupplier(service1.engine, stat, StatBoxDataSupplier.PING, service1, service2)
         stat.data_supplier = supp
-        update_thread = threading.Thread(target=supp.run_chart)
-        update_thread.start()
+        service1.engine.event_loop.submit(supp.run_chart_async())
         view.gui.main_box.add_box(stat)
         return stat
 
@@ -430,8 +436,7 @@ class StatBoxUtil(object):
         else:
             raise Exception("Invalid stat type")
         stat.data_supplier = supp
-        update_thread = threading.Thread(target=supp.run_chart)
-        update_thread.start()
+        engine.event_loop.submit(supp.run_chart_async())
         view.gui.main_box.add_box(stat)
         return stat
 
@@ -1,33 +1,73 @@
+import asyncio
+import functools
 import ipaddress
+import math
 import os
 import time
+import typing
 from typing import Dict
 
 from config.configuration import Configuration
+from config.configuration_cache import CachedConfigurationBuilder
 from config.export.ssh_exporter import SSHConfigurationExporter
+from extensions.wireguard_extension import WireguardServiceExtension
 from live.engine_component import EngineNode, EngineComponentStatus, EngineService, EngineInterfaceState, \
-    EngineInterface
+    EngineInterface, EngineComponent
+from live.engine_event_loop import EngineEventLoop
+from live.engine_scheduler import EngineScheduler, EngineTask
+from live.latency_matrix import LatencyMatrix, LatencyMatrixEntry
+from live.metrics_exporter import MetricsExporter
+from live.metrics_store import MetricsStore, Metric
+from live.ping_prober import PingProber
+from live.status_refresh_report import StatusRefreshReport
 from live.engine_topology_change_listener import EngineTopologyChangeListener
 from live.testbed_service import TestbedService
+from live.topology_diff import TopologyDiff, ChangeType
 from platforms.linux_server.lxc_service import LXCService
+from platforms.linux_server.warm_container_pool import WarmContainerPool
 from ssh.ifstat_command import IfstatSSHCommand
-from ssh.ip_addr_ssh_command import IpAddrSSHCommand, InterfaceState
+from ssh.ip_addr_ssh_command import IpAddrSSHCommand, InterfaceState, IpAddrJsonSSHCommand
 from ssh.iperf_command import IperfSSHCommand, IperfClientSSHCommand
 from ssh.lock_read_command import LockReadSSHCommand
 from ssh.lock_write_command import LockWriteSSHCommand
-from ssh.lxc_container_command import LxcContainerListCommand, LXCContainerStatus
+from ssh.lxc_container_command import LxcContainerListCommand, LXCContainerStatus, LxcContainerListJsonCommand
 from ssh.ping_ssh_command import PingSSHCommand
 from ssh.ssh_command import SSHCommand
-from ssh.tc_qdisc_command import TcQdiscSSHCommand
+from ssh.ssh_connection_pool import SSHConnectionPool
+from ssh.status_probe_command import StatusProbeSSHCommand
+from ssh.tc_qdisc_command import TcQdiscSSHCommand, TcQdiscJsonSSHCommand
+from ssh.traffic_collector_command import TrafficCollectorSSHCommand
 from topo.interface import Interface
 from topo.node import Node
 from topo.service import Service
+from topo.switch import Switch
 from topo.topo import Topo, TopoUtil
 
 
 class Engine(object):
     def __init__(self, topo: Topo or str or None = None,
-                 local_node: Node or str or None = None):
+                 local_node: Node or str or None = None, status_concurrency: int = 8, batched_status: bool = True,
+                 json_status: bool = True, deploy_concurrency: int = 4,
+                 batch_commands: bool = True, warm_pool: Dict[str, int] or None = None,
+                 metrics_port: int or None = None, launch_containers: bool = True):
+        """topo: the topology (or path to it) to manage, read from the local node if None
+           local_node: the node this engine is running on
+           status_concurrency: maximum concurrent status commands per node (nodes are always refreshed in
+                               parallel), 0 for the old sequential refresh
+           batched_status: whether to gather the status of a node and all its services with a single ssh command
+                           instead of one command per container and interface query
+           json_status: whether to query status via ip -json, tc -json and lxc ls --format json (nodes not
+                        supporting it fall back to text parsing, see json_status_nodes)
+           deploy_concurrency: maximum concurrent start/stop/destroy tasks per node in start_all, stop_all and
+                               destroy_all (nodes are always handled in parallel), 0 for the old sequential order
+           batch_commands: whether to deploy each contiguous run of configuration commands as one script over a
+                           single ssh session instead of one ssh session per command
+           warm_pool: image -> number of stopped containers to keep ready on every node, new containers of these
+                      images are claimed from the pool instead of being initialized from scratch (None for no pool)
+           metrics_port: port to serve the engine state in the Prometheus text format on (None for no endpoint,
+                         see MetricsExporter)
+           launch_containers: whether to create containers with a single lxc launch passing all limits instead of
+                              lxc init, one lxc config set per limit and lxc start"""
         if not topo:
             cmd = LockReadSSHCommand(local_node, "/tmp", "current_topology.json")
             cmd.run()
@@ -52,11 +92,33 @@ class Engine(object):
             self.nodes[node.name] = EngineNode(self, node, topo)
         self.stop_updating = False
         self.engine_topology_change_listeners: [EngineTopologyChangeListener] = []
+        self.event_loop = EngineEventLoop()
+        self.status_concurrency = status_concurrency
+        self.batched_status = batched_status
+        self.json_status = json_status
+        # Node name -> whether json status output is used for that node (overrides json_status)
+        self.json_status_nodes: Dict[str, bool] = {}
+        self.deploy_concurrency = deploy_concurrency
+        self.batch_commands = batch_commands
+        self.launch_containers = launch_containers
+        self.warm_pool: WarmContainerPool or None = None
+        if warm_pool:
+            self.warm_pool = WarmContainerPool(warm_pool)
+            self.event_loop.submit(self.warm_pool.run_async(self._get_reachable_nodes, lambda: not self.stop_updating))
+        self.last_status_report: StatusRefreshReport or None = None
+        # Live metrics (traffic, ping) of all components, filled by the collectors
+        self.metrics = MetricsStore()
+        self.metrics_exporter: MetricsExporter or None = None
+        if metrics_port is not None:
+            self.metrics_exporter = MetricsExporter(self, metrics_port)
+            self.metrics_exporter.start()
+        self.ping_prober: PingProber or None = None
 
     def continuous_update(self):
         while not self.stop_updating:
             self.synchronize_topologies()
             self.update_all_status()
+            SSHConnectionPool.get_instance().evict_idle()
             time.sleep(10)
 
     def continuous_ifstat(self, subject: EngineService or EngineNode):
@@ -69,6 +131,48 @@ class Engine(object):
             stop = time.time()
             time.sleep((start - stop + 10) % 1)
 
+    async def continuous_ifstat_async(self, subject: EngineService or EngineNode):
+        while not self.stop_updating:
+            start = time.time()
+            if subject.status == EngineComponentStatus.RUNNING:
+                if len(subject.intfs) > 0:
+                    await self.cmd_ifstat_async(subject.component, 5,
+                                                lambda itf, rx, tx: self._set_ifstat_data(subject, itf, rx, tx))
+            stop = time.time()
+            await asyncio.sleep((start - stop + 10) % 1)
+
+    async def continuous_traffic_async(self, node: EngineNode, interval: float = 1, samples: int = 10):
+        """Streams the traffic of the node and all its running services into the ifstat of their interfaces with one
+           remote collector per node (see TrafficCollectorSSHCommand). The collector is restarted after the given
+           number of samples to pick up services started in the meantime."""
+        while not self.stop_updating:
+            if node.status == EngineComponentStatus.UNREACHABLE:
+                await asyncio.sleep(interval)
+                continue
+            services = [service for service in node.services.values()
+                        if service.status == EngineComponentStatus.RUNNING]
+            cmd = TrafficCollectorSSHCommand(node.component, [service.component for service in services], interval,
+                                             samples, lambda sample: self._set_traffic_data(node, services, sample))
+            start = time.time()
+            await cmd.run_async()
+            if time.time() - start < interval:
+                # The collector failed right away, do not restart it in a tight loop
+                await asyncio.sleep(interval)
+
+    def _set_traffic_data(self, node: EngineNode, services: typing.List[EngineService],
+                          sample: Dict[typing.Tuple[str or None, str], typing.Tuple[int, int]]):
+        node.traffic = {device: rates for (container, device), rates in sample.items() if container is None}
+        t = time.time()
+        for name, intf in node.intfs.items():
+            self._set_intf_traffic(intf, sample.get((None, name), (0, 0)), t)
+        for service in services:
+            if service.status != EngineComponentStatus.RUNNING:
+                continue
+            # Services not running in a container use the devices of the node
+            container = service.component.name if service.component.command_prefix() != "" else None
+            for name, intf in service.intfs.items():
+                self._set_intf_traffic(intf, sample.get((container, name), (0, 0)), t)
+
     def get_status(self, subject: Service or Node) -> EngineComponentStatus:
         if isinstance(subject, Node):
             if subject.name in self.nodes.keys():
@@ -83,35 +187,125 @@ class Engine(object):
         else:
             raise Exception("Subject is neither service nor node")
 
-    def _set_ifstat_data(self, subject: Service or Node, itf: str, rx: int, tx: int):
+    def _set_ifstat_data(self, subject: EngineService or EngineNode, itf: str, rx: int, tx: int):
         if itf in subject.intfs.keys():
-            subject.intfs[itf].ifstat = (rx, tx)
+            self._set_intf_traffic(subject.intfs[itf], (rx, tx))
 
-    def start_all(self):
-        for node in self.nodes.values():
-            if node.status != EngineComponentStatus.UNREACHABLE:
-                self.start(node.component)
-                for service in node.services.values():
-                    self.start(service.component)
+    def _set_intf_traffic(self, intf: EngineInterface, rates: typing.Tuple[int, int], t: float or None = None):
+        intf.ifstat = rates
+        self.metrics.add(intf, Metric.RX, rates[0], t)
+        self.metrics.add(intf, Metric.TX, rates[1], t)
 
-    def stop_all(self):
-        for node in self.nodes.values():
-            if node.status != EngineComponentStatus.UNREACHABLE:
-                for service in node.services.values():
-                    self.stop(service.component)
-                self.stop(node.component)
+    def record_ping(self, source: EngineComponent, target: EngineComponent, command: PingSSHCommand):
+        """Adds the round trip times and the loss of a finished ping to the metrics of the pair."""
+        subject = MetricsStore.get_pair_name(source, target)
+        lost = 0
+        for result in command.ping_results.values():
+            if isinstance(result, str):
+                lost += 1
+            else:
+                self.metrics.add(subject, Metric.PING_RTT, result[1])
+        sent = max(len(command.ping_results), command.packets_transmitted or 0)
+        if sent > 0:
+            self.metrics.add(subject, Metric.PING_LOSS, (sent - len(command.ping_results) + lost) / sent)
+
+    def get_ping_prober(self) -> PingProber:
+        """Returns the prober monitoring ping pairs continuously (started on first use)."""
+        if self.ping_prober is None:
+            self.ping_prober = PingProber(self)
+            self.event_loop.submit(self.ping_prober.run_async())
+        return self.ping_prober
+
+    def start_all(self, progress: typing.Callable[[EngineTask, int, int], None] or None = None):
+        """progress: called whenever a task finished, see EngineScheduler"""
+        if self.deploy_concurrency <= 0:
+            for node in self.nodes.values():
+                if node.status != EngineComponentStatus.UNREACHABLE:
+                    self.start(node.component)
+                    for service in node.services.values():
+                        self.start(service.component)
+            return
+        self._schedule_all("start", self.start, False, progress).run()
+
+    def stop_all(self, progress: typing.Callable[[EngineTask, int, int], None] or None = None):
+        if self.deploy_concurrency <= 0:
+            for node in self.nodes.values():
+                if node.status != EngineComponentStatus.UNREACHABLE:
+                    for service in node.services.values():
+                        self.stop(service.component)
+                    self.stop(node.component)
+            return
+        self._schedule_all("stop", self.stop, True, progress).run()
 
-    def destroy_all(self):
+    def destroy_all(self, progress: typing.Callable[[EngineTask, int, int], None] or None = None):
+        if self.deploy_concurrency <= 0:
+            for node in self.nodes.values():
+                if node.status != EngineComponentStatus.UNREACHABLE:
+                    for service in node.services.values():
+                        self.destroy(service.component)
+                    self.destroy(node.component)
+            return
+        self._schedule_all("destroy", self.destroy, True, progress).run()
+
+    def get_configuration_builder(self, topo: Topo, node: Node) -> CachedConfigurationBuilder:
+        """Returns the (cached) configuration builder of node in topo, claiming containers from the warm pool of this
+           engine if there is one."""
+        return topo.get_configuration_builder(node, self.warm_pool is not None, self.launch_containers)
+
+    def _get_reachable_nodes(self) -> typing.List[Node]:
+        return [node.component for node in self.nodes.values() if node.status != EngineComponentStatus.UNREACHABLE]
+
+    def _schedule_all(self, action: str, function: typing.Callable[[Node or Service], None], reverse: bool,
+                      progress: typing.Callable[[EngineTask, int, int], None] or None) -> EngineScheduler:
+        """Creates the task graph for an action on all reachable nodes and services. The node base network is
+           handled before its services when starting (reverse=False) and after them otherwise. The same applies
+           to the dependencies between services (see get_start_dependencies)."""
+        scheduler = EngineScheduler(self.deploy_concurrency, progress)
         for node in self.nodes.values():
-            if node.status != EngineComponentStatus.UNREACHABLE:
-                for service in node.services.values():
-                    self.destroy(service.component)
-                self.destroy(node.component)
+            if node.status == EngineComponentStatus.UNREACHABLE:
+                continue
+            node_task = scheduler.add(EngineTask(f"{action} node {node.get_name()}", node.get_name(),
+                                                 functools.partial(function, node.component)))
+            for service in node.services.values():
+                task = scheduler.add(EngineTask(f"{action} {service.get_name()}", node.get_name(),
+                                                functools.partial(function, service.component)))
+                if reverse:
+                    node_task.depends_on(task)
+                else:
+                    task.depends_on(node_task)
+        for node in self.nodes.values():
+            for service in node.services.values():
+                task = scheduler.get(f"{action} {service.get_name()}")
+                if not task:
+                    continue
+                for other in self.get_start_dependencies(service.component):
+                    other_task = scheduler.get(f"{action} {other.name}")
+                    if not other_task:
+                        continue
+                    if reverse:
+                        other_task.depends_on(task)
+                    else:
+                        task.depends_on(other_task)
+        return scheduler
+
+    def get_start_dependencies(self, service: Service) -> typing.List[Service]:
+        """Returns the services that need to be started before the given service: the controllers of a switch and,
+           for a wireguard tunnel, the peer with the lower name (so both ends are never configured concurrently)."""
+        ret = []
+        if isinstance(service, Switch):
+            ret += service.controllers
+        for ext in service.extensions.values():
+            if isinstance(ext, WireguardServiceExtension) and ext.remote_service_name < service.name \
+                    and ext.remote_service_name in self.topo.services.keys():
+                ret.append(self.topo.services[ext.remote_service_name])
+        return ret
 
     def start(self, component: Node or Service):
         if isinstance(component, Node):
             node = self.nodes[component.name]
             if node.status != EngineComponentStatus.UNREACHABLE:
+                if self.warm_pool:
+                    self.warm_pool.resume(node.component)
                 is_already_created = False
                 for service in node.services.values():
                     if service.status == EngineComponentStatus.RUNNING or service.status == EngineComponentStatus.STOPPED:
@@ -119,9 +313,8 @@ class Engine(object):
                         break
                 if is_already_created:
                     return
-                config = node.component.get_configuration_builder(self.topo).build()
-                exporter = SSHConfigurationExporter(config, node.component)
-                exporter.start_node(self.topo, node.component.get_configuration_builder(self.topo))
+                exporter = SSHConfigurationExporter(Configuration(), node.component, self.batch_commands)
+                exporter.start_node(self.topo, self.get_configuration_builder(self.topo, node.component))
                 node.status = EngineComponentStatus.RUNNING
             else:
                 raise Exception(f"Can not start node {component.name} because it is currently unreachable")
@@ -130,14 +323,16 @@ class Engine(object):
             if self.nodes[component.executor.name].status != EngineComponentStatus.RUNNING:
                 self.start(component.executor)
             if service.status == EngineComponentStatus.REMOVED:
-                config = component.executor.get_configuration_builder(self.topo).build()
-                exporter = SSHConfigurationExporter(config, component.executor)
-                exporter.create(self.topo, component.executor.get_configuration_builder(self.topo), service.component)
+                exporter = SSHConfigurationExporter(Configuration(), component.executor, self.batch_commands)
+                exporter.create(self.topo, self.get_configuration_builder(self.topo, component.executor),
+                                service.component)
                 service.status = EngineComponentStatus.RUNNING
+                if self.warm_pool:
+                    self.warm_pool.notify()
             elif service.status == EngineComponentStatus.STOPPED:
-                config = component.executor.get_configuration_builder(self.topo).build()
-                exporter = SSHConfigurationExporter(config, component.executor)
-                exporter.start(self.topo, component.executor.get_configuration_builder(self.topo), service.component)
+                exporter = SSHConfigurationExporter(Configuration(), component.executor, self.batch_commands)
+                exporter.start(self.topo, self.get_configuration_builder(self.topo, component.executor),
+                               service.component)
                 service.status = EngineComponentStatus.RUNNING
             elif service.status == EngineComponentStatus.UNREACHABLE:
                 raise Exception(f"Can not start service {component.name} because it is currently unreachable")
@@ -154,9 +349,9 @@ class Engine(object):
         elif isinstance(component, Service):
             service = self.nodes[component.executor.name].services[component.name]
             if service.status == EngineComponentStatus.RUNNING:
-                config = component.executor.get_configuration_builder(self.topo).build()
-                exporter = SSHConfigurationExporter(config, component.executor)
-                exporter.stop(self.topo, component.executor.get_configuration_builder(self.topo), service.component)
+                exporter = SSHConfigurationExporter(Configuration(), component.executor, self.batch_commands)
+                exporter.stop(self.topo, self.get_configuration_builder(self.topo, component.executor),
+                              service.component)
                 service.status = EngineComponentStatus.STOPPED
             elif service.status == EngineComponentStatus.UNREACHABLE:
                 raise Exception(f"Can not stop service {component.name} because it is currently unreachable")
@@ -167,18 +362,20 @@ class Engine(object):
             if node.status != EngineComponentStatus.UNREACHABLE:
                 for service in node.services:
                     self.destroy(service)
-                config = node.component.get_configuration_builder(self.topo).build()
-                exporter = SSHConfigurationExporter(config, node.component)
-                exporter.stop_node(self.topo, node.component.get_configuration_builder(self.topo))
+                exporter = SSHConfigurationExporter(Configuration(), node.component, self.batch_commands)
+                exporter.stop_node(self.topo, self.get_configuration_builder(self.topo, node.component))
+                if self.warm_pool:
+                    # Do not leave pooled containers behind on a node the testbed is gone from
+                    self.warm_pool.drain(node.component)
                 node.status = EngineComponentStatus.REMOVED
             else:
                 raise Exception(f"Can not destroy node {component.name} because it is currently unreachable")
         elif isinstance(component, Service):
             service = self.nodes[component.executor.name].services[component.name]
             if service.status == EngineComponentStatus.RUNNING or service.status == EngineComponentStatus.STOPPED:
-                config = component.executor.get_configuration_builder(self.topo).build()
-                exporter = SSHConfigurationExporter(config, component.executor)
-                exporter.remove(self.topo, component.executor.get_configuration_builder(self.topo), service.component)
+                exporter = SSHConfigurationExporter(Configuration(), component.executor, self.batch_commands)
+                exporter.remove(self.topo, self.get_configuration_builder(self.topo, component.executor),
+                                service.component)
                 service.status = EngineComponentStatus.REMOVED
             elif service.status == EngineComponentStatus.UNREACHABLE:
                 raise Exception(f"Can not destroy service {component.name} because it is currently unreachable")
@@ -188,19 +385,18 @@ class Engine(object):
         if isinstance(old_component, Node):
             node = self.nodes[old_component.name]
             if node.status == EngineComponentStatus.RUNNING or node.status == EngineComponentStatus.STOPPED:
-                old_builder = old_component.get_configuration_builder(old_topo)
-                old_config = old_builder.build()
-                exporter = SSHConfigurationExporter(old_config, old_component)
-                exporter.regress_node(old_topo, old_builder, new_component.get_configuration_builder(new_topo))
+                exporter = SSHConfigurationExporter(Configuration(), old_component, self.batch_commands)
+                exporter.regress_node(old_topo, self.get_configuration_builder(old_topo, old_component),
+                                      self.get_configuration_builder(new_topo, new_component))
             elif node.status == EngineComponentStatus.UNREACHABLE:
                 raise Exception(f"Can not regress node {old_component.name} because it is currently unreachable")
         elif isinstance(old_component, Service):
             service = self.nodes[old_component.executor.name].services[old_component.name]
             if service.status == EngineComponentStatus.RUNNING or service.status == EngineComponentStatus.STOPPED:
-                old_config = old_component.get_configuration_builder(old_topo).build()
-                exporter = SSHConfigurationExporter(old_config, old_component)
-                exporter.regress(old_topo, new_component.get_configuration_builder(new_topo), old_component,
-                                 new_component)
+                exporter = SSHConfigurationExporter(Configuration(), old_component.executor, self.batch_commands)
+                exporter.regress(old_topo, self.get_configuration_builder(old_topo, old_component.executor),
+                                 self.get_configuration_builder(new_topo, new_component.executor),
+                                 old_component, new_component)
             elif service.status == EngineComponentStatus.UNREACHABLE:
                 raise Exception(f"Can not regress service {old_component.name} because it is currently unreachable")
 
@@ -210,39 +406,122 @@ class Engine(object):
             node = self.nodes[new_component.name]
             node.component = new_component
             if node.status == EngineComponentStatus.RUNNING or node.status == EngineComponentStatus.STOPPED:
-                new_builder = new_component.get_configuration_builder(new_topo)
-                new_config = new_builder.build()
-                exporter = SSHConfigurationExporter(new_config, new_component)
-                exporter.advance_node(new_topo, old_component.get_configuration_builder(old_topo), new_builder)
+                exporter = SSHConfigurationExporter(Configuration(), new_component, self.batch_commands)
+                exporter.advance_node(new_topo, self.get_configuration_builder(old_topo, old_component),
+                                      self.get_configuration_builder(new_topo, new_component))
             elif node.status == EngineComponentStatus.UNREACHABLE:
                 raise Exception(f"Can not advance node {new_component.name} because it is currently unreachable")
         elif isinstance(new_component, Service):
             service = self.nodes[new_component.executor.name].services[new_component.name]
             service.component = new_component
             if service.status == EngineComponentStatus.RUNNING or service.status == EngineComponentStatus.STOPPED:
-                new_config = new_component.get_configuration_builder(new_topo).build()
-                exporter = SSHConfigurationExporter(new_config, new_component)
-                exporter.advance(new_topo, new_component.get_configuration_builder(new_topo), old_component,
-                                 new_component)
+                exporter = SSHConfigurationExporter(Configuration(), new_component.executor, self.batch_commands)
+                exporter.advance(new_topo, self.get_configuration_builder(old_topo, old_component.executor),
+                                 self.get_configuration_builder(new_topo, new_component.executor),
+                                 old_component, new_component)
             elif service.status == EngineComponentStatus.UNREACHABLE:
                 raise Exception(f"Can not advance service {new_component.name} because it is currently unreachable")
 
     def update_all_status(self):
+        if self.status_concurrency > 0:
+            self.event_loop.run(self.update_all_status_async())
+            return
+        report = StatusRefreshReport(1)
         for node in self.nodes.values():
-            node.status = self.check_node_reachable(node.component)
-            self.update_node_status(node)
+            start = time.time()
+            if self.batched_status:
+                self.probe_node_status(node)
+            else:
+                node.status = self.check_node_reachable(node.component)
+                self.update_node_status(node)
+            report.add_node(node.get_name(), time.time() - start)
+        report.finish()
+        self.last_status_report = report
+
+    async def update_all_status_async(self):
+        report = StatusRefreshReport(self.status_concurrency)
+        await asyncio.gather(*[self._update_node_async(node, report) for node in list(self.nodes.values())])
+        report.finish()
+        self.last_status_report = report
+
+    async def _update_node_async(self, node: EngineNode, report: StatusRefreshReport):
+        start = time.time()
+        limit = asyncio.Semaphore(self.status_concurrency)
+        if self.batched_status:
+            await self.probe_node_status_async(node, limit, report)
+        else:
+            node.status = await self.check_node_reachable_async(node.component, limit, report)
+            await self.update_node_status_async(node, limit, report)
+        report.add_node(node.get_name(), time.time() - start)
+
+    async def _run_limited(self, command: 'SSHCommand', limit: asyncio.Semaphore, report: StatusRefreshReport,
+                           description: str):
+        async with limit:
+            start = time.time()
+            await command.run_async()
+            report.add_command(description, command.node.name, time.time() - start)
+        return command
+
+    def probe_node_status(self, node: EngineNode):
+        command = self.cmd_ping(self.local_node, node.component, 1)
+        if command.packets_received == 0:
+            self._apply_status_probe(node, None)
+            return
+        json = self.use_json_status(node.component)
+        probe = self._status_probe_command(node, json)
+        probe.run()
+        if json and not probe.is_json_valid():
+            probe = self._status_probe_command(node, False)
+            probe.run()
+            self._on_json_fallback(node.component, len(probe.host_ip_addr.results) > 0)
+        self._apply_status_probe(node, probe)
+
+    async def probe_node_status_async(self, node: EngineNode, limit: asyncio.Semaphore,
+                                      report: StatusRefreshReport):
+        command = await self._run_limited(self._ping_command(self.local_node, node.component, 1, None), limit, report,
+                                          f"ping {node.get_name()}")
+        if command.packets_received == 0:
+            self._apply_status_probe(node, None)
+            return
+        json = self.use_json_status(node.component)
+        probe = self._status_probe_command(node, json)
+        await self._run_limited(probe, limit, report, f"status probe {node.get_name()}")
+        if json and not probe.is_json_valid():
+            probe = self._status_probe_command(node, False)
+            await self._run_limited(probe, limit, report, f"status probe {node.get_name()}")
+            self._on_json_fallback(node.component, len(probe.host_ip_addr.results) > 0)
+        self._apply_status_probe(node, probe)
+
+    def _status_probe_command(self, node: EngineNode, json: bool) -> StatusProbeSSHCommand:
+        return StatusProbeSSHCommand(node.component, [service.component for service in node.services.values()], json)
+
+    def _apply_status_probe(self, node: EngineNode, probe: StatusProbeSSHCommand or None):
+        if probe is None:
+            node.status = EngineComponentStatus.UNREACHABLE
+        else:
+            node.status = self._check_bind_names(node.component, probe.host_ip_addr)
+        if node.status == EngineComponentStatus.RUNNING:
+            self._apply_container_status(node, probe.lxc)
+        else:
+            for service in node.services.values():
+                service.status = node.status
+        if node.status == EngineComponentStatus.RUNNING:
+            if len(node.intfs) > 0:
+                self._apply_interface_status(node, probe.host_ip_addr, probe.host_tc_qdisc)
+        else:
+            self._reset_interface_status(node)
+        for service in node.services.values():
+            name = service.component.name
+            if service.status != EngineComponentStatus.RUNNING or name not in probe.tc_qdisc.keys():
+                self._reset_interface_status(service)
+            elif len(service.intfs) > 0:
+                self._apply_interface_status(service, probe.ip_addr[name], probe.tc_qdisc[name])
 
     def update_node_status(self, node: EngineNode):
         if node.status == EngineComponentStatus.RUNNING:
             command = self.cmd_lxc_container_list(node.component)
+            self._apply_container_status(node, command)
             for service in node.services.values():
-                if service.component.name in command.results.keys():
-                    if command.results[service.component.name] == LXCContainerStatus.STOPPED:
-                        service.status = EngineComponentStatus.STOPPED
-                    elif command.results[service.component.name] == LXCContainerStatus.RUNNING:
-                        service.status = EngineComponentStatus.RUNNING
-                else:
-                    service.status = EngineComponentStatus.REMOVED
                 self.update_service_status(service)
         else:
             for service in node.services.values():
@@ -251,6 +530,30 @@ class Engine(object):
         self.update_interface_status(node)
         pass
 
+    async def update_node_status_async(self, node: EngineNode, limit: asyncio.Semaphore,
+                                       report: StatusRefreshReport):
+        if node.status == EngineComponentStatus.RUNNING:
+            command = await self._run_status_command_async(
+                node.component, LxcContainerListJsonCommand(node.component), LxcContainerListCommand(node.component),
+                lambda c: self._run_limited(c, limit, report, "lxc ls"))
+            self._apply_container_status(node, command)
+        else:
+            for service in node.services.values():
+                service.status = node.status
+        await asyncio.gather(self.update_interface_status_async(node, limit, report),
+                             *[self.update_interface_status_async(service, limit, report)
+                               for service in node.services.values()])
+
+    def _apply_container_status(self, node: EngineNode, command: LxcContainerListCommand):
+        for service in node.services.values():
+            if service.component.name in command.results.keys():
+                if command.results[service.component.name] == LXCContainerStatus.STOPPED:
+                    service.status = EngineComponentStatus.STOPPED
+                elif command.results[service.component.name] == LXCContainerStatus.RUNNING:
+                    service.status = EngineComponentStatus.RUNNING
+            else:
+                service.status = EngineComponentStatus.REMOVED
+
     def update_service_status(self, service: EngineService):
         if service.status == EngineComponentStatus.UNREACHABLE:
             self.update_interface_status(service)
@@ -264,104 +567,279 @@ class Engine(object):
                 return
             command = self.cmd_ip_addr(component.component)
             tcqdisc = self.cmd_tc_qdisc(component.component)
-            for intf in component.intfs.values():
-                found = False
-                for name, state, addr, ipaddr in command.results.values():
-                    if name == intf.component.name:
-                        found = True
-                        if state == InterfaceState.UP or state == InterfaceState.UNKNOWN:
-                            intf.status = EngineComponentStatus.RUNNING
-                        else:
-                            intf.status = EngineComponentStatus.STOPPED
-                        intf.interface_state = EngineInterfaceState[state.name]
-                        intf.live_mac = addr
-                        intf.live_ips = ipaddr
-                        if name in tcqdisc.results.keys():
-                            intf.tcqdisc = tcqdisc.results[name]
-                        else:
-                            intf.tcqdisc = (0, 0, 0, 0, 0)
-                        break
-                if not found:
-                    intf.status = EngineComponentStatus.REMOVED
-                    intf.interface_state = EngineInterfaceState.UNKNOWN
-                    intf.live_mac = None
-                    intf.live_ips = []
+            self._apply_interface_status(component, command, tcqdisc)
         else:
-            for intf in component.intfs.values():
-                intf.status = EngineComponentStatus.UNREACHABLE
+            self._reset_interface_status(component)
+        pass
+
+    async def update_interface_status_async(self, component: EngineNode or EngineService,
+                                            limit: asyncio.Semaphore, report: StatusRefreshReport):
+        if component.status == EngineComponentStatus.RUNNING:
+            if len(component.intfs) == 0:
+                return
+            node = self._get_status_node(component.component)
+            command, tcqdisc = await asyncio.gather(
+                self._run_status_command_async(
+                    node, IpAddrJsonSSHCommand(component.component), IpAddrSSHCommand(component.component),
+                    lambda c: self._run_limited(c, limit, report, f"ip addr {component.get_name()}")),
+                self._run_status_command_async(
+                    node, TcQdiscJsonSSHCommand(component.component), TcQdiscSSHCommand(component.component),
+                    lambda c: self._run_limited(c, limit, report, f"tc qdisc {component.get_name()}")))
+            self._apply_interface_status(component, command, tcqdisc)
+        else:
+            self._reset_interface_status(component)
+
+    def _apply_interface_status(self, component: EngineNode or EngineService, command: IpAddrSSHCommand,
+                                tcqdisc: TcQdiscSSHCommand):
+        for intf in component.intfs.values():
+            found = False
+            for name, state, addr, ipaddr in command.results.values():
+                if name == intf.component.name:
+                    found = True
+                    if state == InterfaceState.UP or state == InterfaceState.UNKNOWN:
+                        intf.status = EngineComponentStatus.RUNNING
+                    else:
+                        intf.status = EngineComponentStatus.STOPPED
+                    intf.interface_state = EngineInterfaceState[state.name]
+                    intf.live_mac = addr
+                    intf.live_ips = ipaddr
+                    if name in tcqdisc.results.keys():
+                        intf.tcqdisc = tcqdisc.results[name]
+                    else:
+                        intf.tcqdisc = (0, 0, 0, 0, 0)
+                    break
+            if not found:
+                intf.status = EngineComponentStatus.REMOVED
                 intf.interface_state = EngineInterfaceState.UNKNOWN
                 intf.live_mac = None
                 intf.live_ips = []
-                intf.tcqdisc = (0, 0, 0, 0, 0)
-                intf.ifstat = None
-        pass
+
+    def _reset_interface_status(self, component: EngineNode or EngineService):
+        for intf in component.intfs.values():
+            intf.status = EngineComponentStatus.UNREACHABLE
+            intf.interface_state = EngineInterfaceState.UNKNOWN
+            intf.live_mac = None
+            intf.live_ips = []
+            intf.tcqdisc = (0, 0, 0, 0, 0)
+            intf.ifstat = None
 
     def check_node_reachable(self, node: Node) -> EngineComponentStatus:
         command = self.cmd_ping(self.local_node, node, 1)
         if command.packets_received == 0:
             return EngineComponentStatus.UNREACHABLE
         else:
-            command = self.cmd_ip_addr(node)
-            bind_names = []
-            self.topo.network_implementation.generate(node, Configuration())
-            for link in self.topo.links:
-                if link.service1 and link.service1.executor == node and link.intf1.bind_name:
-                    bind_names.append(link.intf1.bind_name)
-                elif link.service2 and link.service2.executor == node and link.intf2.bind_name:
-                    bind_names.append(link.intf2.bind_name)
-            for bind_name in bind_names:
-                if bind_name not in [x[0] for x in command.results.values()]:
-                    return EngineComponentStatus.REMOVED
-            return EngineComponentStatus.RUNNING
+            return self._check_bind_names(node, self.cmd_ip_addr(node))
+
+    async def check_node_reachable_async(self, node: Node, limit: asyncio.Semaphore,
+                                         report: StatusRefreshReport) -> EngineComponentStatus:
+        command = await self._run_limited(self._ping_command(self.local_node, node, 1, None), limit, report,
+                                          f"ping {node.name}")
+        if command.packets_received == 0:
+            return EngineComponentStatus.UNREACHABLE
+        else:
+            command = await self._run_status_command_async(
+                node, IpAddrJsonSSHCommand(node), IpAddrSSHCommand(node),
+                lambda c: self._run_limited(c, limit, report, f"ip addr {node.name}"))
+            return self._check_bind_names(node, command)
+
+    def _check_bind_names(self, node: Node, command: IpAddrSSHCommand) -> EngineComponentStatus:
+        bind_names = []
+        self.topo.network_implementation.generate(node, Configuration())
+        for link in self.topo.get_node_links(node):
+            if link.service1 and link.service1.executor == node and link.intf1.bind_name:
+                bind_names.append(link.intf1.bind_name)
+            elif link.service2 and link.service2.executor == node and link.intf2.bind_name:
+                bind_names.append(link.intf2.bind_name)
+        for bind_name in bind_names:
+            if bind_name not in [x[0] for x in command.results.values()]:
+                return EngineComponentStatus.REMOVED
+        return EngineComponentStatus.RUNNING
+
+    def use_json_status(self, node: Node) -> bool:
+        return self.json_status_nodes.get(node.name, self.json_status)
+
+    def _get_status_node(self, source: Service or Node) -> Node:
+        return source.executor if isinstance(source, Service) else source
+
+    def _run_status_command(self, node: Node, json_command: SSHCommand, text_command: SSHCommand):
+        """Runs json_command if enabled for the node, falling back to text_command if its output is invalid."""
+        if self.use_json_status(node):
+            json_command.run()
+            if json_command.valid:
+                return json_command
+        text_command.run()
+        self._on_json_fallback(node, text_command.exit_code == 0)
+        return text_command
+
+    async def _run_status_command_async(self, node: Node, json_command: SSHCommand, text_command: SSHCommand,
+                                        run: typing.Callable[[SSHCommand], typing.Awaitable]):
+        if self.use_json_status(node):
+            await run(json_command)
+            if json_command.valid:
+                return json_command
+        await run(text_command)
+        self._on_json_fallback(node, text_command.exit_code == 0)
+        return text_command
+
+    def _on_json_fallback(self, node: Node, text_succeeded: bool):
+        # Unreachable nodes produce invalid json as well, so only nodes answering in text are switched over
+        if self.use_json_status(node) and text_succeeded:
+            self.json_status_nodes[node.name] = False
 
     def cmd_ifstat(self, source: Service or Node, timeout: int = 5, consumer=None) -> IfstatSSHCommand:
         command = IfstatSSHCommand(source, timeout, consumer)
         command.run()
         return command
 
-    def cmd_tc_qdisc(self, source: Service or Node) -> TcQdiscSSHCommand:
-        command = TcQdiscSSHCommand(source)
-        command.run()
+    async def cmd_ifstat_async(self, source: Service or Node, timeout: int = 5, consumer=None) -> IfstatSSHCommand:
+        command = IfstatSSHCommand(source, timeout, consumer)
+        await command.run_async()
         return command
 
+    def cmd_tc_qdisc(self, source: Service or Node) -> TcQdiscSSHCommand:
+        return self._run_status_command(self._get_status_node(source), TcQdiscJsonSSHCommand(source),
+                                        TcQdiscSSHCommand(source))
+
+    async def cmd_tc_qdisc_async(self, source: Service or Node) -> TcQdiscSSHCommand:
+        return await self._run_status_command_async(self._get_status_node(source), TcQdiscJsonSSHCommand(source),
+                                                    TcQdiscSSHCommand(source), lambda c: c.run_async())
+
     def cmd_iperf(self, source: Service, target: Service, target_device: Service or Interface, port: int = 1337,
                   interval_seconds: int = 1,
                   time_seconds: int = 10, server_options: str = "", client_options: str = "",
                   consumer=None) -> IperfClientSSHCommand:
+        command = self._iperf_command(source, target, target_device, port, interval_seconds, time_seconds,
+                                      server_options, client_options, consumer)
+        command.run()
+        return command.client
+
+    async def cmd_iperf_async(self, source: Service, target: Service, target_device: Service or Interface,
+                              port: int = 1337, interval_seconds: int = 1,
+                              time_seconds: int = 10, server_options: str = "", client_options: str = "",
+                              consumer=None) -> IperfClientSSHCommand:
+        command = self._iperf_command(source, target, target_device, port, interval_seconds, time_seconds,
+                                      server_options, client_options, consumer)
+        await command.run_async()
+        return command.client
+
+    def _iperf_command(self, source: Service, target: Service, target_device: Service or Interface, port: int,
+                       interval_seconds: int, time_seconds: int, server_options: str, client_options: str,
+                       consumer) -> IperfSSHCommand:
         target_ip = self.calculate_ip(source, target_device)
         if not target_ip:
             raise Exception("Target not reachable")
-        command = IperfSSHCommand(source, target, str(target_ip), port, interval_seconds, time_seconds,
-                                  server_options, client_options, consumer)
-        command.run()
-        return command.client
+        return IperfSSHCommand(source, target, str(target_ip), port, interval_seconds, time_seconds,
+                               server_options, client_options, consumer)
 
     def cmd_lxc_container_list(self, source: Node) -> LxcContainerListCommand:
-        command = LxcContainerListCommand(source)
-        command.run()
-        return command
+        return self._run_status_command(self._get_status_node(source), LxcContainerListJsonCommand(source),
+                                        LxcContainerListCommand(source))
+
+    async def cmd_lxc_container_list_async(self, source: Node) -> LxcContainerListCommand:
+        return await self._run_status_command_async(self._get_status_node(source), LxcContainerListJsonCommand(source),
+                                                    LxcContainerListCommand(source), lambda c: c.run_async())
 
     def cmd_ip_addr(self, source: Service or Node) -> IpAddrSSHCommand:
-        command = IpAddrSSHCommand(source)
-        command.run()
-        return command
+        return self._run_status_command(self._get_status_node(source), IpAddrJsonSSHCommand(source),
+                                        IpAddrSSHCommand(source))
+
+    async def cmd_ip_addr_async(self, source: Service or Node) -> IpAddrSSHCommand:
+        return await self._run_status_command_async(self._get_status_node(source), IpAddrJsonSSHCommand(source),
+                                                    IpAddrSSHCommand(source), lambda c: c.run_async())
 
     def cmd_ping(self, source: Service or Node, target: Service or Node or Interface, count: int or None = 4,
                  consumer=None) -> PingSSHCommand:
+        command = self._ping_command(source, target, count, consumer)
+        command.run()
+        return command
+
+    async def cmd_ping_async(self, source: Service or Node, target: Service or Node or Interface,
+                             count: int or None = 4, consumer=None) -> PingSSHCommand:
+        command = self._ping_command(source, target, count, consumer)
+        await command.run_async()
+        return command
+
+    def _ping_command(self, source: Service or Node, target: Service or Node or Interface, count: int or None,
+                      consumer) -> PingSSHCommand:
+        return PingSSHCommand(source, self.get_ping_target(source, target), count, consumer)
+
+    def get_ping_target(self, source: Service or Node, target: Service or Node or Interface) -> str:
+        """Returns the address source has to ping to reach target."""
         if isinstance(source, Service) and (isinstance(target, Service) or isinstance(target, Interface)):
             target_ip = self.calculate_ip(source, target)
             if not target_ip:
                 raise Exception("Target not reachable")
-            command = PingSSHCommand(source, str(target_ip), count, consumer)
+            return str(target_ip)
         elif isinstance(source, Node) and isinstance(target, Node):
             remote = target.ssh_remote
             while remote.__contains__("@"):
                 remote = remote.split("@")[1]
-            command = PingSSHCommand(source, remote, count, consumer)
+            return remote
         else:
             raise Exception("Can only ping cross service or cross node, not between service and node")
-        command.run()
-        return command
+
+    def measure_latency_matrix(self, services: typing.List[Service], count: int = 4, concurrency: int = 4,
+                               targets: typing.List[Service] or None = None, interval: float = 0.2) -> LatencyMatrix:
+        """Pings from every service to every target (to every other service if targets is None).
+           count: number of pings per pair
+           concurrency: maximum concurrent pings per node (nodes are always handled in parallel)
+           interval: seconds between two pings of a pair (ping requires root for less than 0.2)"""
+        return self.event_loop.run(self.measure_latency_matrix_async(services, count, concurrency, targets, interval))
+
+    async def measure_latency_matrix_async(self, services: typing.List[Service], count: int = 4,
+                                           concurrency: int = 4, targets: typing.List[Service] or None = None,
+                                           interval: float = 0.2) -> LatencyMatrix:
+        targets = targets if targets is not None else services
+        matrix = LatencyMatrix([service.name for service in services], [target.name for target in targets])
+        limits: Dict[str, asyncio.Semaphore] = {}
+        pings = []
+        for source in services:
+            if source.executor.name in self.nodes.keys() \
+                    and self.nodes[source.executor.name].status == EngineComponentStatus.UNREACHABLE:
+                for target in targets:
+                    if target is not source:
+                        matrix.add(LatencyMatrixEntry(source.name, target.name, error="Node unreachable"))
+                continue
+            ips = self.get_reachable_services(source)
+            limit = limits.setdefault(source.executor.name, asyncio.Semaphore(max(1, concurrency)))
+            for target in targets:
+                if target is source:
+                    continue
+                if target.name not in ips.keys():
+                    matrix.add(LatencyMatrixEntry(source.name, target.name, error="Target not reachable"))
+                    continue
+                pings.append(self._ping_limited(matrix, source, target, str(ips[target.name]), count, interval,
+                                                limit))
+        await asyncio.gather(*pings)
+        return matrix
+
+    async def _ping_limited(self, matrix: LatencyMatrix, source: Service, target: Service, target_ip: str,
+                            count: int, interval: float, limit: asyncio.Semaphore):
+        async with limit:
+            # Bound the duration of pings without reply
+            command = PingSSHCommand(source, target_ip, count, None, interval, math.ceil(count * interval) + 2)
+            await command.run_async()
+        matrix.add(LatencyMatrixEntry.from_command(source.name, target.name, command))
+        engine_source = self._get_engine_service(source)
+        engine_target = self._get_engine_service(target)
+        if engine_source and engine_target:
+            self.record_ping(engine_source, engine_target, command)
+
+    def _get_engine_service(self, service: Service) -> EngineService or None:
+        if service.executor.name not in self.nodes.keys():
+            return None
+        return self.nodes[service.executor.name].services.get(service.name, None)
+
+    def get_reachable_services(self, source: Service) -> Dict[str, ipaddress.ip_address]:
+        """Returns the ip calculate_ip would choose for every service reachable from source, from a single walk over
+           its (cached) routing table."""
+        ret = {source.name: ipaddress.ip_address("127.0.0.1")}
+        index = self.topo.get_index()
+        for ip in source.build_routing_table(True).keys():
+            for service, intf in index.get_ip_owners(ip):
+                if service.name not in ret.keys():
+                    ret[service.name] = ip
+        return ret
 
     def cmd_set_iface_state(self, target: EngineInterface, state: EngineInterfaceState):
         cmd = f"ip link set dev {target.component.name} {state.name.lower()}"
@@ -427,16 +905,17 @@ class Engine(object):
     def write_topology_to_all(self, topo: Topo):
         # Write with lock
         content = topo.export_topo()
+        digest = topo.get_digest(True)
         path = "/tmp/flush_topo.json"
         f = open(path, "w")
         f.write(content)
         f.close()
         for node in topo.nodes.values():
-            cmd = LockWriteSSHCommand(node, "/tmp", "current_topology.json", path)
+            cmd = LockWriteSSHCommand(node, "/tmp", "current_topology.json", path, digest, Topo.DIGEST_SUFFIX)
             cmd.run()
         for service in topo.services.values():
             if isinstance(service, TestbedService):
-                cmd = LockWriteSSHCommand(service, "/tmp", "current_topology.json", path)
+                cmd = LockWriteSSHCommand(service, "/tmp", "current_topology.json", path, digest, Topo.DIGEST_SUFFIX)
                 cmd.run()
         os.remove(path)
 
@@ -444,6 +923,10 @@ class Engine(object):
         return self.nodes.get(self.local_node.name)
 
     def synchronize_topologies(self):
+        # Only download and parse the topology if its digest changed (or there is no digest)
+        digest = self.get_local_node().read_topology_digest()
+        if digest is not None and digest == self.topo.get_digest(True):
+            return
         new_topo = self.get_local_node().read_topology()
         if new_topo:
             if not new_topo.eq_without_gui(self.topo):
@@ -469,13 +952,18 @@ class Engine(object):
             raise Exception("Testbed is already being edited!")
         self.altered_topo = Topo.import_topo(self.topo.export_topo())
 
-    def flush_topology_changes(self):
+    def flush_topology_changes(self) -> TopologyDiff:
+        """Deploys the changes made since begin_topology_changes. Only services and nodes touched by the change (see
+           TopologyDiff) are regenerated and reconfigured. Returns the applied change set."""
         if not self.altered_topo:
             raise Exception("Testbed has not been edited!")
         old_topo = self.topo
+        # The topology may have been edited directly, do not reuse any cached results
+        self.altered_topo.changed()
         self.write_topology_to_all(self.altered_topo)
         self.topo = self.altered_topo
         self.altered_topo = None
+        diff = TopologyDiff(old_topo, self.topo)
         # Now build and deploy differences
         # 1) Delete all removed services/nodes, or services that have been altered around core parameters (node, cpu, ...)
         # 2) Build back all changed services/nodes
@@ -484,16 +972,16 @@ class Engine(object):
 
         # 1a) Services
         destroyed_services: [str] = []
-        for x in old_topo.services.keys():
-            old_service = old_topo.services.get(x)
-            if x not in self.topo.services.keys():
-                # Service got removed
-                self.destroy(old_service)
-                del self.nodes[old_service.executor.name].services[old_service.name]
-                self.on_component_change(old_service, None)
-                continue
-            new_service = self.topo.services.get(x)
-            if old_service.executor.name is not new_service.executor.name or type(old_service) != type(new_service):
+        for change in diff.get_changes(diff.services, ChangeType.REMOVED):
+            # Service got removed
+            old_service = change.old
+            self.destroy(old_service)
+            del self.nodes[old_service.executor.name].services[old_service.name]
+            self.on_component_change(old_service, None)
+        for change in diff.get_changes(diff.services, ChangeType.MODIFIED):
+            old_service = change.old
+            new_service = change.new
+            if old_service.executor.name != new_service.executor.name or type(old_service) != type(new_service):
                 destroyed_services.append(old_service.name)
                 self.destroy(old_service)
                 continue
@@ -507,16 +995,15 @@ class Engine(object):
                     continue
 
         # 1b) Nodes
-        for x in old_topo.nodes.keys():
-            if x not in self.topo.nodes.keys():
-                self.destroy(old_topo.nodes.get(x))
+        for change in diff.get_changes(diff.nodes, ChangeType.REMOVED):
+            self.destroy(change.old)
+
+        affected_services = [x for x in diff.get_affected_services() if x not in destroyed_services]
+        affected_nodes = diff.get_affected_nodes()
 
         # 2a) Build back services that are currently started or stopped
-        for x in old_topo.services.keys():
-            old_service = old_topo.services.get(x)
-            if x in self.topo.services.keys():
-                new_service = self.topo.services.get(x)
-                self.regress(old_topo, old_service, self.topo, new_service)
+        for x in affected_services:
+            self.regress(old_topo, old_topo.services.get(x), self.topo, self.topo.services.get(x))
 
         # 2b) Build back nodes that are currently reachable
         # +3a) Advance nodes that are currently reachable
@@ -524,35 +1011,51 @@ class Engine(object):
             old_node = old_topo.nodes.get(x)
             if x in self.topo.nodes.keys():
                 new_node = self.topo.nodes.get(x)
-                self.regress(old_topo, old_node, self.topo, new_node)
-                self.advance(old_topo, old_node, self.topo, new_node)
+                if x in affected_nodes:
+                    self.regress(old_topo, old_node, self.topo, new_node)
+                    self.advance(old_topo, old_node, self.topo, new_node)
+                else:
+                    self.nodes[x].component = new_node
                 self.on_component_change(old_node, new_node)
 
         # 3b) Advance services that are currently started or stopped
         for x in old_topo.services.keys():
             old_service = old_topo.services.get(x)
-            if x in self.topo.services.keys():
+            if x in self.topo.services.keys() and x not in destroyed_services:
                 new_service = self.topo.services.get(x)
-                self.advance(old_topo, old_service, self.topo, new_service)
+                if x in affected_services:
+                    self.advance(old_topo, old_service, self.topo, new_service)
+                else:
+                    self.nodes[new_service.executor.name].services[x].component = new_service
                 self.on_component_change(old_service, new_service)
 
         # 4a) Integrate new nodes into the engine
-        for x in self.topo.nodes:
-            if x not in old_topo.nodes.keys():
-                self.nodes[x] = EngineNode(self, self.topo.nodes.get(x), self.topo)
-                self.on_component_change(None, self.nodes[x])
+        for change in diff.get_changes(diff.nodes, ChangeType.ADDED):
+            self.nodes[change.name] = EngineNode(self, change.new, self.topo)
+            self.on_component_change(None, self.nodes[change.name])
 
         # 4b) Integrate new services into the engine
-        for x in self.topo.services:
-            if x not in old_topo.services.keys():
-                service = self.topo.services.get(x)
-                node = self.nodes[service.executor.name]
-                node.services[x] = EngineService(self, service, node)
-                self.on_component_change(None, node.services[x])
+        for change in diff.get_changes(diff.services, ChangeType.ADDED):
+            service = change.new
+            node = self.nodes[service.executor.name]
+            if change.name not in node.services.keys():
+                node.services[change.name] = EngineService(self, service, node)
+                self.on_component_change(None, node.services[change.name])
+
+        # 4c) Integrate destroyed services again (possibly on another node)
+        for x in destroyed_services:
+            old_service = old_topo.services.get(x)
+            new_service = self.topo.services.get(x)
+            if old_service.executor.name in self.nodes.keys():
+                self.nodes[old_service.executor.name].services.pop(x, None)
+            node = self.nodes[new_service.executor.name]
+            node.services[x] = EngineService(self, new_service, node)
+            self.on_component_change(old_service, new_service)
 
         # Post work: Update everything locally
         self.on_topology_change(old_topo, self.topo)
         self.update_all_status()
+        return diff
 
     def get_service_by_name(self, name: str) -> EngineService or None:
         for node in self.nodes.values():
@@ -92,12 +92,14 @@ class EngineNode(EngineComponent):
     def __init__(self, engine: 'Engine', component: Node, topo: Topo):
         super().__init__(engine, component)
         self.services: Dict[str, EngineService] = {}
-        for service in topo.services.values():
-            if service.executor == component:
-                self.services[service.name] = EngineService(engine, service, self)
+        for service in topo.get_node_services(component):
+            self.services[service.name] = EngineService(engine, service, self)
         self.intfs: Dict[str, EngineInterface] = {}
         for intf in component.intfs:
             self.intfs[intf.name] = EngineInterface(engine, intf, self)
+        # Device name -> (rx, tx) in bits per second of all devices of the node (bridges, veth and vxlan devices
+        # included), only set while traffic is collected (see Engine.continuous_traffic_async)
+        self.traffic: Dict[str, typing.Tuple[int, int]] = {}
 
     def get_name(self) -> str:
         return f"{self.component.name}"
@@ -110,6 +112,16 @@ class EngineNode(EngineComponent):
         else:
             return Topo.import_topo(cmd.content)
 
+    def read_topology_digest(self) -> str or None:
+        """Returns the digest stored next to the topology of this node, None if there is none."""
+        # The digest is written while holding the lock of the topology file (see LockWriteSSHCommand)
+        cmd = LockReadSSHCommand(self.component, "/tmp", "current_topology.json" + Topo.DIGEST_SUFFIX,
+                                 "current_topology.json")
+        cmd.run()
+        if cmd.content.strip() == "":
+            return None
+        return cmd.content.strip()
+
     def cmd(self, cmd: str):
         cmd = SSHCommand(self.component, cmd)
         cmd.run()
@@ -0,0 +1,55 @@
+import asyncio
+import concurrent.futures
+import threading
+import typing
+
+
+class EngineEventLoop(object):
+    """An asyncio event loop owned by the engine and running in its own thread.
+
+       Long-running work like status polling, ifstat streaming and ping charts is scheduled here as coroutines,
+       so any number of subjects can be served concurrently without one thread per subject."""
+
+    def __init__(self):
+        self.loop: asyncio.AbstractEventLoop or None = None
+        self.thread: threading.Thread or None = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.loop is not None:
+                return
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self._run, name="engine-event-loop", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coroutine: typing.Coroutine) -> concurrent.futures.Future:
+        """Schedules a coroutine on the loop and returns a future for its result."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine: typing.Coroutine):
+        """Schedules a coroutine on the loop and blocks until it is done."""
+        return self.submit(coroutine).result()
+
+    async def _shutdown(self):
+        # Cancel everything still scheduled (e.g. charts of closed boxes) before the loop goes away
+        tasks = [t for t in asyncio.all_tasks(self.loop) if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.loop.stop()
+
+    def stop(self):
+        with self.lock:
+            if self.loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop)
+            self.thread.join()
+            self.loop.close()
+            self.loop = None
+            self.thread = None
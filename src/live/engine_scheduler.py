@@ -0,0 +1,132 @@
+import concurrent.futures
+import time
+import typing
+from typing import Dict
+
+
+class EngineTask(object):
+    """A unit of work (e.g. starting a single service) executed by the EngineScheduler."""
+
+    def __init__(self, name: str, node_name: str, run: typing.Callable[[], None]):
+        """name: unique name of this task (e.g. "start s1")
+           node_name: the node this task is executed on, used for per node concurrency limits
+           run: the function executing this task"""
+        self.name = name
+        self.node_name = node_name
+        self.run = run
+        self.dependencies: typing.List['EngineTask'] = []
+        self.done = False
+        self.skipped = False
+        self.error: Exception or None = None
+        self.duration = 0.0
+
+    def depends_on(self, task: 'EngineTask') -> 'EngineTask':
+        """Lets this task wait until the given task is done."""
+        if task is not self and task not in self.dependencies:
+            self.dependencies.append(task)
+        return self
+
+    def is_finished(self) -> bool:
+        return self.done or self.skipped or self.error is not None
+
+
+class EngineScheduler(object):
+    """Executes a dependency graph of EngineTasks concurrently.
+
+       A task is started as soon as all of its dependencies are done and less than node_concurrency tasks are
+       running on its node. Tasks depending on a failed or skipped task are skipped."""
+
+    def __init__(self, node_concurrency: int = 4,
+                 progress: typing.Callable[[EngineTask, int, int], None] or None = None):
+        """node_concurrency: maximum number of tasks running concurrently per node
+           progress: called with the task, the number of finished tasks and the total number of tasks whenever a
+                     task finishes (prints the progress if None)"""
+        self.node_concurrency = max(1, node_concurrency)
+        self.progress = progress if progress else EngineScheduler.print_progress
+        self.tasks: Dict[str, EngineTask] = {}
+
+    def add(self, task: EngineTask) -> EngineTask:
+        if task.name in self.tasks.keys():
+            raise Exception(f"Task {task.name} is already scheduled")
+        self.tasks[task.name] = task
+        return task
+
+    def get(self, name: str) -> EngineTask or None:
+        if name in self.tasks.keys():
+            return self.tasks[name]
+        return None
+
+    def run(self):
+        """Executes all tasks and blocks until they are finished. Raises if any task failed."""
+        self._check_cycles()
+        pending = list(self.tasks.values())
+        running: Dict[concurrent.futures.Future, EngineTask] = {}
+        node_running: Dict[str, int] = {}
+        finished = 0
+        workers = self.node_concurrency * max(1, len({task.node_name for task in pending}))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            while len(pending) > 0 or len(running) > 0:
+                changed = True
+                while changed:
+                    changed = False
+                    for task in list(pending):
+                        if any(dep.skipped or dep.error is not None for dep in task.dependencies):
+                            task.skipped = True
+                            pending.remove(task)
+                            finished += 1
+                            self.progress(task, finished, len(self.tasks))
+                            changed = True
+                        elif all(dep.done for dep in task.dependencies) \
+                                and node_running.get(task.node_name, 0) < self.node_concurrency:
+                            pending.remove(task)
+                            node_running[task.node_name] = node_running.get(task.node_name, 0) + 1
+                            running[executor.submit(self._execute, task)] = task
+                if len(running) == 0:
+                    break
+                done, _ = concurrent.futures.wait(running.keys(), return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    node_running[task.node_name] -= 1
+                    finished += 1
+                    self.progress(task, finished, len(self.tasks))
+        failed = [task for task in self.tasks.values() if task.error is not None]
+        if len(failed) > 0:
+            raise Exception(f"{len(failed)} task(s) failed: "
+                            + ", ".join([f"{task.name} ({task.error})" for task in failed]))
+
+    def _execute(self, task: EngineTask):
+        start = time.time()
+        try:
+            task.run()
+            task.done = True
+        except Exception as e:
+            task.error = e
+        task.duration = time.time() - start
+
+    def _check_cycles(self):
+        remaining = {task.name: len(task.dependencies) for task in self.tasks.values()}
+        dependents: Dict[str, typing.List[EngineTask]] = {name: [] for name in self.tasks.keys()}
+        for task in self.tasks.values():
+            for dep in task.dependencies:
+                if dep.name not in self.tasks.keys():
+                    raise Exception(f"Task {task.name} depends on {dep.name} which is not scheduled")
+                dependents[dep.name].append(task)
+        ready = [name for name, count in remaining.items() if count == 0]
+        while len(ready) > 0:
+            for task in dependents[ready.pop()]:
+                remaining[task.name] -= 1
+                if remaining[task.name] == 0:
+                    ready.append(task.name)
+        cycle = [name for name, count in remaining.items() if count > 0]
+        if len(cycle) > 0:
+            raise Exception("Dependency cycle between tasks: " + ", ".join(cycle))
+
+    @classmethod
+    def print_progress(cls, task: EngineTask, finished: int, total: int):
+        if task.error is not None:
+            result = f"failed: {task.error}"
+        elif task.skipped:
+            result = "skipped (dependency failed)"
+        else:
+            result = f"done in {task.duration:.1f}s"
+        print(f"[{finished}/{total}] {task.name}@{task.node_name} {result}")
@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+import typing
+from typing import Dict
+
+from ssh.ping_ssh_command import PingSSHCommand
+
+
+class LatencyMatrixEntry(object):
+    """Round trip times (in milliseconds) and loss of the pings from one service to another."""
+
+    def __init__(self, source: str, target: str, target_ip: str or None = None, error: str or None = None):
+        self.source = source
+        self.target = target
+        self.target_ip = target_ip
+        self.sent: int or None = None
+        self.received: int or None = None
+        self.min: float or None = None
+        self.avg: float or None = None
+        self.max: float or None = None
+        self.mdev: float or None = None
+        self.error = error
+
+    @classmethod
+    def from_command(cls, source: str, target: str, command: PingSSHCommand) -> 'LatencyMatrixEntry':
+        ret = LatencyMatrixEntry(source, target, command.target)
+        ret.sent = command.packets_transmitted
+        ret.received = command.packets_received
+        ret.min = command.min
+        ret.avg = command.avg
+        ret.max = command.max
+        ret.mdev = command.mdev
+        if ret.sent is None:
+            ret.error = "Ping failed"
+        elif not ret.received:
+            # Report the reason of the last failed ping if there is any
+            reasons = [result for result in command.ping_results.values() if isinstance(result, str) and result]
+            ret.error = reasons[-1] if len(reasons) > 0 else "No reply"
+        return ret
+
+    def get_loss(self) -> float or None:
+        if not self.sent:
+            return None
+        return (self.sent - (self.received or 0)) / self.sent
+
+    def to_dict(self) -> dict:
+        return {'source': self.source, 'target': self.target, 'target_ip': self.target_ip, 'sent': self.sent,
+                'received': self.received, 'loss': self.get_loss(), 'min': self.min, 'avg': self.avg,
+                'max': self.max, 'mdev': self.mdev, 'error': self.error}
+
+
+class LatencyMatrix(object):
+    """Round trip times and loss between all pairs of sources and targets, see Engine.measure_latency_matrix."""
+
+    FIELDS = ['source', 'target', 'target_ip', 'sent', 'received', 'loss', 'min', 'avg', 'max', 'mdev', 'error']
+
+    def __init__(self, sources: typing.List[str], targets: typing.List[str]):
+        self.sources = sources
+        self.targets = targets
+        # (Source name, target name) -> entry
+        self.entries: Dict[typing.Tuple[str, str], LatencyMatrixEntry] = {}
+
+    def add(self, entry: LatencyMatrixEntry):
+        self.entries[(entry.source, entry.target)] = entry
+
+    def get(self, source: str, target: str) -> LatencyMatrixEntry or None:
+        return self.entries.get((source, target), None)
+
+    def get_entries(self) -> typing.List[LatencyMatrixEntry]:
+        """Returns all entries ordered by source and target."""
+        return [self.entries[(source, target)] for source in self.sources for target in self.targets
+                if (source, target) in self.entries.keys()]
+
+    def to_csv(self) -> str:
+        """One row per pair (empty cells for values not available)."""
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=LatencyMatrix.FIELDS, lineterminator="\n")
+        writer.writeheader()
+        for entry in self.get_entries():
+            writer.writerow({k: ("" if v is None else v) for k, v in entry.to_dict().items()})
+        return out.getvalue()
+
+    def to_json(self) -> dict:
+        """Sources, targets and the entries as source -> target -> values (pairs not measured are left out)."""
+        matrix = {}
+        for entry in self.get_entries():
+            values = entry.to_dict()
+            del values['source']
+            del values['target']
+            matrix.setdefault(entry.source, {})[entry.target] = values
+        return {'sources': self.sources, 'targets': self.targets, 'matrix': matrix}
+
+    def write(self, path: str):
+        """Writes the matrix as json if path ends with .json, as csv otherwise."""
+        with open(path, "w") as f:
+            if path.lower().endswith(".json"):
+                json.dump(self.to_json(), f, indent=4)
+            else:
+                f.write(self.to_csv())
+
+    def to_str(self) -> str:
+        ret = f"Latency matrix of {len(self.sources)} sources and {len(self.targets)} targets"
+        for entry in self.get_entries():
+            if entry.error is not None:
+                ret += f"\n  {entry.source} -> {entry.target}: {entry.error}"
+            else:
+                ret += f"\n  {entry.source} -> {entry.target}: rtt min/avg/max/mdev = " \
+                       f"{entry.min}/{entry.avg}/{entry.max}/{entry.mdev} ms, loss {entry.get_loss() * 100:.0f}%"
+        return ret
+
+    def __str__(self):
+        return self.to_str()
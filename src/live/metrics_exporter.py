@@ -0,0 +1,182 @@
+import math
+import threading
+import typing
+from enum import Enum
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from live.engine_component import EngineComponentStatus, EngineInterfaceState, EngineInterface
+from live.metrics_store import Metric
+from ssh.command_stats import CommandStats
+
+
+class MetricsExporter(object):
+    """Serves the state of an engine in the Prometheus text format (GET /metrics).
+
+       Everything is rendered from state the engine already holds (component status, interface rates and qdiscs,
+       recorded metrics, status refresh reports, command statistics), so scrapes never run commands on the nodes."""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    # Name, description of the qdisc parameters in EngineInterface.tcqdisc
+    QDISC_PARAMETERS = [("delay_microseconds", "Delay added by netem"),
+                        ("delay_variation_microseconds", "Delay variation added by netem"),
+                        ("delay_correlation", "Correlation of the delay variation (0-1)"),
+                        ("loss_ratio", "Packet loss ratio (0-1)"),
+                        ("loss_correlation", "Correlation of the packet loss (0-1)")]
+
+    def __init__(self, engine: 'Engine', port: int = 9100, host: str = "0.0.0.0"):
+        """port: port to listen on (0 for any free port, see get_port)
+           host: address to listen on"""
+        self.engine = engine
+        self.port = port
+        self.host = host
+        self.server: ThreadingHTTPServer or None = None
+        self.thread: threading.Thread or None = None
+
+    def start(self):
+        if self.server is not None:
+            return
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ["/metrics", "/"]:
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", MetricsExporter.CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="engine-metrics-exporter", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.server = None
+        self.thread = None
+
+    def get_port(self) -> int:
+        return self.server.server_address[1] if self.server is not None else self.port
+
+    @classmethod
+    def escape(cls, value: str) -> str:
+        return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+    @classmethod
+    def format_value(cls, value: float) -> str:
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        if value == int(value) and abs(value) < 2 ** 53:
+            return str(int(value))
+        return repr(float(value))
+
+    @classmethod
+    def format_sample(cls, name: str, labels: typing.Dict[str, str], value: float) -> str:
+        if len(labels) == 0:
+            return f"{name} {MetricsExporter.format_value(value)}"
+        label_str = ",".join([f"{k}=\"{MetricsExporter.escape(str(v))}\"" for k, v in labels.items()])
+        return f"{name}{{{label_str}}} {MetricsExporter.format_value(value)}"
+
+    def render(self) -> str:
+        lines = []
+
+        def family(name: str, metric_type: str, description: str,
+                   samples: typing.List[typing.Tuple[typing.Dict[str, str], float]]):
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(MetricsExporter.format_sample(name, labels, value))
+
+        def state_set(labels: typing.Dict[str, str], label: str, current: Enum,
+                      values: typing.Type[Enum]) -> typing.List[typing.Tuple[typing.Dict[str, str], float]]:
+            return [({**labels, label: value.name}, 1 if value == current else 0) for value in values]
+
+        nodes = list(self.engine.nodes.values())
+        # (labels, engine interface) of all interfaces of nodes and services
+        intfs: typing.List[typing.Tuple[typing.Dict[str, str], EngineInterface]] = []
+        for node in nodes:
+            for intf in node.intfs.values():
+                intfs.append(({'node': node.get_name(), 'service': "", 'interface': intf.component.name}, intf))
+            for service in list(node.services.values()):
+                for intf in service.intfs.values():
+                    intfs.append(({'node': node.get_name(), 'service': service.get_name(),
+                                   'interface': intf.component.name}, intf))
+
+        family("testbed_node_status", "gauge", "Status of the node (1 for the current status)",
+               [x for node in nodes for x in state_set({'node': node.get_name()}, 'status', node.status,
+                                                       EngineComponentStatus)])
+        family("testbed_service_status", "gauge", "Status of the service (1 for the current status)",
+               [x for node in nodes for service in list(node.services.values())
+                for x in state_set({'node': node.get_name(), 'service': service.get_name()}, 'status',
+                                   service.status, EngineComponentStatus)])
+        family("testbed_interface_state", "gauge", "Link state of the interface (1 for the current state)",
+               [x for labels, intf in intfs
+                for x in state_set(labels, 'state', intf.interface_state, EngineInterfaceState)])
+        family("testbed_interface_receive_bits_per_second", "gauge", "Current receiving rate of the interface",
+               [(labels, intf.ifstat[0]) for labels, intf in intfs if intf.ifstat])
+        family("testbed_interface_transmit_bits_per_second", "gauge", "Current transmission rate of the interface",
+               [(labels, intf.ifstat[1]) for labels, intf in intfs if intf.ifstat])
+        for i in range(0, len(MetricsExporter.QDISC_PARAMETERS)):
+            name, description = MetricsExporter.QDISC_PARAMETERS[i]
+            family(f"testbed_interface_qdisc_{name}", "gauge", description,
+                   [(labels, intf.tcqdisc[i]) for labels, intf in intfs])
+        family("testbed_node_device_receive_bits_per_second", "gauge",
+               "Current receiving rate of a device of the node (bridges, veth and vxlan devices included)",
+               [({'node': node.get_name(), 'device': device}, rates[0])
+                for node in nodes for device, rates in dict(node.traffic).items()])
+        family("testbed_node_device_transmit_bits_per_second", "gauge",
+               "Current transmission rate of a device of the node (bridges, veth and vxlan devices included)",
+               [({'node': node.get_name(), 'device': device}, rates[1])
+                for node in nodes for device, rates in dict(node.traffic).items()])
+
+        pings = {Metric.PING_RTT: [], Metric.PING_LOSS: []}
+        for subject, metric in self.engine.metrics.get_subjects():
+            if metric in pings.keys() and "->" in subject:
+                latest = self.engine.metrics.latest(subject, metric)
+                if latest:
+                    source, target = subject.split("->", 1)
+                    pings[metric].append(({'source': source, 'target': target}, latest[1]))
+        family("testbed_ping_rtt_milliseconds", "gauge", "Latest recorded ping round trip time",
+               pings[Metric.PING_RTT])
+        family("testbed_ping_loss_ratio", "gauge", "Latest recorded ping loss ratio", pings[Metric.PING_LOSS])
+
+        report = self.engine.last_status_report
+        if report is not None and report.end is not None:
+            family("testbed_status_refresh_duration_seconds", "gauge", "Duration of the last status refresh",
+                   [({}, report.get_duration())])
+            family("testbed_status_refresh_timestamp_seconds", "gauge", "End of the last status refresh",
+                   [({}, report.end)])
+            family("testbed_status_refresh_node_duration_seconds", "gauge",
+                   "Duration of the last status refresh per node",
+                   [({'node': name}, duration) for name, duration in dict(report.node_durations).items()])
+
+        stats = CommandStats.get_instance()
+        family("testbed_commands_in_flight", "gauge", "Local and ssh commands currently running",
+               [({'command': name}, count) for name, count in sorted(stats.get_in_flight().items())])
+        lines.append("# HELP testbed_command_duration_seconds Duration of finished local and ssh commands")
+        lines.append("# TYPE testbed_command_duration_seconds histogram")
+        for name, histogram in sorted(stats.get_histograms().items()):
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(MetricsExporter.format_sample("testbed_command_duration_seconds_bucket",
+                                                           {'command': name, 'le': repr(float(bound))}, count))
+            lines.append(MetricsExporter.format_sample("testbed_command_duration_seconds_bucket",
+                                                       {'command': name, 'le': "+Inf"}, histogram.count))
+            lines.append(MetricsExporter.format_sample("testbed_command_duration_seconds_sum",
+                                                       {'command': name}, histogram.sum))
+            lines.append(MetricsExporter.format_sample("testbed_command_duration_seconds_count",
+                                                       {'command': name}, histogram.count))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,185 @@
+import math
+import time
+import typing
+from array import array
+from enum import Enum
+from threading import Lock
+from typing import Dict
+
+
+class Metric(Enum):
+    # Rates in bits per second, round trip times in milliseconds, loss as fraction of lost packets
+    RX, TX, PING_RTT, PING_LOSS = range(4)
+
+
+class MetricsRing(object):
+    """Fixed-size ring buffer of (time, value) samples with increasing times, overwriting the oldest samples."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = array('d', [0.0] * capacity)
+        self.values = array('d', [0.0] * capacity)
+        # Position of the oldest sample and number of samples
+        self.start = 0
+        self.count = 0
+
+    def append(self, t: float, value: float):
+        if self.count < self.capacity:
+            i = (self.start + self.count) % self.capacity
+            self.count += 1
+        else:
+            i = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.times[i] = t
+        self.values[i] = value
+
+    def get_time(self, i: int) -> float:
+        """Returns the time of the i-th oldest sample."""
+        return self.times[(self.start + i) % self.capacity]
+
+    def oldest(self) -> float or None:
+        return self.get_time(0) if self.count > 0 else None
+
+    def latest(self) -> typing.Tuple[float, float] or None:
+        if self.count == 0:
+            return None
+        i = (self.start + self.count - 1) % self.capacity
+        return self.times[i], self.values[i]
+
+    def search(self, t: float) -> int:
+        """Returns the number of samples older than t."""
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self.get_time(mid) < t:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def range(self, t0: float, t1: float) -> typing.List[typing.Tuple[float, float]]:
+        ret = []
+        for i in range(self.search(t0), self.count):
+            j = (self.start + i) % self.capacity
+            if self.times[j] > t1:
+                break
+            ret.append((self.times[j], self.values[j]))
+        return ret
+
+
+class MetricsSeries(object):
+    """Samples of one metric: all raw samples of the recent past and averages over fixed intervals (tiers) for
+       longer windows. Every tier is a ring of fixed size, so memory is bounded no matter how long it runs."""
+
+    def __init__(self, raw_capacity: int, tiers: typing.List[typing.Tuple[float, int]]):
+        """raw_capacity: number of raw samples to keep
+           tiers: (seconds per averaged sample, number of averaged samples to keep), finest first"""
+        self.raw = MetricsRing(raw_capacity)
+        self.tiers = [(resolution, MetricsRing(capacity)) for resolution, capacity in tiers]
+        # Tier index -> (start of the current interval, sum of finite values, number of finite values, last value)
+        self.buckets: typing.List[typing.Tuple[float, float, int, float] or None] = [None] * len(tiers)
+
+    def add(self, t: float, value: float):
+        latest = self.raw.latest()
+        if latest is not None and t <= latest[0]:
+            # Keep times increasing (e.g. clock adjustments)
+            t = latest[0] + 1e-6
+        self.raw.append(t, value)
+        finite = not math.isinf(value) and not math.isnan(value)
+        for i in range(0, len(self.tiers)):
+            resolution, ring = self.tiers[i]
+            bucket_start = t - t % resolution
+            bucket = self.buckets[i]
+            if bucket is not None and bucket[0] != bucket_start:
+                ring.append(bucket[0], MetricsSeries.average(bucket))
+                bucket = None
+            if bucket is None:
+                bucket = (bucket_start, 0.0, 0, value)
+            self.buckets[i] = (bucket_start, bucket[1] + (value if finite else 0), bucket[2] + (1 if finite else 0),
+                               value)
+
+    @classmethod
+    def average(cls, bucket: typing.Tuple[float, float, int, float]) -> float:
+        # Intervals without a single finite value (e.g. only failed pings) keep the last value
+        return bucket[1] / bucket[2] if bucket[2] > 0 else bucket[3]
+
+    def range(self, t0: float, t1: float) -> typing.List[typing.Tuple[float, float]]:
+        """Returns the raw samples in the window, preceded by averaged samples from the finest tiers reaching back
+           further where the raw samples do not cover the start of the window."""
+        ret = []
+        # Start of the part of the window already covered by finer rings
+        covered = math.inf
+        for resolution, ring in [(0, self.raw)] + self.tiers:
+            if covered <= t0:
+                break
+            oldest = ring.oldest()
+            if oldest is None:
+                continue
+            # Only averages of intervals ending before the covered part, the others would count samples twice
+            ret = [sample for sample in ring.range(t0, min(t1, covered)) if sample[0] + resolution <= covered] + ret
+            covered = min(covered, oldest)
+        return ret
+
+    def latest(self) -> typing.Tuple[float, float] or None:
+        return self.raw.latest()
+
+
+class MetricsStore(object):
+    """Memory-bounded time series of live metrics (traffic, ping round trip times and loss) of engine components.
+
+       Collectors add samples as they arrive, GUI charts, command line tools and exports read them from here instead
+       of polling the components on their own."""
+
+    # One raw sample per second for 10 minutes, 10 second averages for 2 hours, minute averages for 2 days
+    DEFAULT_RAW_CAPACITY = 600
+    DEFAULT_TIERS = [(10, 720), (60, 2880)]
+
+    def __init__(self, raw_capacity: int = DEFAULT_RAW_CAPACITY,
+                 tiers: typing.List[typing.Tuple[float, int]] or None = None):
+        """raw_capacity: number of raw samples to keep per series
+           tiers: (seconds per averaged sample, number of averaged samples to keep) per series, finest first"""
+        self.raw_capacity = raw_capacity
+        self.tiers = tiers if tiers is not None else MetricsStore.DEFAULT_TIERS
+        # (Subject name, metric) -> series
+        self.series: Dict[typing.Tuple[str, Metric], MetricsSeries] = {}
+        self.lock = Lock()
+
+    @classmethod
+    def get_subject_name(cls, subject: 'EngineComponent' or str) -> str:
+        return subject if isinstance(subject, str) else subject.get_name()
+
+    @classmethod
+    def get_pair_name(cls, source: 'EngineComponent' or str, target: 'EngineComponent' or str) -> str:
+        """Returns the subject name for metrics between two components (e.g. ping round trip times)."""
+        return f"{MetricsStore.get_subject_name(source)}->{MetricsStore.get_subject_name(target)}"
+
+    def add(self, subject: 'EngineComponent' or str, metric: Metric, value: float, t: float or None = None):
+        """subject: the component (or subject name) the value belongs to
+           t: time of the sample (now if None)"""
+        key = (MetricsStore.get_subject_name(subject), metric)
+        with self.lock:
+            if key not in self.series.keys():
+                self.series[key] = MetricsSeries(self.raw_capacity, self.tiers)
+            self.series[key].add(time.time() if t is None else t, value)
+
+    def range(self, subject: 'EngineComponent' or str, metric: Metric, t0: float or None = None,
+              t1: float or None = None) -> typing.List[typing.Tuple[float, float]]:
+        """Returns the (time, value) samples between t0 and t1 (both inclusive, None for unbounded) in chronological
+           order. The part of the window older than the raw samples is served from the finest averaged tiers holding
+           samples of it."""
+        key = (MetricsStore.get_subject_name(subject), metric)
+        with self.lock:
+            if key not in self.series.keys():
+                return []
+            return self.series[key].range(-math.inf if t0 is None else t0, math.inf if t1 is None else t1)
+
+    def latest(self, subject: 'EngineComponent' or str, metric: Metric) -> typing.Tuple[float, float] or None:
+        key = (MetricsStore.get_subject_name(subject), metric)
+        with self.lock:
+            if key not in self.series.keys():
+                return None
+            return self.series[key].latest()
+
+    def get_subjects(self) -> typing.List[typing.Tuple[str, Metric]]:
+        with self.lock:
+            return list(self.series.keys())
@@ -0,0 +1,144 @@
+import asyncio
+import time
+import typing
+from threading import Lock
+from typing import Dict
+
+from live.engine_component import EngineNode, EngineService, EngineInterface
+from live.metrics_store import MetricsStore, Metric
+from ssh.ping_prober_command import PingProberSSHCommand
+from topo.node import Node
+
+
+class PingPair(object):
+    """A monitored source and target, pinged continuously as long as it is registered with the prober."""
+
+    def __init__(self, source: EngineService or EngineNode, target: EngineService or EngineInterface or EngineNode):
+        self.source = source
+        self.target = target
+        self.name = MetricsStore.get_pair_name(source, target)
+        self.consumers: typing.List[typing.Callable[[int, str or typing.Tuple[int, float]], None]] = []
+        # Resolved target address and the topology version it was resolved for
+        self.target_ip: str or None = None
+        self.version: int or None = None
+        # Session currently pinging this pair and the sequence numbers it reported
+        self.session: PingProberSSHCommand or None = None
+        self.seen: typing.Set[int] = set()
+        self.retry_at = 0.0
+
+    def get_source_node(self) -> Node:
+        component = self.source.component
+        return component if isinstance(component, Node) else component.executor
+
+
+class PingProber(object):
+    """Monitors the round trip time and loss between pairs of components with one continuous ping per pair.
+
+       The pings of all pairs with sources on the same node share one ssh session (see PingProberSSHCommand).
+       Sessions end after deadline seconds and are restarted with all pairs of their node, pairs added in between
+       get a session of their own until then. Target addresses are resolved once per topology version. Every result
+       is recorded in the metrics of the engine and handed to the consumers of the pair."""
+
+    def __init__(self, engine: 'Engine', interval: float = 1, deadline: int = 60, retry_delay: float = 5):
+        """interval: seconds between two pings of a pair
+           deadline: seconds after which a session is restarted
+           retry_delay: seconds to wait before pinging a pair again whose session failed right away"""
+        self.engine = engine
+        self.interval = interval
+        self.deadline = deadline
+        self.retry_delay = retry_delay
+        self.pairs: Dict[str, PingPair] = {}
+        self.lock = Lock()
+
+    def add(self, source: EngineService or EngineNode, target: EngineService or EngineInterface or EngineNode,
+            consumer: typing.Callable[[int, str or typing.Tuple[int, float]], None] or None = None) -> PingPair:
+        """Starts monitoring the pair (if not done yet).
+           consumer: receives icmp sequence number and result (error or ttl and time) of every ping"""
+        with self.lock:
+            name = MetricsStore.get_pair_name(source, target)
+            if name not in self.pairs.keys():
+                self.pairs[name] = PingPair(source, target)
+            pair = self.pairs[name]
+            if consumer is not None:
+                pair.consumers.append(consumer)
+            return pair
+
+    def remove(self, source: EngineService or EngineNode, target: EngineService or EngineInterface or EngineNode,
+               consumer: typing.Callable[[int, str or typing.Tuple[int, float]], None] or None = None):
+        """Removes the consumer and stops monitoring the pair once it has no consumers left (or right away if no
+           consumer is given)."""
+        with self.lock:
+            name = MetricsStore.get_pair_name(source, target)
+            if name not in self.pairs.keys():
+                return
+            pair = self.pairs[name]
+            if consumer is not None and consumer in pair.consumers:
+                pair.consumers.remove(consumer)
+            if consumer is None or len(pair.consumers) == 0:
+                del self.pairs[name]
+
+    def get_target_ip(self, pair: PingPair) -> str:
+        if pair.version != self.engine.topo.version:
+            pair.target_ip = self.engine.get_ping_target(pair.source.component, pair.target.component)
+            pair.version = self.engine.topo.version
+        return pair.target_ip
+
+    async def run_async(self):
+        while not self.engine.stop_updating:
+            self.start_sessions()
+            await asyncio.sleep(min(self.interval, 0.5))
+
+    def start_sessions(self):
+        """Starts a session per node for all pairs not being pinged at the moment."""
+        now = time.time()
+        nodes: Dict[str, typing.Tuple[Node, typing.List[PingPair]]] = {}
+        with self.lock:
+            for pair in self.pairs.values():
+                if pair.session is None and pair.retry_at <= now:
+                    node = pair.get_source_node()
+                    nodes.setdefault(node.name, (node, []))[1].append(pair)
+        for node, pairs in nodes.values():
+            targets = []
+            for pair in list(pairs):
+                try:
+                    targets.append((pair.source.component, self.get_target_ip(pair)))
+                except Exception as e:
+                    print(f"Can not ping {pair.name}: {e}")
+                    pair.retry_at = now + self.retry_delay
+                    pairs.remove(pair)
+            if len(pairs) > 0:
+                asyncio.ensure_future(self.run_session(node, pairs, targets))
+
+    async def run_session(self, node: Node, pairs: typing.List[PingPair],
+                          targets: typing.List[typing.Tuple[object, str]]):
+        session = PingProberSSHCommand(node, targets, self.interval, self.deadline,
+                                       lambda index, icmp_seq, result: self.on_result(session, pairs[index], icmp_seq,
+                                                                                      result))
+        for pair in pairs:
+            pair.session = session
+            pair.seen = set()
+        start = time.time()
+        try:
+            await session.run_async()
+        finally:
+            failed = time.time() - start < self.interval * 2
+            for pair in pairs:
+                if pair.session is session:
+                    pair.session = None
+                    if failed:
+                        pair.retry_at = time.time() + self.retry_delay
+
+    def on_result(self, session: PingProberSSHCommand, pair: PingPair, icmp_seq: int,
+                  result: str or typing.Tuple[int, float]):
+        # Pairs removed in the meantime still receive results until their session ends
+        if pair.session is not session or icmp_seq in pair.seen or self.pairs.get(pair.name) is not pair:
+            return
+        # With pings reported as outstanding, a late reply would report the same sequence number again
+        pair.seen.add(icmp_seq)
+        if isinstance(result, str):
+            self.engine.metrics.add(pair.name, Metric.PING_LOSS, 1)
+        else:
+            self.engine.metrics.add(pair.name, Metric.PING_RTT, result[1])
+            self.engine.metrics.add(pair.name, Metric.PING_LOSS, 0)
+        for consumer in list(pair.consumers):
+            consumer(icmp_seq, result)
@@ -0,0 +1,47 @@
+import time
+import typing
+from threading import Lock
+from typing import Dict
+
+
+class StatusRefreshReport(object):
+    """Latency report of a single status refresh over all nodes."""
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.start = time.time()
+        self.end: float or None = None
+        self.node_durations: Dict[str, float] = {}
+        # Command description, node name, duration
+        self.command_durations: typing.List[(str, str, float)] = []
+        self.lock = Lock()
+
+    def add_command(self, description: str, node_name: str, duration: float):
+        with self.lock:
+            self.command_durations.append((description, node_name, duration))
+
+    def add_node(self, node_name: str, duration: float):
+        with self.lock:
+            self.node_durations[node_name] = duration
+
+    def finish(self):
+        self.end = time.time()
+
+    def get_duration(self) -> float:
+        return (self.end if self.end is not None else time.time()) - self.start
+
+    def get_slowest_commands(self, count: int = 5) -> typing.List[typing.Tuple[str, str, float]]:
+        with self.lock:
+            return sorted(self.command_durations, key=lambda x: x[2], reverse=True)[:count]
+
+    def to_str(self) -> str:
+        ret = f"Status refresh took {self.get_duration():.2f}s " \
+              f"({len(self.command_durations)} commands, concurrency {self.concurrency} per node)"
+        for name, duration in sorted(self.node_durations.items(), key=lambda x: x[1], reverse=True):
+            ret += f"\n  node {name}: {duration:.2f}s"
+        for description, name, duration in self.get_slowest_commands():
+            ret += f"\n  {description}@{name}: {duration:.2f}s"
+        return ret
+
+    def __str__(self):
+        return self.to_str()
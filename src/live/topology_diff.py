@@ -0,0 +1,184 @@
+import typing
+from enum import Enum
+from typing import Dict
+
+from topo.link import Link
+from topo.switch import Switch
+from topo.topo import Topo
+
+
+class ChangeType(Enum):
+    ADDED, REMOVED, MODIFIED = range(3)
+
+
+class ComponentChange(object):
+    """Change of a single node, service, link or service extension between two topologies."""
+
+    def __init__(self, name: str, change_type: ChangeType, old: object or None, new: object or None,
+                 fields: typing.List[str] or None = None):
+        """name: name of the component (links are named by their ends, see TopologyDiff.get_link_name)
+           change_type: whether the component was added, removed or modified
+           old: the component in the old topology (None if added)
+           new: the component in the new topology (None if removed)
+           fields: names of the serialized fields that differ (only for modified components)"""
+        self.name = name
+        self.change_type = change_type
+        self.old = old
+        self.new = new
+        self.fields = fields if fields else []
+
+    def to_str(self) -> str:
+        fields = f" ({', '.join(self.fields)})" if len(self.fields) > 0 else ""
+        return f"{self.name} {self.change_type.name.lower()}{fields}"
+
+
+class TopologyDiff(object):
+    """Structural change set between two versions of a topology.
+
+       Components are compared by their content digests first, only changed components are compared field by field.
+       The diff also determines which services and nodes need their configuration regenerated: modified ones, the ends
+       of changed links, if the change can affect routing, all services whose routing table changed and all services
+       referencing one of these (switches of changed controllers, remote ends of changed tunnels)."""
+
+    # Serialized service fields that can change the routing tables of other services
+    ROUTING_FIELDS = ['intfs', 'service_extensions', 'controllers', 'gateway_to_subnets']
+    # Serialized fields only tracking allocations (ids, addresses, device numbers) for future components
+    ALLOCATION_FIELDS = ['current_virtual_device_num', 'link_id_reference', 'network_address_generator']
+
+    def __init__(self, old_topo: Topo, new_topo: Topo):
+        self.old_topo = old_topo
+        self.new_topo = new_topo
+        self.nodes = self.diff_components(old_topo.nodes, new_topo.nodes, lambda x: x.to_dict(True))
+        self.services = self.diff_components(old_topo.services, new_topo.services, lambda x: x.to_dict(True))
+        self.links = self.diff_components({TopologyDiff.get_link_name(x): x for x in old_topo.links},
+                                          {TopologyDiff.get_link_name(x): x for x in new_topo.links},
+                                          lambda x: x.to_dict())
+        # Service name -> extension changes of that service
+        self.extensions: Dict[str, Dict[str, ComponentChange]] = {}
+        for change in self.services.values():
+            if change.change_type == ChangeType.MODIFIED and 'service_extensions' in change.fields:
+                self.extensions[change.name] = self.diff_components(change.old.extensions, change.new.extensions,
+                                                                    lambda x: x.to_dict())
+        self.network_implementation = self.diff_components({'network_implementation': old_topo.network_implementation},
+                                                           {'network_implementation': new_topo.network_implementation},
+                                                           lambda x: x.to_dict())
+        self.network_implementation_changed = len(self.network_implementation) > 0 and \
+            TopologyDiff.is_configuration_changed(self.network_implementation['network_implementation'])
+
+    @classmethod
+    def get_link_name(cls, link: Link) -> str:
+        return f"{link.service1.name}:{link.intf_name1}<->{link.service2.name}:{link.intf_name2}"
+
+    @classmethod
+    def diff_fields(cls, old_dict: dict, new_dict: dict) -> typing.List[str]:
+        return sorted([key for key in set(old_dict.keys()).union(new_dict.keys())
+                       if old_dict.get(key, None) != new_dict.get(key, None)])
+
+    def diff_components(self, old: Dict[str, object], new: Dict[str, object],
+                        to_dict: typing.Callable[[object], dict]) -> Dict[str, ComponentChange]:
+        ret = {}
+        for name, old_component in old.items():
+            if name not in new.keys():
+                ret[name] = ComponentChange(name, ChangeType.REMOVED, old_component, None)
+                continue
+            new_component = new[name]
+            if self.old_topo.get_component_digest(old_component, lambda: to_dict(old_component), True) == \
+                    self.new_topo.get_component_digest(new_component, lambda: to_dict(new_component), True):
+                continue
+            fields = TopologyDiff.diff_fields(to_dict(old_component), to_dict(new_component))
+            if len(fields) > 0:
+                ret[name] = ComponentChange(name, ChangeType.MODIFIED, old_component, new_component, fields)
+        for name, new_component in new.items():
+            if name not in old.keys():
+                ret[name] = ComponentChange(name, ChangeType.ADDED, None, new_component)
+        return ret
+
+    @classmethod
+    def is_configuration_changed(cls, change: ComponentChange) -> bool:
+        """Whether the change is not limited to allocation state."""
+        return change.change_type != ChangeType.MODIFIED \
+            or len([field for field in change.fields if field not in TopologyDiff.ALLOCATION_FIELDS]) > 0
+
+    def get_changes(self, changes: Dict[str, ComponentChange], change_type: ChangeType) -> typing.List[ComponentChange]:
+        return [change for change in changes.values() if change.change_type == change_type]
+
+    def is_empty(self) -> bool:
+        return len(self.nodes) == 0 and len(self.services) == 0 and len(self.links) == 0 \
+            and len(self.network_implementation) == 0
+
+    def is_routing_changed(self) -> bool:
+        """Whether the change can affect routing tables (links, interfaces, tunnels, controllers, ...)."""
+        if len(self.links) > 0:
+            return True
+        for change in self.services.values():
+            if change.change_type != ChangeType.MODIFIED:
+                return True
+            if len([field for field in change.fields if field in TopologyDiff.ROUTING_FIELDS]) > 0:
+                return True
+        return False
+
+    def get_affected_services(self) -> typing.List[str]:
+        """Returns the names of all services present in both topologies whose configuration may have changed."""
+        affected = set([change.name for change in self.get_changes(self.services, ChangeType.MODIFIED)])
+        for change in self.links.values():
+            for link in [change.old, change.new]:
+                if link is not None:
+                    affected.update([link.service1.name, link.service2.name])
+        if self.is_routing_changed():
+            for name, old_service in self.old_topo.services.items():
+                if name not in affected and name in self.new_topo.services.keys():
+                    new_service = self.new_topo.services[name]
+                    if TopologyDiff.get_routes(old_service) != TopologyDiff.get_routes(new_service):
+                        affected.add(name)
+        # Services embed parts of the configuration of the services they reference (controller address and port,
+        # remote tunnel key and port), regenerate them as well
+        for topo in [self.old_topo, self.new_topo]:
+            for name, service in topo.services.items():
+                if name not in affected and not affected.isdisjoint(TopologyDiff.get_referenced_services(service)):
+                    affected.add(name)
+        return [name for name in self.new_topo.services.keys()
+                if name in affected and name in self.old_topo.services.keys()]
+
+    @classmethod
+    def get_referenced_services(cls, service: 'Service') -> typing.List[str]:
+        """Returns the names of all services whose configuration is used by the configuration of the service."""
+        ret = [controller.name for controller in service.controllers] if isinstance(service, Switch) else []
+        for extension in service.extensions.values():
+            remote_service_name = getattr(extension, 'remote_service_name', None)
+            if remote_service_name is not None:
+                ret.append(remote_service_name)
+        return ret
+
+    @classmethod
+    def get_routes(cls, service: 'Service') -> typing.List[typing.Tuple[str, str]]:
+        routing_table = service.build_routing_table(for_switch=service.is_switch())
+        return [(str(ip), intf.name) for ip, intf in routing_table.items()]
+
+    def get_affected_nodes(self) -> typing.List[str]:
+        """Returns the names of all nodes present in both topologies whose base configuration may have changed."""
+        if self.network_implementation_changed:
+            affected = set(self.new_topo.nodes.keys())
+        else:
+            affected = set([change.name for change in self.get_changes(self.nodes, ChangeType.MODIFIED)
+                            if TopologyDiff.is_configuration_changed(change)])
+            for change in self.links.values():
+                for link in [change.old, change.new]:
+                    if link is not None:
+                        affected.update([link.service1.executor.name, link.service2.executor.name])
+        return [name for name in self.new_topo.nodes.keys()
+                if name in affected and name in self.old_topo.nodes.keys()]
+
+    def to_str(self) -> str:
+        lines = []
+        for kind, changes in [("node", self.nodes), ("service", self.services), ("link", self.links)]:
+            for change in changes.values():
+                lines.append(f"{kind} {change.to_str()}")
+        for service, changes in self.extensions.items():
+            for change in changes.values():
+                lines.append(f"extension {service}/{change.to_str()}")
+        for change in self.network_implementation.values():
+            lines.append(change.to_str().replace('_', ' ', 1))
+        return "\n".join(lines) if len(lines) > 0 else "no changes"
+
+    def __str__(self):
+        return self.to_str()
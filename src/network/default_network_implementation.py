@@ -66,17 +66,10 @@ class DefaultNetworkImplementation(NetworkImplementation):
             self.link_vxlan_mapping[str(link.link_id)] = [dev_name1, dev_name2]
         else:
             raise Exception(f"Unknown/unsupported link type for link {link.service1.name} <-> {link.service2.name}")
+        self.topo.changed(lambda index: index.add_link_interfaces(link), [self, link, link.service1, link.service2])
 
     def has_link(self, node: 'Node', dev_name: str) -> bool:
-        for link in self.topo.links:
-            if link.service1.executor == node and link.intf1 and link.intf1.bind_name == dev_name:
-                return True
-            if link.service2.executor == node and link.intf2 and link.intf2.bind_name == dev_name:
-                return True
-            if link.link_id in self.link_vxlan_mapping:
-                if dev_name in self.link_vxlan_mapping[link.link_id]:
-                    return True
-        return False
+        return self.topo.get_link_by_bind_name(node, dev_name) is not None
 
     def configure(self):
         # Check that all links got provided a bind name
@@ -109,8 +102,8 @@ class DefaultNetworkImplementation(NetworkImplementation):
         if node.type is not NodeType.LINUX_DEBIAN and node.type is not NodeType.LINUX_ARCH:
             raise Exception("DefaultNetworkImplementation currently only supports configuring LinuxNodes")
 
-        # Iterate over links
-        for link in self.topo.links:
+        # Iterate over links of this node
+        for link in self.topo.get_node_links(node):
             self.generate_link(node, config, link)
 
     def generate_link(self, node: Node, config: Configuration, link: Link):
@@ -123,6 +116,7 @@ class DefaultNetworkImplementation(NetworkImplementation):
                     link.intf1.bind_name = f"br{link.link_id}a"
                 if link.intf2.bind_name is None:
                     link.intf2.bind_name = f"br{link.link_id}b"
+                self.topo.index_changed(lambda index: index.add_link_interfaces(link), [link.service1, link.service2])
                 # Create veth link
                 config.add_command(
                     Command(f"ip link add v{link.intf1.bind_name} type veth peer v{link.intf2.bind_name}"),
@@ -14,9 +14,8 @@ class LinuxConfigurationBuilder(ConfigurationBuilder):
         # Generate network infrastructure
         self.topo.network_implementation.generate(self.node, config)
         # Generate our own containers
-        for service in self.topo.services.values():
-            if service.executor == self.node:
-                service.append_to_configuration(self, config, True)
+        for service in self.topo.get_node_services(self.node):
+            service.append_to_configuration(self, config, True)
         return config
 
     def build_service(self, service: 'Service') -> Configuration:
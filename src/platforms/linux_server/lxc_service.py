@@ -3,9 +3,10 @@ from abc import ABC, abstractmethod
 from os import PathLike
 from pathlib import PurePath, Path
 
-from config.configuration import Command
+from config.configuration import Command, Configuration
 from network.network_utils import NetworkUtils
 from platforms.linux_server.linux_configuration_builder import LinuxConfigurationBuilder
+from platforms.linux_server.warm_container_pool import WarmContainerPool
 from topo.node import Node
 from topo.service import Service, ServiceType
 
@@ -38,18 +39,29 @@ class LXCService(Service, ABC):
         if not isinstance(config_builder, LinuxConfigurationBuilder):
             raise Exception("Can only execute LXCService on a linux node")
         # Add container itself
+        launch = False
+        pre_start = Configuration()
         if create:
-            config.add_command(Command(f"lxc init {self.image} {self.name}"),
-                               Command(f"lxc rm {self.name}"))
-            if self.cpu:
-                config.add_command(Command(f"lxc config set {self.name} limits.cpu {self.cpu}"),
-                                   Command())
-            if self.cpu_allowance:
-                config.add_command(Command(f"lxc config set {self.name} limits.cpu.allowance {self.cpu_allowance}"),
-                                   Command())
-            if self.memory:
-                config.add_command(Command(f"lxc config set {self.name} limits.memory {self.memory}"),
-                                   Command())
+            for ext in self.extensions.values():
+                ext.append_to_configuration_pre_start(self.lxc_prefix(), config_builder, pre_start)
+            # Files and extensions might need the container before it is started for the first time
+            launch = config_builder.use_launch and len(self.files) == 0 and len(pre_start.start_cmds) == 0
+            if launch and config_builder.use_warm_pool:
+                config.add_command(Command(WarmContainerPool.get_claim_command(self.image, self.name,
+                                                                              self.get_lxc_config_args())),
+                                   Command(f"lxc rm --force {self.name}"))
+            elif launch:
+                config.add_command(Command(f"lxc launch {self.image} {self.name}{self.get_lxc_config_args()}"),
+                                   Command(f"lxc rm --force {self.name}"))
+            elif config_builder.use_launch:
+                config.add_command(Command(f"lxc init {self.image} {self.name}{self.get_lxc_config_args()}"),
+                                   Command(f"lxc rm {self.name}"))
+            else:
+                config.add_command(Command(f"lxc init {self.image} {self.name}"),
+                                   Command(f"lxc rm {self.name}"))
+                for key, value in self.get_lxc_config().items():
+                    config.add_command(Command(f"lxc config set {self.name} {key} {value}"),
+                                       Command())
 
             # Copy files
             for file, path in self.files:
@@ -60,14 +72,14 @@ class LXCService(Service, ABC):
         config.add_command(Command(f"#filecopybeforelaunch {self.name}"),
                            Command())
 
-        if create:
-            # Set up early
-            for ext in self.extensions.values():
-                ext.append_to_configuration_pre_start(self.lxc_prefix(), config_builder, config)
+        # Set up early
+        for i in range(0, len(pre_start.start_cmds)):
+            config.add_command(pre_start.start_cmds[i], pre_start.stop_cmds[i])
 
-        # Start container
-        config.add_command(Command(f"lxc start {self.name}"),
-                           Command(f"lxc stop {self.name}"))
+        if not launch:
+            # Start container
+            config.add_command(Command(f"lxc start {self.name}"),
+                               Command(f"lxc stop {self.name}"))
 
         # Insert file copy placeholder
         config.add_command(Command(f"#filecopyafterlaunch {self.name}"),
@@ -105,6 +117,20 @@ class LXCService(Service, ABC):
         # Actual logic in the container will be provided by the implementation
         pass
 
+    def get_lxc_config(self) -> typing.Dict[str, str]:
+        """Returns the lxc configuration keys (limits) to apply to the container."""
+        ret = {}
+        if self.cpu:
+            ret['limits.cpu'] = self.cpu
+        if self.cpu_allowance:
+            ret['limits.cpu.allowance'] = self.cpu_allowance
+        if self.memory:
+            ret['limits.memory'] = self.memory
+        return ret
+
+    def get_lxc_config_args(self) -> str:
+        return "".join([f" -c {key}={value}" for key, value in self.get_lxc_config().items()])
+
     def lxc_prefix(self) -> str:
         return f"lxc exec {self.name} -- "
 
@@ -0,0 +1,125 @@
+import asyncio
+import base64
+import re
+import typing
+from typing import Dict
+
+from ssh.ssh_command import SSHCommand
+from topo.node import Node
+
+# Claims a pooled container by renaming it, falls back to a regular launch if the pool is empty (or another claim
+# was faster). Arguments: <pool key> <image> <name> [-c key=value ...]
+CLAIM_SCRIPT = """#!/bin/bash
+key="$1"; image="$2"; name="$3"; shift 3
+pooled=$(lxc ls --format csv -c n | grep "^testbed-pool-$key--" | head -n 1)
+if [ -n "$pooled" ] && lxc mv "$pooled" "$name" 2> /dev/null; then
+    while [ "$#" -gt 1 ]; do
+        lxc config set "$name" "${2%%=*}" "${2#*=}"
+        shift 2
+    done
+    exec lxc start "$name"
+fi
+exec lxc launch "$image" "$name" "$@"
+"""
+
+# Fills up the pool of one image. Arguments: <pool key> <image> <target size>
+REFILL_SCRIPT = """#!/bin/bash
+key="$1"; image="$2"; target="$3"
+have=$(lxc ls --format csv -c n | grep -c "^testbed-pool-$key--")
+while [ "$have" -lt "$target" ]; do
+    lxc init "$image" "testbed-pool-$key--$(date +%s%N)" > /dev/null || exit 1
+    have=$((have + 1))
+done
+"""
+
+
+class WarmContainerPool(object):
+    """Keeps pre-initialized, stopped containers per image on every node.
+
+       Creating an LXCService claims one of them by renaming it (and applying its limits), which is much faster than
+       initializing a new container from the image. Claiming happens on the node itself (see CLAIM_SCRIPT), so it
+       falls back to a regular launch if the pool is empty. The pool is refilled in the background, except on nodes
+       that were drained (e.g. because the testbed was destroyed on them) until they are resumed."""
+
+    SCRIPT_DIR = "/tmp/testbed-pool"
+    PREFIX = "testbed-pool-"
+
+    def __init__(self, sizes: Dict[str, int], refill_interval: float = 10):
+        """sizes: image -> number of stopped containers to keep per node
+           refill_interval: seconds between two refills of all nodes"""
+        self.sizes = sizes
+        self.refill_interval = refill_interval
+        self.loop: asyncio.AbstractEventLoop or None = None
+        self.refill_event: asyncio.Event or None = None
+        # Names of the nodes not to refill
+        self.drained: typing.Set[str] = set()
+
+    @classmethod
+    def get_pool_key(cls, image: str) -> str:
+        """Returns the image name as usable in a container name (e.g. images:ubuntu/22.04 -> images-ubuntu-22-04).
+           Keys never contain "--", which separates them from the container number in pooled container names."""
+        return re.sub("[^a-zA-Z0-9]+", "-", image).strip("-").lower()
+
+    @classmethod
+    def get_claim_command(cls, image: str, name: str, config_args: str) -> str:
+        """Returns the command creating and starting container name from the pool, or from the image if there is no
+           pool on the node."""
+        script = f"{WarmContainerPool.SCRIPT_DIR}/claim.sh"
+        return f"if [ -x {script} ]; then {script} {cls.get_pool_key(image)} {image} {name}{config_args}; " \
+               f"else lxc launch {image} {name}{config_args}; fi"
+
+    def get_install_command(self) -> str:
+        ret = f"mkdir -p {WarmContainerPool.SCRIPT_DIR}"
+        # Transfer encoded, the scripts must not be interpreted by any shell on the way
+        for name, script in [("claim.sh", CLAIM_SCRIPT), ("refill.sh", REFILL_SCRIPT)]:
+            encoded = base64.b64encode(script.encode("utf-8")).decode("ascii")
+            path = f"{WarmContainerPool.SCRIPT_DIR}/{name}"
+            ret += f" && echo {encoded} | base64 -d > {path} && chmod +x {path}"
+        return ret
+
+    def get_refill_command(self) -> str:
+        ret = self.get_install_command()
+        for image, size in self.sizes.items():
+            ret += f" && {WarmContainerPool.SCRIPT_DIR}/refill.sh {self.get_pool_key(image)} {image} {int(size)}"
+        return ret
+
+    def refill(self, node: Node) -> bool:
+        command = SSHCommand(node, self.get_refill_command())
+        command.run()
+        return command.exit_code == 0
+
+    async def refill_async(self, node: Node) -> bool:
+        command = SSHCommand(node, self.get_refill_command())
+        await command.run_async()
+        return command.exit_code == 0
+
+    def drain(self, node: Node):
+        """Removes all pooled containers from the node and stops refilling it until it is resumed."""
+        self.drained.add(node.name)
+        SSHCommand(node, f"lxc ls --format csv -c n | grep '^{WarmContainerPool.PREFIX}' "
+                         f"| xargs -r -n 1 lxc rm --force").run()
+
+    def resume(self, node: Node):
+        """Refills the pool of a drained node again."""
+        if node.name in self.drained:
+            self.drained.discard(node.name)
+            self.notify()
+
+    def notify(self):
+        """Triggers a refill before the next interval elapsed (e.g. after containers were claimed)."""
+        if self.loop is not None and self.refill_event is not None:
+            self.loop.call_soon_threadsafe(self.refill_event.set)
+
+    async def run_async(self, get_nodes: typing.Callable[[], typing.List[Node]],
+                        is_running: typing.Callable[[], bool] = lambda: True):
+        """Refills the pools of all nodes returned by get_nodes (except drained ones) every refill_interval seconds,
+           as long as is_running returns True (or until cancelled)."""
+        self.loop = asyncio.get_running_loop()
+        self.refill_event = asyncio.Event()
+        while is_running():
+            self.refill_event.clear()
+            await asyncio.gather(*[self.refill_async(node) for node in get_nodes() if node.name not in self.drained])
+            try:
+                await asyncio.wait_for(self.refill_event.wait(), self.refill_interval)
+            except asyncio.TimeoutError:
+                pass
@@ -46,6 +46,12 @@ def main(argv: typing.List[str]):
                 engine.destroy(service)
             for node in nodes:
                 engine.destroy(node)
+    elif argv[1].lower() == "status":
+        for node in engine.nodes.values():
+            print(f"{node.get_name()}: {node.status.name}")
+            for service in node.services.values():
+                print(f"  {service.get_name()}: {service.status.name}")
+        print(engine.last_status_report)
     elif argv[1].lower() == "ping":
         if len(argv) != 4:
             print("./remote_topology.sh ping <service1> <service2[:intf]>")
@@ -73,6 +79,27 @@ def main(argv: typing.List[str]):
         else:
             print("No such service: " + argv[2])
             exit(1)
+    elif argv[1].lower() == "ping_matrix":
+        if len(argv) < 3:
+            print("./remote_topology.sh ping_matrix <output.csv|output.json> [count] [concurrency] "
+                  "[<services|nodes> [| <targets>]]")
+            exit(1)
+        count = 4
+        if len(argv) > 3:
+            count = int(argv[3])
+        concurrency = 4
+        if len(argv) > 4:
+            concurrency = int(argv[4])
+        sources = argv[5:]
+        targets = []
+        if "|" in sources:
+            targets = sources[sources.index("|") + 1:]
+            sources = sources[:sources.index("|")]
+        services = resolve_service_group(sources, engine)
+        matrix = engine.measure_latency_matrix(services, count, concurrency,
+                                               resolve_service_group(targets, engine) if len(targets) > 0 else None)
+        print(matrix)
+        matrix.write(argv[2])
     elif argv[1].lower() == "iperf":
         if len(argv) < 4:
             print(
@@ -257,6 +284,18 @@ def resolve_services(argv: typing.List[str], engine: Engine) -> typing.List[Serv
     return services
 
 
+def resolve_service_group(argv: typing.List[str], engine: Engine) -> typing.List[Service]:
+    """Resolves the given services and all services of the given nodes (all services if none given)."""
+    if len(argv) == 0:
+        return list(engine.topo.services.values())
+    services = resolve_services(argv, engine)
+    for node in resolve_nodes(argv, engine):
+        for service in engine.topo.get_node_services(node):
+            if service not in services:
+                services.append(service)
+    return services
+
+
 def print_intf(name, intf, rx, tx):
     if name == intf:
         print(f"Read: {NetworkUtils.format_bytes(rx)}Bytes - Write: {NetworkUtils.format_bytes(tx)}Bytes")
@@ -0,0 +1,82 @@
+import time
+import typing
+from threading import Lock
+from typing import Dict
+
+
+class CommandHistogram(object):
+    """Cumulative histogram of command durations."""
+
+    def __init__(self, buckets: typing.List[float]):
+        """buckets: upper bounds in seconds (increasing, +inf is implicit)"""
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, duration: float):
+        for i in range(0, len(self.buckets)):
+            if duration <= self.buckets[i]:
+                self.counts[i] += 1
+        self.sum += duration
+        self.count += 1
+
+    def copy(self) -> 'CommandHistogram':
+        ret = CommandHistogram(self.buckets)
+        ret.counts = list(self.counts)
+        ret.sum = self.sum
+        ret.count = self.count
+        return ret
+
+
+class CommandStats(object):
+    """Counts the local and ssh commands currently running and records the durations of finished ones per command
+       type (e.g. for the metrics endpoint of the engine)."""
+
+    instance: 'CommandStats' or None = None
+
+    DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+    def __init__(self, buckets: typing.List[float] or None = None):
+        self.buckets = buckets if buckets is not None else CommandStats.DEFAULT_BUCKETS
+        self.lock = Lock()
+        # Command type -> number of running commands
+        self.in_flight: Dict[str, int] = {}
+        # Command type -> durations of finished commands
+        self.histograms: Dict[str, CommandHistogram] = {}
+
+    @classmethod
+    def get_instance(cls) -> 'CommandStats':
+        if cls.instance is None:
+            cls.instance = CommandStats()
+        return cls.instance
+
+    @classmethod
+    def get_command_type(cls, command: 'LocalCommand') -> str:
+        return type(command).__name__
+
+    def on_start(self, command: 'LocalCommand'):
+        command.started = time.time()
+        name = CommandStats.get_command_type(command)
+        with self.lock:
+            self.in_flight[name] = self.in_flight.get(name, 0) + 1
+
+    def on_finish(self, command: 'LocalCommand'):
+        if command.started is None:
+            return
+        duration = time.time() - command.started
+        command.started = None
+        name = CommandStats.get_command_type(command)
+        with self.lock:
+            self.in_flight[name] = self.in_flight.get(name, 1) - 1
+            if name not in self.histograms.keys():
+                self.histograms[name] = CommandHistogram(self.buckets)
+            self.histograms[name].observe(duration)
+
+    def get_in_flight(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.in_flight)
+
+    def get_histograms(self) -> Dict[str, CommandHistogram]:
+        with self.lock:
+            return {name: histogram.copy() for name, histogram in self.histograms.items()}
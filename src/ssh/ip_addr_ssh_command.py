@@ -1,4 +1,6 @@
 import ipaddress
+import json
+import typing
 from enum import Enum
 from typing import Dict
 
@@ -62,3 +64,37 @@ class IpAddrSSHCommand(SSHCommand, OutputConsumer):
             self.results[ind] = (name, state, mac, li)
             self.current_interface = None
         pass
+
+
+class IpAddrJsonSSHCommand(IpAddrSSHCommand):
+    """Variant of IpAddrSSHCommand parsing the structured output of ip -json addr (iproute2 4.13 and newer).
+       valid is False if the output could not be parsed, in which case the text variant should be used."""
+
+    def __init__(self, target: Service or Node):
+        super().__init__(target)
+        self.command = (target.command_prefix() if isinstance(target, Service) else "") + "ip -json addr"
+        self.output: typing.List[str] = []
+        self.valid = False
+
+    def on_out(self, output: str):
+        self.output.append(output)
+
+    def on_return(self, code: int):
+        try:
+            interfaces = json.loads("\n".join(self.output))
+            self.results = {}
+            for intf in interfaces:
+                state = InterfaceState[intf['operstate']] if intf.get('operstate') in InterfaceState.__members__ \
+                    else InterfaceState.UNKNOWN
+                mac = None if intf.get('link_type') == "none" else intf.get('address')
+                ips = []
+                for addr in intf.get('addr_info', []):
+                    if 'local' not in addr or 'prefixlen' not in addr:
+                        continue
+                    ip = ipaddress.ip_address(addr['local'])
+                    ips.append((ip, ipaddress.ip_network(f"{addr['local']}/{addr['prefixlen']}", strict=False)))
+                self.results[int(intf['ifindex'])] = (intf['ifname'], state, mac, ips)
+            self.valid = True
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self.results = {}
+            self.valid = False
@@ -1,3 +1,4 @@
+import asyncio
 import threading
 import time
 import typing
@@ -23,6 +24,12 @@ class IperfSSHCommand(SSHCommand):
         self.client.run()
         x.join()
 
+    async def run_async(self):
+        server = asyncio.ensure_future(self.server.run_async())
+        await asyncio.sleep(0.5)
+        await self.client.run_async()
+        await server
+
     def abort(self):
         self.server.abort()
         self.client.abort()
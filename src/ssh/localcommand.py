@@ -1,47 +1,122 @@
+import asyncio
 import signal
 import subprocess
+import time
+import typing
 
+from ssh.command_stats import CommandStats
 from ssh.output_consumer import OutputConsumer
+from ssh.output_reader import OutputReader
 
 
 class LocalCommand(object):
-    def __init__(self, command: str):
+    def __init__(self, command: str, timeout: float or None = None, capture_stderr: bool = False):
+        """command: the shell command to execute
+           timeout: seconds after which the command is killed (None for no timeout)
+           capture_stderr: whether to collect stderr in self.stderr instead of passing it through"""
         self.command = command
+        self.timeout = timeout
+        self.capture_stderr = capture_stderr
         self.consumers = []
         self.process = None
         self.exit_code: int or None = None
+        self.stderr: str = ""
+        self.deadline: float or None = None
+        self.timed_out = False
+        # Start of the running command (see CommandStats)
+        self.started: float or None = None
 
     def add_consumer(self, consumer: OutputConsumer):
         self.consumers.append(consumer)
 
+    def get_shell_command(self) -> str:
+        """Returns the shell command that is actually executed locally when running this command."""
+        return self.command
+
     def run(self):
-        self._exec(self.command)
+        self._exec(self.get_shell_command())
 
-    def _exec(self, cmd: str):
+    def start(self):
+        """Starts the command without waiting for it. Output is processed once it is added to an OutputReader."""
+        self._start(self.get_shell_command())
+
+    def _start(self, cmd: str):
+        self.stderr = ""
+        self.timed_out = False
+        self.deadline = time.time() + self.timeout if self.timeout is not None else None
         self.process = subprocess.Popen(cmd,
                                         shell=True,
                                         stdout=subprocess.PIPE,
-                                        universal_newlines=True)
+                                        stderr=subprocess.PIPE if self.capture_stderr else None)
+        CommandStats.get_instance().on_start(self)
 
+    def _exec(self, cmd: str):
+        self._start(cmd)
+        try:
+            reader = OutputReader()
+            reader.add(self)
+            reader.run()
+        finally:
+            # Counts the command as finished if it did not return normally (e.g. a consumer raised)
+            CommandStats.get_instance().on_finish(self)
+
+    async def run_async(self):
+        """Asyncio counterpart to run, allowing many commands to run concurrently on one event loop."""
+        await self._exec_async(self.get_shell_command())
+
+    async def _exec_async(self, cmd: str):
+        self.stderr = ""
+        self.timed_out = False
+        self.process = await asyncio.create_subprocess_shell(cmd,
+                                                             stdout=subprocess.PIPE,
+                                                             stderr=subprocess.PIPE if self.capture_stderr else None)
+        CommandStats.get_instance().on_start(self)
+        try:
+            reads = [self._read_stdout_async()]
+            if self.capture_stderr:
+                reads.append(self._read_stderr_async())
+            try:
+                await asyncio.wait_for(asyncio.gather(*reads), self.timeout)
+            except asyncio.TimeoutError:
+                # Children of the shell might still hold the pipes open, so we do not wait for EOF
+                self.timed_out = True
+                self.process.kill()
+                while self.process.returncode is None:
+                    await asyncio.sleep(0.01)
+                self._on_return(self.process.returncode)
+                return
+            self._on_return(await self.process.wait())
+        finally:
+            # Counts the command as finished if it did not return normally (e.g. cancelled or a consumer raised)
+            CommandStats.get_instance().on_finish(self)
+
+    async def _read_stdout_async(self):
+        buffer = b""
         while True:
-            output = self.process.stdout.readline().strip()
-            if not output == "":
-                for consumer in self.consumers:
-                    consumer.on_out(output)
-            # Do something else
-            return_code = self.process.poll()
-            if return_code is not None:
-                # Process has finished, read rest of the output
-                for output in self.process.stdout.readlines():
-                    output = output.strip()
-                    if not output == "":
-                        for consumer in self.consumers:
-                            consumer.on_out(output)
-                self.exit_code = return_code
-                for consumer in self.consumers:
-                    consumer.on_return(return_code)
+            chunk = await self.process.stdout.read(OutputReader.CHUNK_SIZE)
+            eof = len(chunk) == 0
+            lines = (buffer + chunk).split(b"\n")
+            buffer = b"" if eof else lines.pop()
+            lines = [line.decode("utf-8", errors="replace").strip() for line in lines]
+            lines = [line for line in lines if line != ""]
+            if len(lines) > 0:
+                self._on_lines(lines)
+            if eof:
                 return
 
+    async def _read_stderr_async(self):
+        self.stderr = (await self.process.stderr.read()).decode("utf-8", errors="replace")
+
+    def _on_lines(self, lines: typing.List[str]):
+        for consumer in self.consumers:
+            consumer.on_lines(lines)
+
+    def _on_return(self, return_code: int):
+        CommandStats.get_instance().on_finish(self)
+        self.exit_code = return_code
+        for consumer in self.consumers:
+            consumer.on_return(return_code)
+
     def abort(self):
         if self.process:
             self.process.send_signal(signal.SIGINT)
@@ -52,3 +127,16 @@ class LocalCommand(object):
     @classmethod
     def encapsule_command(cls, cmd: str):
         return "\"" + cmd.replace("\\", "\\\\").replace("\"", "\\\"") + "\""
+
+    @classmethod
+    def run_all(cls, commands: typing.List['LocalCommand']):
+        """Runs all commands concurrently and services their output from the calling thread."""
+        reader = OutputReader()
+        try:
+            for command in commands:
+                command.start()
+                reader.add(command)
+            reader.run()
+        finally:
+            for command in commands:
+                CommandStats.get_instance().on_finish(command)
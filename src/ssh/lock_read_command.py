@@ -5,8 +5,11 @@ from topo.service import Service
 
 
 class LockReadSSHCommand(SSHCommand, OutputConsumer):
-    def __init__(self, target: Node, dir: str, file: str):
-        super().__init__(target, f"mkdir -p {dir} && flock {dir}/{file} cat {dir}/{file}")
+    def __init__(self, target: Node, dir: str, file: str, lock_file: str or None = None):
+        """lock_file: file to hold the lock on while reading (the file itself if None)"""
+        if lock_file is None:
+            lock_file = file
+        super().__init__(target, f"mkdir -p {dir} && flock {dir}/{lock_file} cat {dir}/{file}")
         self.add_consumer(self)
         self.content: str = ""
 
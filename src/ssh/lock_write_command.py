@@ -4,15 +4,21 @@ from topo.service import Service
 
 
 class LockWriteSSHCommand(SSHCommand):
-    def __init__(self, node: Node or Service, dir: str, file: str, local: str):
+    def __init__(self, node: Node or Service, dir: str, file: str, local: str,
+                 digest: str or None = None, digest_suffix: str = ".sha256"):
+        """digest: written to a file next to the target file (file + digest_suffix) while holding the lock"""
         super().__init__(node, "")
         self.prefix = node.command_prefix() if isinstance(node, Service) else ""
         self.dir = dir
         self.file = file
         self.local = local
+        self.digest = digest
+        self.digest_suffix = digest_suffix
 
-    def run(self):
+    def get_shell_command(self) -> str:
         inner = f"cat > \"{self.dir}/{self.file}\""
+        if self.digest:
+            inner += f" && echo {self.digest} > \"{self.dir}/{self.file}{self.digest_suffix}\""
         inner1 = f"{self.prefix} mkdir -p {self.dir} && flock {self.dir}/{self.file} /bin/bash -c " + self.encapsule(inner)
-        cmd = f"cat \"{self.local}\" | {self.node.get_ssh_base_command()} " + self.encapsule(inner1)
-        self._exec(cmd)
+        cmd = f"cat \"{self.local}\" | {self.get_ssh_base_command()} " + self.encapsule(inner1)
+        return cmd
@@ -1,3 +1,5 @@
+import json
+import typing
 from enum import Enum
 from typing import Dict
 
@@ -26,3 +28,33 @@ class LxcContainerListCommand(SSHCommand, OutputConsumer):
 
     def on_return(self, code: int):
         pass
+
+
+class LxcContainerListJsonCommand(LxcContainerListCommand):
+    """Variant of LxcContainerListCommand parsing the structured output of lxc list --format json.
+       valid is False if the output could not be parsed, in which case the text variant should be used."""
+
+    def __init__(self, target: Node):
+        super().__init__(target)
+        self.command = "lxc ls --format json"
+        self.output: typing.List[str] = []
+        self.valid = False
+
+    def on_out(self, output: str):
+        self.output.append(output)
+
+    def on_return(self, code: int):
+        try:
+            containers = json.loads("\n".join(self.output))
+            self.results = {}
+            for container in containers:
+                # Old versions do not report the type, they only know containers
+                if container.get('type', "container") != "container":
+                    continue
+                status = container['status'].upper()
+                if status in LXCContainerStatus.__members__:
+                    self.results[container['name']] = LXCContainerStatus[status]
+            self.valid = True
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self.results = {}
+            self.valid = False
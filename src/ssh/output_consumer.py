@@ -1,3 +1,4 @@
+import typing
 from abc import ABC, abstractmethod
 
 
@@ -6,6 +7,11 @@ class OutputConsumer(ABC):
     def on_out(self, output: str):
         pass
 
+    def on_lines(self, lines: typing.List[str]):
+        """Receives a batch of output lines. Override to process batches at once, defaults to on_out per line."""
+        for line in lines:
+            self.on_out(line)
+
     @abstractmethod
     def on_return(self, code: int):
         pass
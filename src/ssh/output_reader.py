@@ -0,0 +1,96 @@
+import codecs
+import os
+import selectors
+import signal
+import time
+import typing
+
+
+class OutputReader(object):
+    """Services the output of many running commands from a single thread.
+
+       Output is read in large chunks as soon as the selector reports it, split into lines in bulk and handed to
+       the command as one batch per chunk instead of one consumer call per readline."""
+
+    CHUNK_SIZE = 65536
+
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        # Command -> file descriptors of streams that did not reach EOF yet
+        self.open_streams: typing.Dict['LocalCommand', typing.List[int]] = {}
+        self.buffers: typing.Dict[int, str] = {}
+        self.decoders: typing.Dict[int, codecs.IncrementalDecoder] = {}
+
+    def add(self, command: 'LocalCommand'):
+        """Registers an already started command with this reader."""
+        streams = [(command.process.stdout, False)]
+        if command.process.stderr is not None:
+            streams.append((command.process.stderr, True))
+        self.open_streams[command] = []
+        for stream, is_stderr in streams:
+            fd = stream.fileno()
+            self.buffers[fd] = ""
+            self.decoders[fd] = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            self.selector.register(fd, selectors.EVENT_READ, (command, is_stderr))
+            self.open_streams[command].append(fd)
+
+    def run(self):
+        """Blocks until all registered commands have terminated."""
+        while len(self.open_streams) > 0:
+            events = self.selector.select(self._next_timeout())
+            for key, _ in events:
+                command, is_stderr = key.data
+                self._read(key.fd, command, is_stderr)
+            self._check_timeouts()
+        self.selector.close()
+
+    def _read(self, fd: int, command: 'LocalCommand', is_stderr: bool):
+        try:
+            chunk = os.read(fd, OutputReader.CHUNK_SIZE)
+        except OSError:
+            chunk = b""
+        eof = len(chunk) == 0
+        data = self.buffers[fd] + self.decoders[fd].decode(chunk, final=eof)
+        lines = data.split("\n")
+        self.buffers[fd] = "" if eof else lines.pop()
+        if is_stderr:
+            command.stderr += "\n".join(lines) + ("" if eof else "\n")
+        else:
+            lines = [line.strip() for line in lines]
+            lines = [line for line in lines if line != ""]
+            if len(lines) > 0:
+                command._on_lines(lines)
+        if eof:
+            self._close(fd, command)
+            if len(self.open_streams[command]) == 0:
+                self._finish(command)
+
+    def _close(self, fd: int, command: 'LocalCommand'):
+        self.selector.unregister(fd)
+        del self.buffers[fd]
+        del self.decoders[fd]
+        self.open_streams[command].remove(fd)
+
+    def _finish(self, command: 'LocalCommand'):
+        for fd in list(self.open_streams[command]):
+            self._close(fd, command)
+        del self.open_streams[command]
+        command.process.stdout.close()
+        if command.process.stderr is not None:
+            command.process.stderr.close()
+        command._on_return(command.process.wait())
+
+    def _next_timeout(self) -> float or None:
+        deadlines = [c.deadline for c in self.open_streams.keys() if c.deadline is not None and not c.timed_out]
+        if len(deadlines) == 0:
+            return None
+        return max(0.0, min(deadlines) - time.time())
+
+    def _check_timeouts(self):
+        now = time.time()
+        for command in list(self.open_streams.keys()):
+            if command.deadline is not None and not command.timed_out and now >= command.deadline:
+                # Children of the shell might still hold the pipes open, so we do not wait for EOF
+                command.timed_out = True
+                command.process.send_signal(signal.SIGKILL)
+                self._finish(command)
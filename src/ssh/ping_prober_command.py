@@ -0,0 +1,57 @@
+import typing
+
+from ssh.output_consumer import OutputConsumer
+from ssh.ping_ssh_command import PingSSHCommand
+from ssh.ssh_command import SSHCommand
+from ssh.string_util import StringUtil
+from topo.node import Node
+from topo.service import Service
+
+
+class PingProberSSHCommand(SSHCommand, OutputConsumer):
+    """Runs one continuous ping per pair for any number of sources on a node over a single ssh session.
+
+       Every output line is tagged with the index of its pair on the node and handed to a PingSSHCommand parser of
+       that pair, whose consumer receives every single result as it arrives."""
+
+    MARKER = "#testbed-ping"
+
+    def __init__(self, node: Node, pairs: typing.List[typing.Tuple[Service or Node, str]], interval: float = 1,
+                 deadline: int = 60,
+                 consumer: typing.Callable[[int, int, str or typing.Tuple[int, float]], None] or None = None):
+        """node: the node all sources run on
+           pairs: source and target ip of every ping
+           interval: seconds between two pings of a pair
+           deadline: seconds after which all pings exit
+           consumer: receives pair index, icmp sequence number and result (error or ttl and time) of every ping"""
+        script = []
+        self.parsers: typing.List[PingSSHCommand] = []
+        for i in range(0, len(pairs)):
+            source, target = pairs[i]
+            prefix = source.command_prefix() if isinstance(source, Service) else ""
+            ping = PingSSHCommand.get_ping_command(target, None, interval, deadline)
+            script.append(f"{prefix}{ping} 2>&1 | sed -u 's/^/{PingProberSSHCommand.MARKER}-{i} /' &")
+            self.parsers.append(PingSSHCommand(source, target, None,
+                                               PingProberSSHCommand.get_pair_consumer(consumer, i), interval,
+                                               deadline, False))
+        script.append("wait")
+        super().__init__(node, "\n".join(script), timeout=deadline + 30)
+        self.add_consumer(self)
+
+    @classmethod
+    def get_pair_consumer(cls, consumer: typing.Callable[[int, int, str or typing.Tuple[int, float]], None] or None,
+                          index: int) -> typing.Callable[[int, str or typing.Tuple[int, float]], None] or None:
+        if consumer is None:
+            return None
+        return lambda icmp_seq, result: consumer(index, icmp_seq, result)
+
+    def on_out(self, output: str):
+        if not output.startswith(PingProberSSHCommand.MARKER + "-"):
+            return
+        split = StringUtil.remove_prefix(output, PingProberSSHCommand.MARKER + "-").split(" ", 1)
+        if len(split) == 2 and split[0].isdigit() and int(split[0]) < len(self.parsers):
+            self.parsers[int(split[0])].on_out(split[1])
+
+    def on_return(self, code: int):
+        for parser in self.parsers:
+            parser.on_return(code)
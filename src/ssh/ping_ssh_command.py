@@ -8,14 +8,19 @@ from topo.service import Service
 
 
 class PingSSHCommand(SSHCommand, OutputConsumer):
-    def __init__(self, source: Service or Node, target: str, count: int or None = 4, consumer=None):
-        count_str = ""
-        if count is not None:
-            count_str = f"-c {str(count)}"
+    def __init__(self, source: Service or Node, target: str, count: int or None = 4, consumer=None,
+                 interval: float or None = None, deadline: int or None = None, keep_results: bool = True):
+        """count: number of pings to send (None for unbounded)
+           interval: seconds between two pings (None for the default of ping)
+           deadline: seconds after which ping exits regardless of the number of pings sent (None for no deadline)
+           keep_results: whether to collect all results in ping_results (disable for unbounded pings that only
+                         report to the consumer)"""
         super().__init__(source.executor if isinstance(source, Service) else source,
                          (source.command_prefix() if isinstance(source, Service) else "") +
-                         f"ping {count_str} {str(target)}")
+                         PingSSHCommand.get_ping_command(target, count, interval, deadline))
         self.add_consumer(self)
+        self.target = target
+        self.keep_results = keep_results
         self.ping_results: Dict[int, (str or (int, float))] = {}
         self.packets_transmitted: int or None = None
         self.packets_received: int or None = None
@@ -26,6 +31,19 @@ class PingSSHCommand(SSHCommand, OutputConsumer):
         self.mdev: float or None = None
         self.consumer = consumer
 
+    @classmethod
+    def get_ping_command(cls, target: str, count: int or None = 4, interval: float or None = None,
+                         deadline: int or None = None) -> str:
+        ret = "ping"
+        if count is not None:
+            ret += f" -c {str(count)}"
+        if interval is not None:
+            # Report pings without reply as soon as the next one is sent
+            ret += f" -O -i {str(interval)}"
+        if deadline is not None:
+            ret += f" -w {str(deadline)}"
+        return ret + f" {str(target)}"
+
     def on_out(self, output: str):
         args = output.split()
         if "icmp_seq=" in output:
@@ -35,13 +53,15 @@ class PingSSHCommand(SSHCommand, OutputConsumer):
                 # Successful ping result
                 ttl = int(StringUtil.get_argument_starting_with(args, "ttl="))
                 time = float(StringUtil.get_argument_starting_with(args, "time="))
-                self.ping_results[icmp_seq] = (ttl, time)
+                if self.keep_results:
+                    self.ping_results[icmp_seq] = (ttl, time)
                 if self.consumer:
                     self.consumer(icmp_seq, (ttl, time))
             else:
                 # Not successful ping result
                 reason = output.split(f"icmp_seq={icmp_seq}")[1].strip()
-                self.ping_results[icmp_seq] = reason
+                if self.keep_results:
+                    self.ping_results[icmp_seq] = reason
                 if self.consumer:
                     self.consumer(icmp_seq, reason)
         elif "packets transmitted" in output:
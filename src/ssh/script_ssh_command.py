@@ -0,0 +1,59 @@
+import typing
+
+from ssh.output_consumer import OutputConsumer
+from ssh.ssh_command import SSHCommand
+from ssh.string_util import StringUtil
+from topo.node import Node
+
+
+class ScriptSSHCommand(SSHCommand, OutputConsumer):
+    """Runs a list of commands as one bash script over a single ssh session.
+
+       Every command is preceded by a marker line in the output, so output and failures can still be attributed to
+       the exact command that caused them."""
+
+    MARKER = "#testbed-cmd"
+
+    def __init__(self, node: Node, commands: typing.List[str], exit_on_error: bool = True,
+                 output_consumer: OutputConsumer or None = None):
+        """node: the node to run the script on
+           commands: the commands to run in order
+           exit_on_error: whether to abort the script at the first failing command (set -e)
+           output_consumer: receives every command followed by its output"""
+        script = ["set -e"] if exit_on_error else []
+        for i in range(0, len(commands)):
+            script.append(f"echo '{ScriptSSHCommand.MARKER} {i}'")
+            # Commands must not consume the rest of the script from stdin
+            script.append("{ " + commands[i] + "\n} < /dev/null")
+        script.append(f"echo '{ScriptSSHCommand.MARKER} done'")
+        super().__init__(node, "\n".join(script))
+        self.commands = commands
+        self.output_consumer = output_consumer
+        self.add_consumer(self)
+        self.current: int or None = None
+        self.completed = False
+
+    def on_out(self, output: str):
+        if output.startswith(ScriptSSHCommand.MARKER):
+            arg = StringUtil.remove_prefix(output, ScriptSSHCommand.MARKER).strip()
+            if arg == "done":
+                self.completed = True
+                self.current = None
+                return
+            if arg.isdigit() and int(arg) < len(self.commands):
+                self.current = int(arg)
+                if self.output_consumer:
+                    self.output_consumer.on_out(self.commands[self.current])
+                return
+        if self.output_consumer:
+            self.output_consumer.on_out(output)
+
+    def on_return(self, code: int):
+        if self.output_consumer:
+            self.output_consumer.on_return(code)
+
+    def get_failed_command(self) -> str or None:
+        """Returns the command the script stopped at, None if it ran to completion or never started."""
+        if self.completed or self.current is None:
+            return None
+        return self.commands[self.current]
@@ -1,22 +1,36 @@
+import base64
 from pathlib import Path, PurePath
 
 from ssh.localcommand import LocalCommand
+from ssh.ssh_connection_pool import SSHConnectionPool
 from topo.node import Node
 
 
 # TODO Do not require SSH Server on local node
 class SSHCommand(LocalCommand):
-    def __init__(self, node: Node, command: str):
-        super().__init__(command)
+    def __init__(self, node: Node, command: str, timeout: float or None = None, capture_stderr: bool = False):
+        super().__init__(command, timeout, capture_stderr)
         self.node = node
 
-    def run(self):
+    def get_ssh_base_command(self) -> str:
+        return SSHConnectionPool.get_instance().get_ssh_base_command(self.node)
+
+    def get_shell_command(self) -> str:
         cmd = "("
         if self.node.ssh_work_dir and self.node.ssh_work_dir != "":
             cmd += f"echo \" cd \\\"{self.node.ssh_work_dir}\\\"\" && "
         cmd += "echo \"" + self.command.replace("\\", "\\\\").replace("\"", "\\\"") + "\""
-        cmd += ") | " + self.node.get_ssh_base_command() + " \"/bin/bash\""
-        self._exec(cmd)
+        cmd += ") | " + self.get_ssh_base_command() + " \"/bin/bash\""
+        return cmd
+
+    def get_encoded_shell_command(self) -> str:
+        """Like get_shell_command, but sends the command encoded, so the local shell does not expand any of its
+           variables (for commands using shell variables or substitutions on the node)."""
+        script = self.command
+        if self.node.ssh_work_dir and self.node.ssh_work_dir != "":
+            script = f"cd \"{self.node.ssh_work_dir}\"\n" + script
+        encoded = base64.b64encode(script.encode("utf-8")).decode("ascii")
+        return f"echo {encoded} | base64 -d | " + self.get_ssh_base_command() + " \"/bin/bash\""
 
 
 class FileSendCommand(SSHCommand):
@@ -26,7 +40,7 @@ class FileSendCommand(SSHCommand):
         self.src = src
         self.dst = dst
 
-    def run(self):
+    def get_shell_command(self) -> str:
         p = ""
         if self.node.ssh_work_dir and self.node.ssh_work_dir != "":
             p += f"{self.node.ssh_work_dir}/"
@@ -35,6 +49,6 @@ class FileSendCommand(SSHCommand):
         inner = f"{self.prefix} /bin/bash -c " + self.encapsule(inner)
         mkdir = f"mkdir -p \"{str(PurePath(p).parent)}\""
         mkdir = f"{self.prefix} /bin/bash -c " + self.encapsule(mkdir)
-        cmd = f"{self.node.get_ssh_base_command()} "+self.encapsule(mkdir)+" &&"
-        cmd += f" cat \"{self.src}\" | {self.node.get_ssh_base_command()} " + self.encapsule(inner)
-        self._exec(cmd)
+        cmd = f"{self.get_ssh_base_command()} "+self.encapsule(mkdir)+" &&"
+        cmd += f" cat \"{self.src}\" | {self.get_ssh_base_command()} " + self.encapsule(inner)
+        return cmd
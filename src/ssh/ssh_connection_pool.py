@@ -0,0 +1,115 @@
+import hashlib
+import os
+import subprocess
+import tempfile
+import time
+import typing
+from threading import Lock
+from typing import Dict
+
+from topo.node import Node
+
+
+class SSHConnectionPool(object):
+    """Keeps one multiplexed ssh master connection (ControlMaster) per node that all ssh commands share.
+
+       The first command to a node establishes the master connection, every following command only opens a new
+       channel on the existing socket and skips the TCP and key exchange handshake. Masters exit on their own after
+       being idle for idle_timeout seconds and are health checked at most every check_interval seconds by evict_idle,
+       so building commands never waits for ssh."""
+
+    instance: 'SSHConnectionPool' or None = None
+
+    def __init__(self, control_dir: str = None, idle_timeout: int = 60, check_interval: int = 30,
+                 control_timeout: float = 5):
+        """control_dir: directory to place the control sockets in (temporary directory if None)
+           idle_timeout: seconds after which an unused master connection is closed
+           check_interval: seconds between health checks of a master connection
+           control_timeout: seconds to wait for a master connection to answer a health check or exit request"""
+        if control_dir is None:
+            control_dir = os.path.join(tempfile.gettempdir(), f"testbed-ssh-{os.getuid()}")
+        os.makedirs(control_dir, mode=0o700, exist_ok=True)
+        self.control_dir = control_dir
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self.control_timeout = control_timeout
+        self.enabled = True
+        self.lock = Lock()
+        # Control path -> (node, time of last use, time of last health check)
+        self.connections: Dict[str, typing.Tuple[Node, float, float]] = {}
+
+    @classmethod
+    def get_instance(cls) -> 'SSHConnectionPool':
+        if cls.instance is None:
+            cls.instance = SSHConnectionPool()
+        return cls.instance
+
+    def get_control_path(self, node: Node) -> str:
+        # Unix socket paths are limited to ~100 characters, so we use a short digest instead of the remote itself
+        digest = hashlib.sha1(node.get_ssh_base_command().encode()).hexdigest()[:16]
+        return os.path.join(self.control_dir, f"cm-{digest}")
+
+    def get_ssh_options(self, node: Node) -> str:
+        path = self.get_control_path(node)
+        return f"-o ControlMaster=auto -o ControlPath={path} -o ControlPersist={self.idle_timeout}"
+
+    def get_ssh_base_command(self, node: Node) -> str:
+        if not self.enabled:
+            return node.get_ssh_base_command()
+        path = self.get_control_path(node)
+        now = time.time()
+        with self.lock:
+            last_check = self.connections[path][2] if path in self.connections else now
+            self.connections[path] = (node, now, last_check)
+        return node.get_ssh_base_command(self.get_ssh_options(node))
+
+    def check(self, node: Node) -> bool:
+        path = self.get_control_path(node)
+        if not os.path.exists(path):
+            return True
+        return self._control(node, "check") == 0
+
+    def evict_idle(self):
+        """Closes idle master connections and health checks the others (blocks up to control_timeout per node)."""
+        now = time.time()
+        with self.lock:
+            idle = [path for path, (_, last_use, _) in self.connections.items() if now - last_use > self.idle_timeout]
+            nodes = [self.connections.pop(path)[0] for path in idle]
+            checks = []
+            for path, (node, last_use, last_check) in self.connections.items():
+                if now - last_check > self.check_interval:
+                    self.connections[path] = (node, last_use, now)
+                    checks.append((path, node))
+        for node in nodes:
+            self.close(node)
+        for path, node in checks:
+            if not self.check(node):
+                # Master died without removing its socket, remove it so the next command establishes a new one
+                self.remove_socket(path)
+
+    def close(self, node: Node):
+        path = self.get_control_path(node)
+        with self.lock:
+            self.connections.pop(path, None)
+        if os.path.exists(path):
+            self._control(node, "exit")
+
+    def close_all(self):
+        with self.lock:
+            nodes = [node for node, _, _ in self.connections.values()]
+        for node in nodes:
+            self.close(node)
+
+    def remove_socket(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _control(self, node: Node, command: str) -> int:
+        try:
+            return subprocess.call(node.get_ssh_base_command(f"{self.get_ssh_options(node)} -O {command}"),
+                                   shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                   timeout=self.control_timeout)
+        except subprocess.TimeoutExpired:
+            return -1
@@ -0,0 +1,104 @@
+import typing
+from typing import Dict
+
+from ssh.ip_addr_ssh_command import IpAddrSSHCommand, IpAddrJsonSSHCommand
+from ssh.lxc_container_command import LxcContainerListCommand, LxcContainerListJsonCommand, LXCContainerStatus
+from ssh.output_consumer import OutputConsumer
+from ssh.ssh_command import SSHCommand
+from ssh.string_util import StringUtil
+from ssh.tc_qdisc_command import TcQdiscSSHCommand, TcQdiscJsonSSHCommand
+from topo.node import Node
+from topo.service import Service
+
+
+class StatusProbeSSHCommand(SSHCommand, OutputConsumer):
+    """Gathers the container list as well as ip addr and tc qdisc of the node and all given services in one ssh
+       round trip. Output sections are delimited by marker lines and handed to the regular parsers.
+
+       Containers are only queried if they are running on the node, sections of other containers are left out.
+       With json set, the structured output of ip -json, tc -json and lxc ls --format json is requested instead
+       (see is_json_valid to detect nodes that do not support it)."""
+
+    MARKER = "#testbed-probe"
+
+    def __init__(self, target: Node, services: typing.List[Service], json: bool = False):
+        self.json = json
+        ip_cmd = "ip -json addr" if json else "ip addr"
+        tc_cmd = "tc -json qdisc" if json else "tc qdisc"
+        script = [f"echo '{StatusProbeSSHCommand.MARKER} lxc'", "lxc ls --format json" if json else "lxc ls",
+                  # Space separated names of the running containers
+                  "running=\" $(lxc ls -c ns --format csv 2> /dev/null "
+                  "| awk -F, '$2 == \"RUNNING\" { printf \"%s \", $1 }') \""]
+        script += self.section_commands(None, ip_cmd, tc_cmd)
+        for service in services:
+            if service.command_prefix() == "":
+                # Not a container, always queried
+                script += self.section_commands(service, ip_cmd, tc_cmd)
+            else:
+                script.append(f"case \"$running\" in *\" {service.name} \"*) "
+                              + "; ".join(self.section_commands(service, ip_cmd, tc_cmd)) + ";; esac")
+        super().__init__(target, "; ".join(script))
+        self.add_consumer(self)
+        self.lxc = LxcContainerListJsonCommand(target) if json else LxcContainerListCommand(target)
+        self.host_ip_addr = IpAddrJsonSSHCommand(target) if json else IpAddrSSHCommand(target)
+        self.host_tc_qdisc = TcQdiscJsonSSHCommand(target) if json else TcQdiscSSHCommand(target)
+        # Service name -> parsers, only filled for services whose section was received
+        self.ip_addr: Dict[str, IpAddrSSHCommand] = {}
+        self.tc_qdisc: Dict[str, TcQdiscSSHCommand] = {}
+        self.services: Dict[str, Service] = {service.name: service for service in services}
+        self.current: OutputConsumer or None = None
+
+    def get_shell_command(self) -> str:
+        return self.get_encoded_shell_command()
+
+    def section_commands(self, service: Service or None, ip_cmd: str, tc_cmd: str) -> typing.List[str]:
+        name = "" if service is None else " " + service.name
+        prefix = "" if service is None else service.command_prefix()
+        # Errors (e.g. container not running) only result in an empty section
+        return [f"echo '{StatusProbeSSHCommand.MARKER} ip{name}'", f"{prefix}{ip_cmd} 2> /dev/null",
+                f"echo '{StatusProbeSSHCommand.MARKER} tc{name}'", f"{prefix}{tc_cmd} 2> /dev/null"]
+
+    def on_out(self, output: str):
+        if output.startswith(StatusProbeSSHCommand.MARKER):
+            self.finish_section()
+            split = StringUtil.remove_prefix(output, StatusProbeSSHCommand.MARKER).split()
+            self.current = self.get_section_parser(split[0], split[1] if len(split) > 1 else None)
+            return
+        if self.current:
+            self.current.on_out(output)
+
+    def get_section_parser(self, section: str, service_name: str or None) -> OutputConsumer or None:
+        if section == "lxc":
+            return self.lxc
+        if service_name is None:
+            return self.host_ip_addr if section == "ip" else self.host_tc_qdisc
+        if service_name not in self.services:
+            return None
+        service = self.services[service_name]
+        if section == "ip":
+            self.ip_addr[service_name] = IpAddrJsonSSHCommand(service) if self.json else IpAddrSSHCommand(service)
+            return self.ip_addr[service_name]
+        self.tc_qdisc[service_name] = TcQdiscJsonSSHCommand(service) if self.json else TcQdiscSSHCommand(service)
+        return self.tc_qdisc[service_name]
+
+    def finish_section(self):
+        if self.current:
+            self.current.on_return(0)
+        self.current = None
+
+    def on_return(self, code: int):
+        self.finish_section()
+
+    def is_json_valid(self) -> bool:
+        """Whether the json output of the node and all running services could be parsed."""
+        if not self.json:
+            return False
+        parsers = [self.lxc, self.host_ip_addr, self.host_tc_qdisc]
+        for name, status in self.lxc.results.items():
+            if status == LXCContainerStatus.RUNNING:
+                parsers += [by_service[name] for by_service in [self.ip_addr, self.tc_qdisc]
+                            if name in by_service.keys()]
+        for parser in parsers:
+            if not parser.valid:
+                return False
+        return True
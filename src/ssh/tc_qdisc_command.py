@@ -1,3 +1,4 @@
+import json
 import typing
 from typing import Dict
 
@@ -79,3 +80,40 @@ class TcQdiscSSHCommand(SSHCommand, OutputConsumer):
             if li[i] == arg:
                 return i
         return -1
+
+
+class TcQdiscJsonSSHCommand(TcQdiscSSHCommand):
+    """Variant of TcQdiscSSHCommand parsing the structured output of tc -json qdisc.
+       valid is False if the output could not be parsed, in which case the text variant should be used."""
+
+    def __init__(self, target: Service or Node):
+        super().__init__(target)
+        self.command = (target.command_prefix() if isinstance(target, Service) else "") + "tc -json qdisc"
+        self.output: typing.List[str] = []
+        self.valid = False
+
+    def on_out(self, output: str):
+        self.output.append(output)
+
+    def on_return(self, code: int):
+        try:
+            qdiscs = json.loads("\n".join(self.output))
+            self.results = {}
+            for qdisc in qdiscs:
+                if qdisc['kind'] != "netem":
+                    # We cannot work with this type of qdisc
+                    self.results[qdisc['dev']] = (0, 0, 0, 0, 0)
+                    continue
+                options = qdisc.get('options', {})
+                delay = options.get('delay', {})
+                loss = options.get('loss-random', {})
+                # Times are reported in seconds, percentages as fractions
+                self.results[qdisc['dev']] = (int(round(float(delay.get('delay', 0)) * 1000 * 1000)),
+                                              int(round(float(delay.get('jitter', 0)) * 1000 * 1000)),
+                                              float(delay.get('correlation', 0)),
+                                              float(loss.get('loss', 0)),
+                                              float(loss.get('correlation', 0)))
+            self.valid = True
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self.results = {}
+            self.valid = False
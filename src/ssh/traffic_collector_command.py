@@ -0,0 +1,90 @@
+import typing
+from typing import Dict
+
+from ssh.output_consumer import OutputConsumer
+from ssh.ssh_command import SSHCommand
+from topo.node import Node
+from topo.service import Service
+
+
+class TrafficCollectorSSHCommand(SSHCommand, OutputConsumer):
+    """Samples the byte counters of all devices of a node (bridges, veth and vxlan devices included) and of all
+       interfaces of the given containers with one long-running remote process.
+
+       Counters are read from /proc/net/dev of the node and /proc/<pid>/net/dev of every container, an awk filter on
+       the node turns them into deltas and only streams back devices that transferred data:
+
+           = <seconds since the last sample>
+           <container name or -> <device> <received bytes> <transmitted bytes>
+           E
+
+       Every complete sample is handed to the consumer as (container name or None for the node, device) -> (rx, tx)
+       in bits per second. Devices missing from a sample were idle."""
+
+    AWK_FILTER = (
+        "$1 == \"T\" { if (t0 != \"\") { printf \"= %.3f\\n\", $2 - t0; ok = 1 } t0 = $2; next } "
+        "$1 == \"S\" { s = $2; next } "
+        "$1 == \"E\" { if (ok) print \"E\"; fflush(); next } "
+        "index($0, \":\") > 0 { p = index($0, \":\"); d = substr($0, 1, p - 1); gsub(/ /, \"\", d); "
+        "split(substr($0, p + 1), f, \" \"); k = s \" \" d; "
+        "if (k in rx) { r = f[1] - rx[k]; t = f[9] - tx[k]; if (r < 0) r = 0; if (t < 0) t = 0; "
+        "if (r > 0 || t > 0) printf \"%s %s %.0f %.0f\\n\", s, d, r, t } "
+        "rx[k] = f[1]; tx[k] = f[9] }")
+
+    def __init__(self, node: Node, services: typing.List[Service], interval: float = 1, samples: int = 10,
+                 consumer: typing.Callable[[Dict[typing.Tuple[str or None, str], typing.Tuple[int, int]]], None]
+                 or None = None):
+        """node: the node to sample
+           services: the containers on the node to sample as well (services running directly on the node are
+                     covered by the counters of the node)
+           interval: seconds between two samples
+           samples: number of samples after which the remote process exits (the first one only initializes)
+           consumer: receives every complete sample"""
+        self.containers = [service.name for service in services if service.command_prefix() != ""]
+        script = [
+            f"names=\"{' '.join(self.containers)}\"",
+            "declare -A pids",
+            f"for i in $(seq 0 {samples}); do",
+            "  echo \"T $(date +%s.%N)\"",
+            "  echo 'S -'",
+            "  cat /proc/net/dev",
+            "  for n in $names; do",
+            "    p=${pids[$n]}",
+            # Look up the init process of a container once (again if it was restarted)
+            "    if [ -z \"$p\" ] || [ ! -r /proc/$p/net/dev ]; then",
+            "      p=$(lxc info $n 2> /dev/null | awk 'tolower($1) == \"pid:\" { print $2 }')",
+            "      pids[$n]=$p",
+            "    fi",
+            "    if [ -n \"$p\" ] && [ \"$p\" != \"0\" ]; then echo \"S $n\"; cat /proc/$p/net/dev 2> /dev/null; fi",
+            "  done",
+            "  echo E",
+            f"  if [ $i -lt {samples} ]; then sleep {interval}; fi",
+            f"done | awk '{TrafficCollectorSSHCommand.AWK_FILTER}'"
+        ]
+        super().__init__(node, "\n".join(script), timeout=(samples + 2) * interval + 30)
+        self.add_consumer(self)
+        self.interval = interval
+        self.consumer = consumer
+        self.duration: float or None = None
+        self.sample: Dict[typing.Tuple[str or None, str], typing.Tuple[int, int]] = {}
+
+    def get_shell_command(self) -> str:
+        return self.get_encoded_shell_command()
+
+    def on_out(self, output: str):
+        split = output.split()
+        if len(split) == 2 and split[0] == "=":
+            self.duration = float(split[1])
+            self.sample = {}
+        elif len(split) == 1 and split[0] == "E":
+            if self.consumer and self.duration is not None:
+                self.consumer(self.sample)
+            self.duration = None
+        elif len(split) == 4 and self.duration is not None:
+            duration = self.duration if self.duration > 0 else self.interval
+            container = None if split[0] == "-" else split[0]
+            self.sample[(container, split[1])] = (int(int(split[2]) * 8 / duration),
+                                                  int(int(split[3]) * 8 / duration))
+
+    def on_return(self, code: int):
+        pass
@@ -1,3 +1,4 @@
+import functools
 import typing
 from ipaddress import ip_address, ip_network
 
@@ -53,9 +54,21 @@ class Interface(object):
         mac_address = in_dict['mac_addr']
         ret = Interface(name, mac_address)
         for ip in in_dict['ips']:
-            ret.ips.append(ip_address(ip))
+            ret.ips.append(Interface.parse_ip(ip))
         for network in in_dict['networks']:
-            ret.networks.append(ip_network(network))
+            ret.networks.append(Interface.parse_network(network))
         ret.bind_name = in_dict['bind_name']
         ret.gui_data = GuiDataAttachment.from_dict(in_dict['gui_data'])
         return ret
+
+    # Parsed ips and networks of imported topologies are immutable, so the most recent ones are shared between
+    # interfaces
+    @classmethod
+    @functools.lru_cache(maxsize=65536)
+    def parse_ip(cls, ip: str) -> ip_address:
+        return ip_address(ip)
+
+    @classmethod
+    @functools.lru_cache(maxsize=4096)
+    def parse_network(cls, network: str) -> ip_network:
+        return ip_network(network)
@@ -43,9 +43,8 @@ class Link(object):
         self.intf_name2 = intf_name2 if intf_name2 else Link.inf_name(service2.executor,
                                                                       service2.executor.get_new_virtual_device_num())
         # Locate interfaces or add them
-        if service1.get_interface(self.intf_name1):
-            self.intf1 = service1.get_interface(self.intf_name1)
-        else:
+        self.intf1 = service1.get_interface(self.intf_name1)
+        if self.intf1 is None:
             self.intf1 = service1.add_interface_by_name(self.intf_name1)
             if service1.main_ip is None:
                 service1.main_ip = topo.network_implementation.get_network_address_generator().generate_ip(service1, self.intf1)
@@ -56,9 +55,8 @@ class Link(object):
                 service1.main_network
             )
         self.intf1.links.append(self)
-        if service2.get_interface(self.intf_name2):
-            self.intf2 = service2.get_interface(self.intf_name2)
-        else:
+        self.intf2 = service2.get_interface(self.intf_name2)
+        if self.intf2 is None:
             self.intf2 = service2.add_interface_by_name(self.intf_name2)
             if service2.main_ip is None:
                 service2.main_ip = topo.network_implementation.get_network_address_generator().generate_ip(service2,
@@ -30,7 +30,8 @@ class Node(ABC):
         self.ssh_port = ssh_port
         self.gui_data: GuiDataAttachment = GuiDataAttachment()
 
-    def get_ssh_base_command(self) -> str:
+    def get_ssh_base_command(self, ssh_options: str = None) -> str:
+        """ssh_options: additional options passed to ssh before the remote (e.g. multiplexing options)"""
         if not self.ssh_remote:
             # Determine from interface
             for intf in self.intfs:
@@ -42,6 +43,8 @@ class Node(ABC):
                     break
             if not self.ssh_remote:
                 raise Exception("Can not ssh to node without external interfaces")
+        if ssh_options:
+            return f"ssh {ssh_options} -p {self.ssh_port} {self.ssh_remote}"
         return f"ssh -p {self.ssh_port} {self.ssh_remote}"
 
     def add_interface(self, intf: Interface) -> 'Node':
@@ -0,0 +1,174 @@
+import ipaddress
+import typing
+from collections import deque
+from threading import Lock
+from typing import Dict
+
+from topo.interface import Interface
+
+
+class RoutingEngine(object):
+    """Computes reachability and routing tables on the graph of services connected by their interfaces.
+
+       A service is reached through one of its interfaces and exposes the ips of that interface. Switches entered
+       through an interface not leading to one of their controllers (or an excluded device) additionally forward to
+       all their other such interfaces and expose their gateway subnets (always with one hop).
+
+       Hop counts are shortest distances found by a breadth first search, the order of the results is the order in
+       which a depth first search discovers them. Results are memoized per start interface, so one instance should
+       only be used as long as the topology does not change."""
+
+    def __init__(self):
+        # (service name, interface name, for switch) -> ips (in discovery order) -> hops
+        self.reachable: Dict[typing.Tuple[str, str, bool], Dict[ipaddress.ip_address, int]] = {}
+        # Switch name -> services and their interfaces a switch forwards to
+        self.adjacency: Dict[str, typing.List[typing.Tuple['Service', Interface]]] = {}
+
+    def get_neighbours(self, switch: 'Service') -> typing.List[typing.Tuple['Service', Interface]]:
+        if switch.name not in self.adjacency.keys():
+            self.adjacency[switch.name] = [(intf.other_end_service, intf.other_end) for intf in switch.intfs
+                                           if intf.other_end_service is not None
+                                           and intf.other_end_service not in switch.controllers
+                                           and not switch.is_switch_exclude(intf)]
+        return self.adjacency[switch.name]
+
+    def is_forwarding(self, service: 'Service', intf: Interface) -> bool:
+        """Returns whether the service forwards traffic entering through intf to its other interfaces."""
+        return service.is_switch() and intf.other_end_service is not None \
+            and intf.other_end_service not in service.controllers and not service.is_switch_exclude(intf)
+
+    def get_exposed_ips(self, service: 'Service', intf: Interface,
+                        for_switch: bool) -> typing.List[ipaddress.ip_address]:
+        if for_switch and not service.is_controller():
+            return []
+        return [ip for ip in intf.ips if not ip.is_loopback]
+
+    def get_reachable_ips_via_for_other(self, service: 'Service', intf: Interface,
+                                        for_switch: bool = False) -> Dict[ipaddress.ip_address, int]:
+        """Returns all ips reachable by entering service through intf with their hop count (0 for ips of intf)."""
+        key = (service.name, intf.name, for_switch)
+        if key not in self.reachable.keys():
+            hops = self._search_hops(service, intf, for_switch)
+            self.reachable[key] = {ip: hops[ip] for ip in self._search_order(service, intf, for_switch)}
+        return self.reachable[key].copy()
+
+    def _search_hops(self, service: 'Service', intf: Interface,
+                     for_switch: bool) -> Dict[ipaddress.ip_address, int]:
+        ret = {}
+        seen = set()
+        expanded = set()
+        queue = deque([(service, intf, 0)])
+        while len(queue) > 0:
+            current, current_intf, hops = queue.popleft()
+            if (current.name, current_intf.name) in seen:
+                continue
+            seen.add((current.name, current_intf.name))
+            for ip in self.get_exposed_ips(current, current_intf, for_switch):
+                if ip not in ret:
+                    ret[ip] = hops
+            if current.name not in expanded and self.is_forwarding(current, current_intf):
+                expanded.add(current.name)
+                for other, other_intf in self.get_neighbours(current):
+                    queue.append((other, other_intf, hops + 1))
+                for subnet in current.gateway_to_subnets:
+                    ret[subnet] = 1
+        return ret
+
+    def _search_order(self, service: 'Service', intf: Interface, for_switch: bool) -> Dict[ipaddress.ip_address, None]:
+        ret = {}
+        expanded = set()
+        stack = []
+
+        def visit(current: 'Service', current_intf: Interface):
+            for ip in self.get_exposed_ips(current, current_intf, for_switch):
+                ret.setdefault(ip, None)
+            if current.name not in expanded and self.is_forwarding(current, current_intf):
+                expanded.add(current.name)
+                stack.append((current, iter(self.get_neighbours(current))))
+
+        visit(service, intf)
+        while len(stack) > 0:
+            current, neighbours = stack[-1]
+            neighbour = next(neighbours, None)
+            if neighbour is None:
+                stack.pop()
+                for subnet in current.gateway_to_subnets:
+                    ret.setdefault(subnet, None)
+            else:
+                visit(neighbour[0], neighbour[1])
+        return ret
+
+    def get_reachable_ips_via(self, service: 'Service', intf: Interface,
+                              for_switch: bool = False) -> Dict[ipaddress.ip_address, int]:
+        """Returns the ips reachable from service via intf, unless another interface offers a shorter way."""
+        if intf.other_end is None or intf.other_end_service is None:
+            return {}
+        reachable = self.get_reachable_ips_via_for_other(intf.other_end_service, intf.other_end, for_switch)
+        for other in service.intfs:
+            if other != intf and other.other_end_service:
+                for ip, h in self.get_reachable_ips_via_for_other(other.other_end_service, other.other_end,
+                                                                  for_switch).items():
+                    if ip in reachable and reachable[ip] > h:
+                        # There is a better way to reach the desired ip
+                        del reachable[ip]
+        return reachable
+
+    def build_routing_table(self, service: 'Service', with_tunnel: bool = False,
+                            for_switch: bool = False) -> Dict[ipaddress.ip_address, Interface]:
+        routing_table = {}
+        routing_hops = {}
+        # Add entries to table and replace with shorter options, if any
+        for intf in service.intfs:
+            if not service.is_switch() or intf.other_end_service in service.controllers \
+                    or service.is_switch_exclude(intf):
+                if with_tunnel or not intf.is_tunnel:
+                    for ip, h in self.get_reachable_ips_via(service, intf, False).items():
+                        if ip not in routing_table or routing_hops[ip] > h:
+                            routing_table[ip] = intf
+                            routing_hops[ip] = h
+        # Delete local addresses from table
+        for ip in [ip for ip in routing_table.keys() if service.is_local_ip(ip)]:
+            del routing_table[ip]
+        return routing_table
+
+
+class RoutingCache(object):
+    """Memoizes the routing tables of a topology as long as its version does not change.
+
+       Every change to the structure of the topology (services, links, interfaces, extensions) bumps Topo.version,
+       which discards all cached results on the next lookup."""
+
+    def __init__(self, topo: 'Topo'):
+        self.topo = topo
+        self.version = -1
+        self.engine = RoutingEngine()
+        # (service name, with tunnel, for switch) -> routing table
+        self.tables: Dict[typing.Tuple[str, bool, bool], Dict[ipaddress.ip_address, Interface]] = {}
+        self.lock = Lock()
+
+    def get_engine(self) -> RoutingEngine:
+        """Returns the routing engine for the current topology version. Must be called holding the lock."""
+        if self.version != self.topo.version:
+            self.version = self.topo.version
+            self.engine = RoutingEngine()
+            self.tables = {}
+        return self.engine
+
+    def get_reachable_ips_via_for_other(self, service: 'Service', intf: Interface,
+                                        for_switch: bool = False) -> Dict[ipaddress.ip_address, int]:
+        with self.lock:
+            return self.get_engine().get_reachable_ips_via_for_other(service, intf, for_switch)
+
+    def get_reachable_ips_via(self, service: 'Service', intf: Interface,
+                              for_switch: bool = False) -> Dict[ipaddress.ip_address, int]:
+        with self.lock:
+            return self.get_engine().get_reachable_ips_via(service, intf, for_switch)
+
+    def build_routing_table(self, service: 'Service', with_tunnel: bool = False,
+                            for_switch: bool = False) -> Dict[ipaddress.ip_address, Interface]:
+        with self.lock:
+            engine = self.get_engine()
+            key = (service.name, with_tunnel, for_switch)
+            if key not in self.tables.keys():
+                self.tables[key] = engine.build_routing_table(service, with_tunnel, for_switch)
+            return self.tables[key].copy()
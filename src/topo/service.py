@@ -8,6 +8,7 @@ from extensions.service_extension import ServiceExtension
 from gui.gui_data_attachment import GuiDataAttachment
 from topo.interface import Interface
 from topo.node import Node
+from topo.routing_engine import RoutingEngine
 from topo.util import ClassUtil
 
 
@@ -31,6 +32,8 @@ class Service(ABC):
         self.main_network: ipaddress or None = None
         self.extensions: Dict[str, ServiceExtension] = {}
         self.gui_data: GuiDataAttachment = GuiDataAttachment()
+        # Set once the service is added to a topology
+        self.topo: 'Topo' or None = None
 
     def configure(self, topo: 'Topo'):
         """To be implemented by services. Will execute when the topology is fully loaded."""
@@ -64,8 +67,8 @@ class Service(ABC):
         for ext in in_dict['service_extensions']:
             ret.extensions[ext['name']] = (ClassUtil.get_class_from_dict(ext).from_dict(topo, ext, ret))
         ret.gui_data = GuiDataAttachment.from_dict(in_dict['gui_data'])
-        ret.main_ip = ipaddress.ip_address(in_dict['main_ip'])
-        ret.main_network = ipaddress.ip_network(in_dict['main_network'])
+        ret.main_ip = Interface.parse_ip(in_dict['main_ip'])
+        ret.main_network = Interface.parse_network(in_dict['main_network'])
         return ret
 
     @abstractmethod
@@ -87,6 +90,7 @@ class Service(ABC):
                 break
         if found:
             self.intfs.remove(found)
+            self.changed(lambda index: index.remove_interface(self, found))
         return found
 
     def add_interface(self, intf: Interface) -> 'Service':
@@ -94,6 +98,7 @@ class Service(ABC):
             if i.name == intf:
                 raise Exception(f"Interface with name {intf.name} already exists in service {self.name}")
         self.intfs.append(intf)
+        self.changed(lambda index: index.add_interface(self, intf))
         return self
 
     def add_interface_by_name(self, intf_name: str) -> Interface:
@@ -119,84 +124,28 @@ class Service(ABC):
                 return ip
         return None
 
+    def get_routing(self) -> RoutingEngine or 'RoutingCache':
+        if self.topo is not None:
+            return self.topo.routing_cache
+        return RoutingEngine()
+
     def get_reachable_ips_via_for_other(self, intf: Interface, for_switch: bool = False) -> Dict[ipaddress.ip_address, int]:
-        return self.get_reachable_ips_via_for_other_recursive(intf, [], 0, for_switch)
-
-    def get_reachable_ips_via_for_other_recursive(self, intf: Interface, visited: typing.List['Service'], hops: int,
-                                                  for_switch: bool = False) -> Dict[ipaddress.ip_address, int]:
-        ret = {}
-        if not for_switch or self.is_controller():
-            for ip in intf.ips:
-                if not ip.is_loopback:
-                    ret[ip] = hops
-        if self in visited:
-            return ret
-        visited = visited.copy()
-        visited.append(self)
-        if self.is_switch():
-            # Switches expose all other devices if calling instance is not a controller of or excluded from this switch
-            if intf.other_end_service is not None and intf.other_end_service not in self.controllers\
-                    and not self.is_switch_exclude(intf):
-                for rintf in self.intfs:
-                    if rintf.other_end_service not in self.controllers and not self.is_switch_exclude(rintf):
-                        # Rintf is an interface that is not connected to a remote controller -> add it
-                        for ip, h in rintf.other_end_service.get_reachable_ips_via_for_other_recursive(rintf.other_end,
-                                                                                                       visited,
-                                                                                                       hops + 1,
-                                                                                                       for_switch) \
-                                .items():
-                            if ip not in ret or ret[ip] > h:
-                                ret[ip] = h
-                for x in self.gateway_to_subnets:
-                    ret[x] = 1
-        return ret
+        return self.get_routing().get_reachable_ips_via_for_other(self, intf, for_switch)
 
     def get_reachable_ips_via(self, intf: Interface, for_switch: bool = False) -> Dict[ipaddress.ip_address, int]:
-        if intf.other_end is None or intf.other_end_service is None:
-            return {}
-        reachable = intf.other_end_service.get_reachable_ips_via_for_other(intf.other_end, for_switch)
-        # Now iterate over all other interfaces and find if there is a shorter path via another way
-        for other in self.intfs:
-            if other != intf:
-                if other.other_end_service:
-                    other_reachable = other.other_end_service.get_reachable_ips_via_for_other(other.other_end, for_switch)
-                    for ip, h in other_reachable.items():
-                        if ip in reachable and reachable[ip] > h:
-                            # There is a better way to reach the desired ip
-                            del reachable[ip]
-        return reachable
+        return self.get_routing().get_reachable_ips_via(self, intf, for_switch)
 
     def is_local_ip(self, ip: ipaddress) -> bool:
         if ip.is_loopback:
             return True
-        for intf in self.intfs:
-            if ip in intf.ips:
-                return True
-        return False
+        return self.has_ip(ip)
 
     def build_routing_table(self, with_tunnel: bool = False, for_switch: bool = False) -> Dict[ipaddress.ip_address, Interface]:
-        routing_table = {}
-        routing_hops = {}
-        # Add entries to table and replace with shorter options, if any
-        for intf in self.intfs:
-            if not self.is_switch() or intf.other_end_service in self.controllers or self.is_switch_exclude(intf):
-                if with_tunnel or not intf.is_tunnel:
-                    entries = self.get_reachable_ips_via(intf, False)
-                    for ip, h in entries.items():
-                        if ip not in routing_table or routing_hops[ip] > h:
-                            routing_table[ip] = intf
-                            routing_hops[ip] = h
-        # Delete local addresses from table
-        to_del = []
-        for ip, h in routing_table.items():
-            if self.is_local_ip(ip):
-                to_del.append(ip)
-        for del_ip in to_del:
-            del routing_table[del_ip]
-        # Return final table
-        return routing_table
+        return self.get_routing().build_routing_table(self, with_tunnel, for_switch)
 
     def has_ip(self, ip: ipaddress) -> bool:
+        if self.topo is not None:
+            return any(service is self for service, intf in self.topo.get_index().get_ip_owners(ip))
         for intf in self.intfs:
             if ip in intf.ips:
                 return True
@@ -206,3 +155,11 @@ class Service(ABC):
         if ext.name in self.extensions:
             raise Exception("Service extension with name " + ext.name + " already exists in service " + self.name)
         self.extensions[ext.name] = ext
+        # Extensions may add interfaces directly
+        self.changed(lambda index: index.add_service(self))
+
+    def changed(self, update_index: typing.Callable[['TopoIndex'], None] or None = None):
+        """Marks the topology of this service as changed (e.g. to invalidate cached routing tables).
+           Needs to be called after modifying interfaces or extensions directly."""
+        if self.topo is not None:
+            self.topo.changed(update_index, [self])
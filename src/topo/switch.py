@@ -202,7 +202,7 @@ class OVSSwitch(Switch):
         clist = []
         for c in self.controllers:
             found_ip = None
-            for link in config_builder.topo.links:
+            for link in config_builder.topo.get_node_links(self.executor):
                 if link.intf1 in self.intfs or link.intf2 in self.intfs:
                     # We are connected to this link
                     match = link.intf2.other_end_service if link.intf2 in self.intfs else link.intf1.other_end_service
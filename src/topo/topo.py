@@ -1,19 +1,31 @@
+import gc
+import ipaddress
 import json
 import os
 import shutil
 import typing
 from abc import abstractmethod
 
+from config.configuration_cache import ConfigurationCache, CachedConfigurationBuilder
 from gui.topo_gui_data_attachment import TopoGuiDataAttachment
 from network.default_network_implementation import DefaultNetworkImplementation
+from topo.interface import Interface
 from topo.link import Link
 from topo.node import Node
+from topo.routing_engine import RoutingCache
 from topo.service import Service
-from topo.util import MacUtil, ClassUtil
+from topo.topo_index import TopoIndex
+from topo.util import MacUtil, ClassUtil, DigestUtil
 
 
 class Topo(object):
     """A topology represents a network setup."""
+
+    # Suffix of the file storing the digest (without gui) next to a topology file
+    DIGEST_SUFFIX = ".sha256"
+    # Extension of topology files stored in the compact format (see TopoUtil.to_compact_dict)
+    COMPACT_EXTENSION = ".cjson"
+
     def __init__(self, nodes=None,
                  links=None,
                  services=None,
@@ -28,15 +40,28 @@ class Topo(object):
         if network_implementation is None:
             network_implementation = DefaultNetworkImplementation("10.0.0.0/24", "239.1.1.1")
         self.mac_util = MacUtil()
+        # Increased on every structural change, used to invalidate cached results (e.g. routing tables)
+        self.version = 0
+        self.routing_cache = RoutingCache(self)
+        self.configuration_cache = ConfigurationCache(self)
+        # Id of node/service/link/network implementation -> (component, without gui -> content digest), the
+        # component is kept so its id can not be reused by another object as long as the entry exists
+        self.digests: typing.Dict[int, typing.Tuple[object, typing.Dict[bool, str]]] = {}
+        # Without gui -> digest over all components
+        self.topo_digests: typing.Dict[bool, str] = {}
         self.nodes = nodes
         self.links = links
         self.services = services
+        for service in self.services.values():
+            service.topo = self
+        self.index = TopoIndex.build(self)
         self.network_implementation = network_implementation
         self.network_implementation.inject_topology(self)
         self.create(args, params)
         self.network_implementation.configure()
         for service in self.services.values():
             service.configure(self)
+        self.changed()
         self.gui_data_attachment = TopoGuiDataAttachment()
 
     def to_dict(self, without_gui: bool = False) -> dict:
@@ -60,26 +85,48 @@ class Topo(object):
     @classmethod
     def from_dict(cls, in_dict: dict) -> 'Topo':
         """Internal method to initialize from dictionary."""
+        # Resolve all classes first to fail before creating any object
+        for x in TopoUtil.get_class_dicts(in_dict):
+            ClassUtil.get_class_from_dict(x)
         ret = Topo()
         for x in in_dict['nodes']:
             ret.nodes[x['name']] = ClassUtil.get_class_from_dict(x).from_dict(x)
         for x in in_dict['services']:
             ret.services[x['name']] = ClassUtil.get_class_from_dict(x).from_dict(ret, x)
+            ret.services[x['name']].topo = ret
         for x in in_dict['links']:
             ret.links.append(ClassUtil.get_class_from_dict(x).from_dict(ret, x))
         x = in_dict['network_implementation']
         ret.network_implementation = ClassUtil.get_class_from_dict(x).from_dict(x)
         ret.network_implementation.inject_topology(ret)
+        ret.changed()
         if "gui_data" in in_dict.keys():
             ret.gui_data_attachment = TopoGuiDataAttachment.from_dict(in_dict['gui_data'])
         return ret
 
-    def export_topo(self, without_gui: bool = False) -> str:
+    def export_topo(self, without_gui: bool = False, compact: bool = False) -> str:
+        """compact: whether to export without indentation and with a class table instead of indented json (less than
+                    half the size and export time, imports take about as long as with indented json)"""
+        if compact:
+            return json.dumps(TopoUtil.to_compact_dict(self.to_dict(without_gui)), separators=(",", ":"))
         return json.dumps(self.to_dict(without_gui), indent=4)
 
     @classmethod
     def import_topo(cls, in_json: str) -> 'Topo':
-        return Topo.from_dict(json.loads(in_json))
+        """Imports a topology exported in either format.
+
+           Garbage collection is paused meanwhile: the import only creates objects that stay alive, so the collection
+           passes triggered by the many allocations would find nothing to free and take about a third of the time."""
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            in_dict = json.loads(in_json)
+            if TopoUtil.is_compact_dict(in_dict):
+                in_dict = TopoUtil.from_compact_dict(in_dict)
+            return Topo.from_dict(in_dict)
+        finally:
+            if gc_enabled:
+                gc.enable()
 
     @abstractmethod
     def create(self, *args, **params):
@@ -93,6 +140,8 @@ class Topo(object):
         if service.name in self.services:
             raise Exception(f"Service with name {service.name} already exists")
         self.services[service.name] = service
+        service.topo = self
+        self.changed(lambda index: index.add_service(service), [service])
         for intf in service.intfs:
             if intf.mac_address is None:
                 intf.mac_address = self.network_implementation.get_network_address_generator().generate_mac(service,
@@ -107,6 +156,7 @@ class Topo(object):
         if node.name in self.nodes.keys():
             raise Exception(f"Node with name {node.name} already exists")
         self.nodes[node.name] = node
+        self.changed(lambda index: None, [node])
         # We do not determine the mac addresses for real hardware (at least not for now)
         # for intf in node.intfs:
         #    if intf.mac_address is None:
@@ -121,16 +171,98 @@ class Topo(object):
         if link in self.links:
             raise Exception("Link was already added")
         self.links.append(link)
+        self.changed(lambda index: index.add_link(link), [link])
+
+    def changed(self, update_index: typing.Callable[[TopoIndex], None] or None = None,
+                components: typing.List[object] or None = None):
+        """Marks the topology as changed, invalidating all cached results.
+           update_index: applies the change to an up-to-date index instead of rebuilding it on the next lookup
+           components: the only nodes/services/links whose content changed (None if unknown)"""
+        up_to_date = self.index.version == self.version
+        self.version += 1
+        if up_to_date and update_index:
+            update_index(self.index)
+            self.index.version = self.version
+        self.forget_digests(components)
+
+    def index_changed(self, update_index: typing.Callable[[TopoIndex], None],
+                      components: typing.List[object] or None = None):
+        """Applies a change that does not affect routing (e.g. assigned bind names) to an up-to-date index.
+           A stale index picks the change up when it is rebuilt.
+           components: the nodes/services/links whose content changed"""
+        if self.index.version == self.version:
+            update_index(self.index)
+        self.forget_digests(components if components is not None else [])
+
+    def forget_digests(self, components: typing.List[object] or None = None):
+        if components is None:
+            self.digests.clear()
+        else:
+            for component in components:
+                self.digests.pop(id(component), None)
+        self.topo_digests.clear()
+
+    def get_component_digest(self, component: object, to_dict: typing.Callable[[], dict], without_gui: bool) -> str:
+        if id(component) not in self.digests.keys() or self.digests[id(component)][0] is not component:
+            self.digests[id(component)] = (component, {})
+        digests = self.digests[id(component)][1]
+        if without_gui not in digests.keys():
+            digests[without_gui] = DigestUtil.digest(to_dict())
+        return digests[without_gui]
+
+    def get_digest(self, without_gui: bool = False) -> str:
+        """Returns a content digest of the topology, equal for topologies with equal exports.
+           Digests of unchanged components are reused, direct modifications need to be followed by changed()."""
+        if without_gui not in self.topo_digests.keys():
+            parts = [self.get_component_digest(node, lambda: node.to_dict(without_gui), without_gui)
+                     for node in self.nodes.values()]
+            parts += [self.get_component_digest(service, lambda: service.to_dict(without_gui), without_gui)
+                      for service in self.services.values()]
+            parts += [self.get_component_digest(link, link.to_dict, without_gui) for link in self.links]
+            parts.append(self.get_component_digest(self.network_implementation,
+                                                   self.network_implementation.to_dict, without_gui))
+            self.topo_digests[without_gui] = DigestUtil.digest([len(self.nodes), len(self.services), parts])
+        if without_gui:
+            return self.topo_digests[without_gui]
+        return DigestUtil.digest([self.topo_digests[without_gui], self.gui_data_attachment.to_dict()])
+
+    def get_index(self) -> TopoIndex:
+        index = self.index
+        if index.version != self.version:
+            index = TopoIndex.build(self)
+            self.index = index
+        return index
+
+    def get_configuration_builder(self, node: Node, use_warm_pool: bool = False,
+                                  use_launch: bool = True) -> CachedConfigurationBuilder:
+        """Returns a builder for the configurations of node, memoized until the topology changes.
+           use_warm_pool: whether new containers are claimed from a WarmContainerPool on the node
+           use_launch: whether containers are created with a single lxc launch (see ConfigurationBuilder)"""
+        return self.configuration_cache.get_builder(node, use_warm_pool, use_launch)
 
     def get_links(self, service1: Service, service2: Service) -> typing.List[Link]:
-        return [link for link in self.links
-                if (link.service1, link.service2) in ((service1, service2), (service2, service1))]
+        return list(self.get_index().get_links(service1, service2))
+
+    def get_node_links(self, node: Node) -> typing.List[Link]:
+        """Returns all links with at least one end on the given node."""
+        return list(self.get_index().get_node_links(node))
+
+    def get_node_services(self, node: Node) -> typing.List[Service]:
+        return list(self.get_index().get_node_services(node))
+
+    def get_ip_owners(self, ip: ipaddress.ip_address) -> typing.List[typing.Tuple[Service, Interface]]:
+        """Returns all services and their interfaces holding the given ip."""
+        return list(self.get_index().get_ip_owners(ip))
+
+    def get_link_by_bind_name(self, node: Node, bind_name: str) -> Link or None:
+        return self.get_index().get_link_by_bind_name(node, bind_name)
 
     def __eq__(self, other: 'Topo') -> bool:
-        return self.export_topo().__eq__(other.export_topo())
+        """Compares the digests of both topologies, see get_digest (direct modifications need changed() first)."""
+        return self.get_digest().__eq__(other.get_digest())
 
     def eq_without_gui(self, other: 'Topo') -> bool:
-        return self.export_topo(True).__eq__(other.export_topo(True))
+        return self.get_digest(True).__eq__(other.get_digest(True))
 
 
 class TopoUtil(object):
@@ -144,12 +276,57 @@ class TopoUtil(object):
 
     @classmethod
     def to_file(cls, file_path: str, topo: Topo):
-        ret = topo.export_topo()
+        """Uses the compact format for files ending with Topo.COMPACT_EXTENSION, indented json otherwise."""
+        ret = topo.export_topo(compact=file_path.endswith(Topo.COMPACT_EXTENSION))
         # No error handling, but user should be able to understand
         file = open(file_path, "w")
         file.write(ret)
         file.close()
 
+    @classmethod
+    def get_class_dicts(cls, in_dict: dict) -> typing.List[dict]:
+        """Returns all dictionaries of a topology dictionary that describe an object of a class."""
+        ret = in_dict['nodes'] + in_dict['services'] + in_dict['links']
+        for service in in_dict['services']:
+            ret += service['service_extensions']
+        # The network implementation may contain further objects (e.g. its address generator)
+        pending = [in_dict['network_implementation']]
+        while len(pending) > 0:
+            x = pending.pop()
+            if isinstance(x, dict):
+                if 'class' in x.keys():
+                    ret.append(x)
+                pending += x.values()
+            elif isinstance(x, list):
+                pending += x
+        return ret
+
+    @classmethod
+    def to_compact_dict(cls, in_dict: dict) -> dict:
+        """Replaces the module and class names of all objects by an index into a class table (modifies in_dict)."""
+        classes: typing.List[typing.List[str]] = []
+        class_ids: typing.Dict[typing.Tuple[str, str], int] = {}
+        for x in TopoUtil.get_class_dicts(in_dict):
+            key = (x.pop('module'), x['class'])
+            if key not in class_ids.keys():
+                class_ids[key] = len(classes)
+                classes.append(list(key))
+            x['class'] = class_ids[key]
+        return {'format': 'compact', 'classes': classes, 'topology': in_dict}
+
+    @classmethod
+    def is_compact_dict(cls, in_dict: dict) -> bool:
+        return in_dict.get('format', None) == 'compact'
+
+    @classmethod
+    def from_compact_dict(cls, in_dict: dict) -> dict:
+        """Restores the dictionary of a topology exported by to_compact_dict (modifies in_dict)."""
+        classes = in_dict['classes']
+        ret = in_dict['topology']
+        for x in TopoUtil.get_class_dicts(ret):
+            x['module'], x['class'] = classes[x['class']]
+        return ret
+
     @classmethod
     def run_build(cls, argv: typing.List[str], topo_type: type):
         if len(argv) <= 1:
@@ -165,5 +342,8 @@ class TopoUtil(object):
         out = open(dir + "/current_topology.json", "w")
         out.write(topo.export_topo())
         out.close()
+        out = open(dir + "/current_topology.json" + Topo.DIGEST_SUFFIX, "w")
+        out.write(topo.get_digest(True))
+        out.close()
 
         print("Topology created!")
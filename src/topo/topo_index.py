@@ -0,0 +1,93 @@
+import typing
+from ipaddress import ip_address
+from typing import Dict
+
+from topo.interface import Interface
+from topo.link import Link
+from topo.node import Node
+from topo.service import Service
+
+
+class TopoIndex(object):
+    """Lookup tables over the services and links of a topology.
+
+       An index is valid for the topology version it was built for. Services and links added through the topology
+       are indexed incrementally, any other change makes the topology rebuild the index on the next lookup."""
+
+    def __init__(self, version: int = -1):
+        self.version = version
+        # Ip -> services and their interfaces holding that ip
+        self.ips: Dict[ip_address, typing.List[typing.Tuple[Service, Interface]]] = {}
+        # Service names (sorted) -> links between both services
+        self.pair_links: Dict[typing.Tuple[str, str], typing.List[Link]] = {}
+        # Node name -> links with at least one end on the node
+        self.node_links: Dict[str, typing.List[Link]] = {}
+        # Node name -> services executed on the node
+        self.node_services: Dict[str, typing.List[Service]] = {}
+        # (Node name, bind name) -> link bound to that device of the node
+        self.bind_names: Dict[typing.Tuple[str, str], Link] = {}
+
+    @classmethod
+    def build(cls, topo: 'Topo') -> 'TopoIndex':
+        ret = TopoIndex(topo.version)
+        for service in topo.services.values():
+            ret.add_service(service)
+        for link in topo.links:
+            ret.add_link(link)
+        return ret
+
+    @classmethod
+    def pair_key(cls, service1: Service, service2: Service) -> typing.Tuple[str, str]:
+        return (service1.name, service2.name) if service1.name <= service2.name else (service2.name, service1.name)
+
+    def add_service(self, service: Service):
+        services = self.node_services.setdefault(service.executor.name, [])
+        if service not in services:
+            services.append(service)
+        for intf in service.intfs:
+            self.add_interface(service, intf)
+
+    def add_interface(self, service: Service, intf: Interface):
+        for ip in intf.ips:
+            owners = self.ips.setdefault(ip, [])
+            if (service, intf) not in owners:
+                owners.append((service, intf))
+
+    def add_link(self, link: Link):
+        self.pair_links.setdefault(TopoIndex.pair_key(link.service1, link.service2), []).append(link)
+        self.node_links.setdefault(link.service1.executor.name, []).append(link)
+        if link.service2.executor != link.service1.executor:
+            self.node_links.setdefault(link.service2.executor.name, []).append(link)
+        self.add_link_interfaces(link)
+
+    def add_link_interfaces(self, link: Link):
+        """Indexes the ips and bind names of both interfaces of a link (again)."""
+        for service, intf in [(link.service1, link.intf1), (link.service2, link.intf2)]:
+            if intf:
+                # Interfaces of a link only receive their ips when the link is created
+                self.add_interface(service, intf)
+                if intf.bind_name:
+                    self.bind_names.setdefault((service.executor.name, intf.bind_name), link)
+
+    def remove_interface(self, service: Service, intf: Interface):
+        for ip in intf.ips:
+            if ip in self.ips.keys() and (service, intf) in self.ips[ip]:
+                self.ips[ip].remove((service, intf))
+        key = (service.executor.name, intf.bind_name)
+        if key in self.bind_names.keys() and intf in (self.bind_names[key].intf1, self.bind_names[key].intf2):
+            del self.bind_names[key]
+
+    def get_ip_owners(self, ip: ip_address) -> typing.List[typing.Tuple[Service, Interface]]:
+        return self.ips.get(ip, [])
+
+    def get_links(self, service1: Service, service2: Service) -> typing.List[Link]:
+        return self.pair_links.get(TopoIndex.pair_key(service1, service2), [])
+
+    def get_node_links(self, node: Node) -> typing.List[Link]:
+        return self.node_links.get(node.name, [])
+
+    def get_node_services(self, node: Node) -> typing.List[Service]:
+        return self.node_services.get(node.name, [])
+
+    def get_link_by_bind_name(self, node: Node, bind_name: str) -> Link or None:
+        return self.bind_names.get((node.name, bind_name), None)
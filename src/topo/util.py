@@ -1,4 +1,7 @@
+import hashlib
 import importlib
+import importlib.metadata
+import json
 import subprocess
 import typing
 
@@ -29,16 +32,82 @@ class MacUtil(object):
 
 
 class ClassUtil(object):
+    """Resolves the classes of serialized objects. Every class is imported once and memoized afterwards.
+
+       Classes can also be registered explicitly (e.g. under the names of a class that was moved), either by calling
+       register or by plugins providing classes in the entry point group PLUGIN_GROUP."""
+
+    PLUGIN_GROUP = "testbed.topology_classes"
+
+    # (module name, class name) -> resolved or registered class
+    classes: typing.Dict[typing.Tuple[str, str], type] = {}
+    plugins_loaded = False
+
+    @classmethod
+    def register(cls, clazz: type, module_name: str or None = None, class_name: str or None = None) -> type:
+        """Registers a class under its own or the given names. Returns the class, so it can be used as decorator."""
+        key = (module_name if module_name else clazz.__module__, class_name if class_name else clazz.__name__)
+        if key in cls.classes.keys() and cls.classes[key] is not clazz:
+            raise Exception(f"Class {key[0]}.{key[1]} is already registered as {cls.classes[key]}")
+        cls.classes[key] = clazz
+        return clazz
+
+    @classmethod
+    def clear(cls):
+        """Forgets all resolved and registered classes."""
+        cls.classes = {}
+        cls.plugins_loaded = False
+
+    @classmethod
+    def load_plugins(cls):
+        """Registers all classes provided in the entry point group PLUGIN_GROUP (only once)."""
+        if cls.plugins_loaded:
+            return
+        cls.plugins_loaded = True
+        entry_points = importlib.metadata.entry_points()
+        if hasattr(entry_points, "select"):
+            entry_points = entry_points.select(group=cls.PLUGIN_GROUP)
+        else:
+            entry_points = entry_points.get(cls.PLUGIN_GROUP, [])
+        for entry_point in entry_points:
+            clazz = entry_point.load()
+            if not isinstance(clazz, type):
+                raise Exception(f"Plugin entry point {entry_point.name} in {cls.PLUGIN_GROUP} does not provide a class")
+            cls.register(clazz)
 
     @classmethod
     def get_class(cls, module_name: str, class_name: str) -> type:
-        return getattr(importlib.import_module(module_name), class_name)
+        key = (module_name, class_name)
+        if key in cls.classes.keys():
+            return cls.classes[key]
+        cls.load_plugins()
+        if key in cls.classes.keys():
+            return cls.classes[key]
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as e:
+            raise Exception(f"Unknown class {module_name}.{class_name}: module can not be imported ({e})")
+        clazz = getattr(module, class_name, None)
+        if not isinstance(clazz, type):
+            raise Exception(f"Unknown class {module_name}.{class_name}: module {module_name} has no such class")
+        cls.classes[key] = clazz
+        return clazz
 
     @classmethod
     def get_class_from_dict(cls, x: dict) -> type:
+        if 'module' not in x.keys() or 'class' not in x.keys():
+            raise Exception(f"Can not resolve class of serialized object {x.get('name', '')} (no module or class given)")
         return cls.get_class(x['module'], x['class'])
 
 
+class DigestUtil(object):
+
+    @classmethod
+    def digest(cls, content: dict or list or str) -> str:
+        """Returns a stable sha256 hex digest of json serializable content (independent of the order of keys)."""
+        return hashlib.sha256(json.dumps(content, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
 class CommandUtil(object):
     @classmethod
     def run_command(cls, cmd: typing.List[str], list_output: bool = False, do_output: bool = True) -> (
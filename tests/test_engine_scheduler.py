@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import unittest
+from threading import Lock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from live.engine_scheduler import EngineScheduler, EngineTask
+
+
+class EngineSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.lock = Lock()
+        self.events = []
+        self.scheduler = EngineScheduler(node_concurrency=2, progress=lambda task, finished, total: None)
+
+    def add(self, name: str, node_name: str = "node1", duration: float = 0.0, fail: bool = False) -> EngineTask:
+        def run():
+            with self.lock:
+                self.events.append(("start", name))
+            time.sleep(duration)
+            with self.lock:
+                self.events.append(("end", name))
+            if fail:
+                raise Exception(f"{name} failed")
+        return self.scheduler.add(EngineTask(name, node_name, run))
+
+    def test_dependency_order(self):
+        switch = self.add("start s1", duration=0.05)
+        host1 = self.add("start h1").depends_on(switch)
+        host2 = self.add("start h2", "node2").depends_on(switch)
+        self.add("start h3").depends_on(host1).depends_on(host2)
+        self.scheduler.run()
+        self.assertTrue(all(task.done for task in self.scheduler.tasks.values()))
+        for task in self.scheduler.tasks.values():
+            for dep in task.dependencies:
+                self.assertLess(self.events.index(("end", dep.name)), self.events.index(("start", task.name)))
+
+    def test_dependents_of_failed_task_skipped(self):
+        switch = self.add("start s1", fail=True)
+        host = self.add("start h1").depends_on(switch)
+        self.add("start h2").depends_on(host)
+        other = self.add("start h3")
+        with self.assertRaises(Exception):
+            self.scheduler.run()
+        self.assertIsNotNone(switch.error)
+        self.assertTrue(host.skipped)
+        self.assertTrue(self.scheduler.get("start h2").skipped)
+        self.assertTrue(other.done)
+        self.assertNotIn(("start", "start h1"), self.events)
+        self.assertNotIn(("start", "start h2"), self.events)
+
+    def test_cycle_raises(self):
+        task1 = self.add("start s1")
+        task2 = self.add("start s2").depends_on(task1)
+        task1.depends_on(task2)
+        self.add("start h1")
+        with self.assertRaises(Exception):
+            self.scheduler.run()
+        self.assertEqual([], self.events)
+
+    def test_node_concurrency(self):
+        for i in range(0, 6):
+            self.add(f"start h{i}", duration=0.05)
+        for i in range(0, 3):
+            self.add(f"start g{i}", "node2", duration=0.05)
+        self.scheduler.run()
+        running = {"node1": 0, "node2": 0}
+        most = {"node1": 0, "node2": 0}
+        for kind, name in self.events:
+            node_name = self.scheduler.get(name).node_name
+            running[node_name] += 1 if kind == "start" else -1
+            most[node_name] = max(most[node_name], running[node_name])
+        self.assertEqual({"node1": 2, "node2": 2}, most)
+
+
+if __name__ == '__main__':
+    unittest.main()
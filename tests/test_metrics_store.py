@@ -0,0 +1,31 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from live.metrics_store import MetricsStore, Metric
+
+
+class MetricsStoreTest(unittest.TestCase):
+    def test_range_before_first_coarse_sample(self):
+        # 30 seconds of samples: no minute average has been completed yet
+        store = MetricsStore()
+        for i in range(0, 30):
+            store.add("x", Metric.RX, i, 1000 + i)
+        self.assertEqual([(1000 + i, i) for i in range(0, 30)], store.range("x", Metric.RX, 970, 1030))
+        self.assertEqual(30, len(store.range("x", Metric.RX)))
+        self.assertEqual([(1010 + i, 10 + i) for i in range(0, 20)], store.range("x", Metric.RX, 1010, 1030))
+
+    def test_range_prefixed_by_averages(self):
+        store = MetricsStore(raw_capacity=20, tiers=[(10, 5), (60, 10)])
+        for i in range(0, 30):
+            store.add("x", Metric.RX, i, 970 + i)
+        samples = store.range("x", Metric.RX, 940, 1000)
+        # The average of the interval before the oldest raw sample, then all raw samples
+        self.assertEqual((970, 4.5), samples[0])
+        self.assertEqual([(980 + i, 10 + i) for i in range(0, 20)], samples[1:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from live.topology_diff import TopologyDiff
+from simple_controller import SimpleController
+from topo.topo import Topo
+
+
+class TopologyDiffTest(unittest.TestCase):
+    def test_switch_affected_by_controller_port(self):
+        exported = SimpleController().export_topo()
+        old_topo = Topo.import_topo(exported)
+        new_topo = Topo.import_topo(exported)
+        new_topo.get_service("controller1").port = 7777
+        new_topo.changed()
+        affected = TopologyDiff(old_topo, new_topo).get_affected_services()
+        self.assertIn("controller1", affected)
+        self.assertIn("switch1", affected)
+        self.assertNotIn("host1", affected)
+
+
+if __name__ == '__main__':
+    unittest.main()